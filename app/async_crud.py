@@ -0,0 +1,1232 @@
+# Description: This file contains the async CRUD utilities.
+# Async versions of the crud.py functions used from 'async def' endpoints, with the same
+# names and parameters as their crud.py counterparts. Only the crud.py helpers that do no
+# I/O (statement builders, cache invalidation, validation) have no async version; they are
+# imported from crud.py and shared.
+
+from datetime import date, datetime
+
+from pydantic import ValidationError
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import BULK_IMPORT_CHUNK_SIZE, BULK_IMPORT_MAX_ERRORS, CHECKOUT_STATUS_ID, EXPORT_BATCH_SIZE, PRICE_FACET_BUCKETS
+from app import models, schema
+from app.crud import (
+    INQUIRY_COLUMNS, INQUIRY_FIELDS, INQUIRY_SORT_COLUMNS, ORDER_COLUMNS, ORDER_FIELDS, ORDER_SORT_COLUMNS, PRODUCT_COLUMNS,
+    PRODUCT_FIELDS, PRODUCT_SORT_COLUMNS, cached_order_status, cart_upsert, catalog_version_bump, category_with_count,
+    check_category_ids, facet_count_bumps, inquiry_batch_insert, invalidate_product_cache, invalidate_user_cache, price_bucket,
+    product_category_changes, search_products_query,
+)
+from app.cache import CachedFacets, CachedProduct, CachedProductPage, order_status_registry, product_cache, product_list_cache
+from app.ingest import iter_batches
+from app.pagination import encode_cursor, paginate
+from app.serialization import row_dicts
+from app.singleflight import async_product_flight, async_product_page_flight, async_product_validator_flight
+
+# Product columns written by bulk imports, in COPY order
+PRODUCT_IMPORT_COLUMNS = ["name", "price", "description", "image_url", "version", "updated_at"]
+
+# USER
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    """
+    Retrieve a user by email from the database.
+
+    Args:
+        db (AsyncSession): The async database session.
+        email (str): The email address of the user to retrieve.
+
+    Returns:
+        models.User: The user with the specified email.
+    """
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    return result.scalars().first()
+
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    """
+    Retrieve a user by their user ID from the database.
+
+    Args:
+        db (AsyncSession): The async database session.
+        user_id (int): The user's unique identifier.
+
+    Returns:
+        models.User: The user with the specified user ID.
+    """
+    result = await db.execute(select(models.User).filter(models.User.user_id == user_id))
+    return result.scalars().first()
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    """
+    Retrieve a user by their username from the database.
+
+    Args:
+        db (AsyncSession): The async database session.
+        username (str): The username of the user to retrieve.
+
+    Returns:
+        models.User: The user with the specified username.
+    """
+    result = await db.execute(select(models.User).filter(models.User.username == username))
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user: schema.UserCreate, hashed_password: str):
+    """
+    Create a new user and add them to the database.
+
+    Args:
+        db (AsyncSession): The async database session.
+        user (schema.UserCreate): User data for creation.
+        hashed_password (str): The hash of user.password, which is never stored itself.
+
+    Returns:
+        models.User: The created user.
+    """
+    db_user = models.User(**user.dict(exclude={"password"}), password=hashed_password)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def delete_user(db: AsyncSession, user_id: int):
+    """
+    Delete a user from the database.
+
+    Args:
+        db (AsyncSession): The async database session.
+        user_id (int): The user's unique identifier.
+    """
+    await db.execute(delete(models.User).filter(models.User.user_id == user_id))
+    await db.commit()
+    invalidate_user_cache(user_id)
+
+# PRODUCT
+
+async def get_product_list(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "product_id", category: int | None = None):
+    """
+    Get a list of products with optional offset or keyset pagination.
+
+    Args:
+        db (AsyncSession): The async database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of PRODUCT_SORT_COLUMNS.
+        category (int | None): Only return products in this category.
+
+    Returns:
+        List[models.Product]: A list of products.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    query = select(models.Product)
+    if category is not None:
+        query = query.join(models.ProductCategory).filter(models.ProductCategory.category_id == category)
+    query = paginate(query, PRODUCT_SORT_COLUMNS, models.Product.product_id, sort, skip=skip, limit=limit, cursor=cursor)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def get_product_rows(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "product_id", category: int | None = None):
+    """
+    Get a page of products as response dicts, without loading ORM objects.
+
+    Args:
+        db (AsyncSession): The async database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of PRODUCT_SORT_COLUMNS.
+        category (int | None): Only return products in this category.
+
+    Returns:
+        List[dict]: The products, shaped like schema.Product.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    query = select(*PRODUCT_COLUMNS)
+    if category is not None:
+        query = query.join(models.ProductCategory, models.ProductCategory.product_id == models.Product.product_id).filter(models.ProductCategory.category_id == category)
+    query = paginate(query, PRODUCT_SORT_COLUMNS, models.Product.product_id, sort, skip=skip, limit=limit, cursor=cursor)
+    return row_dicts(await db.execute(query), PRODUCT_FIELDS)
+
+async def get_product_by_id(db: AsyncSession, product_id: int):
+    """
+    Retrieve a product by its unique identifier (ID).
+
+    Args:
+        db (AsyncSession): The async database session.
+        product_id (int): The product's unique identifier.
+
+    Returns:
+        models.Product: The product with the specified ID.
+    """
+    result = await db.execute(select(models.Product).filter(models.Product.product_id == product_id))
+    return result.scalars().first()
+
+async def get_product_category_ids(db: AsyncSession, product_id: int):
+    """
+    Retrieve the IDs of the categories a product belongs to.
+
+    Args:
+        db (AsyncSession): The async database session.
+        product_id (int): The product's unique identifier.
+
+    Returns:
+        Set[int]: The product's category IDs.
+    """
+    result = await db.scalars(select(models.ProductCategory.category_id).filter(models.ProductCategory.product_id == product_id))
+    return set(result)
+
+async def get_existing_category_ids(db: AsyncSession, category_ids: set):
+    """
+    Retrieve which of the given categories exist.
+
+    Args:
+        db (AsyncSession): The async database session.
+        category_ids (set): The category IDs to look for.
+
+    Returns:
+        Set[int]: The category IDs found.
+    """
+    if not category_ids:
+        return set()
+    result = await db.scalars(select(models.Category.category_id).filter(models.Category.category_id.in_(category_ids)))
+    return set(result)
+
+async def get_product_validator(db: AsyncSession, product_id: int):
+    """
+    Retrieve only the cache validators of a product.
+
+    Concurrent lookups of the same product share one query.
+
+    Args:
+        db (AsyncSession): The async database session.
+        product_id (int): The product's unique identifier.
+
+    Returns:
+        Row: The product's version and updated_at, or None if it does not exist.
+    """
+    return await async_product_validator_flight.do((product_id, product_cache.version), _load_product_validator, db, product_id)
+
+async def _load_product_validator(db: AsyncSession, product_id: int):
+    result = await db.execute(select(models.Product.version, models.Product.updated_at).filter(models.Product.product_id == product_id))
+    return result.first()
+
+async def get_catalog_validator(db: AsyncSession):
+    """
+    Retrieve the catalog-wide cache validators.
+
+    Args:
+        db (AsyncSession): The async database session.
+
+    Returns:
+        tuple: The catalog version and the time of the last product write (None before the first write).
+    """
+    result = await db.execute(select(models.CatalogVersion.version, models.CatalogVersion.updated_at).filter(models.CatalogVersion.catalog_id == 1))
+    row = result.first()
+    return tuple(row) if row is not None else (0, None)
+
+async def get_cached_product_entry(db: AsyncSession, product_id: int, load: bool = True, use_cache: bool = True):
+    """
+    Retrieve a product and its validators through the in-process product cache.
+
+    Concurrent cache misses for the same product share one query. Async sessions
+    always read from the primary, so misses are loaded from db.
+
+    Args:
+        db (AsyncSession): The async database session.
+        product_id (int): The product's unique identifier.
+        load (bool): Whether to load the product from the database on a cache miss.
+        use_cache (bool): Whether to use the cache at all; if False the product is read from db.
+
+    Returns:
+        CachedProduct: The product with its version and updated_at, or None if it does not
+        exist (or is not cached and load is False).
+    """
+    if not use_cache:
+        return await _product_entry(db, product_id) if load else None
+    entry = product_cache.get(product_id)
+    if entry is None and load:
+        version = product_cache.version
+        entry = await async_product_flight.do((product_id, version), _load_product_entry, db, product_id, version)
+    return entry
+
+async def _product_entry(db: AsyncSession, product_id: int):
+    db_product = await get_product_by_id(db, product_id)
+    if db_product is None:
+        return None
+    return CachedProduct(schema.Product.from_orm(db_product), db_product.version, db_product.updated_at)
+
+async def _load_product_entry(db: AsyncSession, product_id: int, version: int):
+    entry = await _product_entry(db, product_id)
+    if entry is not None:
+        product_cache.set(product_id, entry, version=version)
+    return entry
+
+async def get_cached_product(db: AsyncSession, product_id: int):
+    """
+    Retrieve a product by ID through the in-process product cache.
+
+    Args:
+        db (AsyncSession): The async database session.
+        product_id (int): The product's unique identifier.
+
+    Returns:
+        schema.Product: The product with the specified ID, or None if it does not exist.
+    """
+    entry = await get_cached_product_entry(db, product_id)
+    return entry.product if entry is not None else None
+
+async def get_cached_product_page(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "product_id", category: int | None = None, load: bool = True, use_cache: bool = True):
+    """
+    Get a page of products and the catalog validators through the in-process product list cache.
+
+    Concurrent cache misses for the same page share one load.
+
+    Args:
+        db (AsyncSession): The async database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of PRODUCT_SORT_COLUMNS.
+        category (int | None): Only return products in this category.
+        load (bool): Whether to load the page from the database on a cache miss.
+        use_cache (bool): Whether to use the cache at all; if False the page is read from db.
+
+    Returns:
+        CachedProductPage: The products, as schema.Product-shaped dicts, with the catalog version
+        and updated_at, or None if the page is not cached and load is False.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    key = (skip, limit, cursor, sort, category)
+    if not use_cache:
+        return await _product_page(db, key) if load else None
+    page = product_list_cache.get(key)
+    if page is None and load:
+        version = product_list_cache.version
+        page = await async_product_page_flight.do((key, version), _load_product_page, db, key, version)
+    return page
+
+async def _product_page(db: AsyncSession, key: tuple):
+    skip, limit, cursor, sort, category = key
+    catalog_version, updated_at = await get_catalog_validator(db)
+    products = await get_product_rows(db, skip=skip, limit=limit, cursor=cursor, sort=sort, category=category)
+    return CachedProductPage(products, catalog_version, updated_at)
+
+async def _load_product_page(db: AsyncSession, key: tuple, version: int):
+    page = await _product_page(db, key)
+    product_list_cache.set(key, page, version=version)
+    return page
+
+async def get_cached_product_list(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "product_id", category: int | None = None):
+    """
+    Get a page of products through the in-process product list cache.
+
+    Args:
+        db (AsyncSession): The async database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of PRODUCT_SORT_COLUMNS.
+        category (int | None): Only return products in this category.
+
+    Returns:
+        List[dict]: A list of products, shaped like schema.Product.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    page = await get_cached_product_page(db, skip=skip, limit=limit, cursor=cursor, sort=sort, category=category)
+    return page.products
+
+async def get_cached_products(db: AsyncSession, product_ids: list[int], use_cache: bool = True):
+    """
+    Retrieve several products through the in-process product cache.
+
+    Cached products are served from memory; all the others are loaded with a single
+    IN query and added to the cache.
+
+    Args:
+        db (AsyncSession): The async database session.
+        product_ids (List[int]): The products' unique identifiers.
+        use_cache (bool): Whether to use the cache at all; if False all products are read from db.
+
+    Returns:
+        Dict[int, schema.Product]: The products found, keyed by product ID.
+    """
+    if not use_cache:
+        result = await db.scalars(select(models.Product).filter(models.Product.product_id.in_(set(product_ids))))
+        return {db_product.product_id: schema.Product.from_orm(db_product) for db_product in result}
+    products = {}
+    missing = []
+    for product_id in dict.fromkeys(product_ids):
+        entry = product_cache.get(product_id)
+        if entry is not None:
+            products[product_id] = entry.product
+        else:
+            missing.append(product_id)
+    if missing:
+        version = product_cache.version
+        for db_product in await db.scalars(select(models.Product).filter(models.Product.product_id.in_(missing))):
+            entry = CachedProduct(schema.Product.from_orm(db_product), db_product.version, db_product.updated_at)
+            product_cache.set(db_product.product_id, entry, version=version)
+            products[db_product.product_id] = entry.product
+    return products
+
+async def get_products_by_ids(db: AsyncSession, product_ids: list[int], use_cache: bool = True):
+    """
+    Retrieve several products in the order they were asked for.
+
+    Cached products are served from memory; all the others are loaded with a single
+    IN query. Repeated IDs are returned once, at their first position.
+
+    Args:
+        db (AsyncSession): The async database session.
+        product_ids (List[int]): The products' unique identifiers.
+        use_cache (bool): Whether to use the product cache at all.
+
+    Returns:
+        tuple: The products found, as a list of schema.Product in request order, and
+        the list of IDs that do not exist.
+    """
+    found = await get_cached_products(db, product_ids, use_cache=use_cache)
+    ordered = list(dict.fromkeys(product_ids))
+    return [found[product_id] for product_id in ordered if product_id in found], [product_id for product_id in ordered if product_id not in found]
+
+async def get_product_facets(db: AsyncSession):
+    """
+    Get the number of products per category and per price bucket.
+
+    The counts are read from the precomputed facet tables; empty facets are left out.
+
+    Args:
+        db (AsyncSession): The async database session.
+
+    Returns:
+        schema.ProductFacets: The category and price bucket facets.
+    """
+    categories = (await db.execute(
+        select(models.Category.category_id, models.Category.name, models.CategoryFacet.product_count)
+        .join(models.CategoryFacet)
+        .filter(models.CategoryFacet.product_count > 0)
+        .order_by(models.Category.name, models.Category.category_id)
+    )).all()
+    counts = dict((await db.execute(
+        select(models.PriceBucketFacet.min_price, models.PriceBucketFacet.product_count)
+        .filter(models.PriceBucketFacet.product_count > 0)
+    )).all())
+    upper_bounds = PRICE_FACET_BUCKETS[1:] + [None]
+    return schema.ProductFacets(
+        categories=[schema.CategoryWithCount.from_orm(category) for category in categories],
+        price_buckets=[
+            schema.PriceBucket(min_price=min_price, max_price=max_price, product_count=counts[min_price])
+            for min_price, max_price in zip(PRICE_FACET_BUCKETS, upper_bounds) if counts.get(min_price)
+        ],
+    )
+
+async def get_cached_product_facets(db: AsyncSession, load: bool = True, use_cache: bool = True):
+    """
+    Get the product facets and the catalog validators through the in-process product list cache.
+
+    Args:
+        db (AsyncSession): The async database session.
+        load (bool): Whether to load the facets from the database on a cache miss.
+        use_cache (bool): Whether to use the cache at all; if False the facets are read from db.
+
+    Returns:
+        CachedFacets: The facets with the catalog version and updated_at, or None if they
+        are not cached and load is False.
+    """
+    if not use_cache:
+        return await _product_facets(db) if load else None
+    entry = product_list_cache.get("facets")
+    if entry is None and load:
+        version = product_list_cache.version
+        entry = await _product_facets(db)
+        product_list_cache.set("facets", entry, version=version)
+    return entry
+
+async def _product_facets(db: AsyncSession):
+    catalog_version, updated_at = await get_catalog_validator(db)
+    return CachedFacets(await get_product_facets(db), catalog_version, updated_at)
+
+async def search_products(db: AsyncSession, q: str, limit: int = 20, cursor: str | None = None):
+    """
+    Full-text search over product names and descriptions, best matches first.
+
+    See crud.search_products for the matching and ranking rules.
+
+    Args:
+        db (AsyncSession): The async database session.
+        q (str): The search text.
+        limit (int): The maximum number of results to return.
+        cursor (str | None): The cursor of the previous page of results.
+
+    Returns:
+        tuple: The matching products (List[Row] with an integer score column, higher is better)
+        and the cursor for the next page, or None if this was the last page.
+
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    query = search_products_query(db, q, limit, cursor)
+    if query is None:
+        return [], None
+    rows = (await db.execute(*query)).all()
+    next_page = encode_cursor("relevance", rows[-1].score, rows[-1].product_id) if rows and len(rows) == limit else None
+    return rows, next_page
+
+async def add_product(db: AsyncSession, product: schema.ProductCreate):
+    """
+    Add a new product to the database.
+
+    Args:
+        db (AsyncSession): The async database session.
+        product (schema.ProductCreate): Product data for creation.
+
+    Returns:
+        models.Product: The created product.
+
+    Raises:
+        ValueError: If some of the product's categories do not exist.
+    """
+    category_ids = set(product.category_ids)
+    check_category_ids(category_ids, await get_existing_category_ids(db, category_ids))
+    db_product = models.Product(**product.dict(exclude={"category_ids"}))
+    db.add(db_product)
+    await db.flush()
+    for stmt, params in product_category_changes(db, db_product.product_id, None, (db_product.price, category_ids)):
+        await db.execute(stmt, params)
+    await db.execute(catalog_version_bump(db))
+    await db.commit()
+    await db.refresh(db_product)
+    invalidate_product_cache(db_product.product_id)
+    return db_product
+
+async def update_product(db: AsyncSession, product: models.Product, product_update: schema.ProductUpdate):
+    """
+    Update an existing product in the database.
+
+    The product row is locked and re-read first, see crud.update_product.
+
+    Args:
+        db (AsyncSession): The async database session.
+        product (models.Product): The product to update.
+        product_update (schema.ProductUpdate): The updated product data; fields it leaves out keep their values.
+
+    Returns:
+        models.Product: The updated product.
+
+    Raises:
+        ValueError: If some of the product's new categories do not exist.
+    """
+    await db.refresh(product, with_for_update=True)
+    old_categories = await get_product_category_ids(db, product.product_id)
+    new_categories = old_categories if product_update.category_ids is None else set(product_update.category_ids)
+    check_category_ids(new_categories - old_categories, await get_existing_category_ids(db, new_categories - old_categories))
+    before = (product.price, old_categories)
+    for field, value in product_update.dict(exclude={"category_ids"}, exclude_unset=True).items():
+        setattr(product, field, value)
+    for stmt, params in product_category_changes(db, product.product_id, before, (product.price, new_categories)):
+        await db.execute(stmt, params)
+    await db.execute(catalog_version_bump(db))
+    await db.commit()
+    await db.refresh(product)
+    invalidate_product_cache(product.product_id)
+    return product
+
+async def delete_product(db: AsyncSession, product_id: int):
+    """
+    Delete a product from the database.
+
+    The product row is locked first, see crud.delete_product.
+
+    Args:
+        db (AsyncSession): The async database session.
+        product_id (int): The product's unique identifier.
+    """
+    result = await db.execute(select(models.Product.price).filter(models.Product.product_id == product_id).with_for_update())
+    row = result.first()
+    if row is None:
+        await db.rollback()
+        return
+    before = (row.price, await get_product_category_ids(db, product_id))
+    for stmt, params in product_category_changes(db, product_id, before, None):
+        await db.execute(stmt, params)
+    await db.execute(delete(models.Product).filter(models.Product.product_id == product_id))
+    await db.execute(catalog_version_bump(db))
+    await db.commit()
+    invalidate_product_cache(product_id)
+
+async def add_products_bulk(db: AsyncSession, products: list[schema.ProductCreate]):
+    """
+    Insert a batch of validated products in the current transaction, without committing.
+
+    On PostgreSQL the rows are streamed with COPY; other databases get a multi-row INSERT.
+    Products with categories are inserted through the ORM instead, since their category
+    links need the new product IDs. The facet counts are adjusted for the whole
+    batch at once. The transaction must already have been started through the session
+    (COPY goes straight to the driver connection).
+
+    Args:
+        db (AsyncSession): The async database session.
+        products (List[schema.ProductCreate]): The products to insert.
+
+    Returns:
+        int: The number of inserted products.
+    """
+    now = datetime.utcnow()
+    rows = [dict(product.dict(exclude={"category_ids"}), version=1, updated_at=now) for product in products if not product.category_ids]
+    categorized = [product for product in products if product.category_ids]
+    category_deltas = {}
+    bucket_deltas = {}
+    for product in products:
+        bucket = price_bucket(product.price)
+        if bucket is not None:
+            bucket_deltas[bucket] = bucket_deltas.get(bucket, 0) + 1
+        for category_id in set(product.category_ids):
+            category_deltas[category_id] = category_deltas.get(category_id, 0) + 1
+    if categorized:
+        db_products = [models.Product(**product.dict(exclude={"category_ids"}), updated_at=now) for product in categorized]
+        db.add_all(db_products)
+        await db.flush()
+        links = [
+            {"product_id": db_product.product_id, "category_id": category_id}
+            for product, db_product in zip(categorized, db_products) for category_id in set(product.category_ids)
+        ]
+        await db.execute(insert(models.ProductCategory), links)
+    for stmt, params in facet_count_bumps(db, category_deltas, bucket_deltas):
+        await db.execute(stmt, params)
+    if not rows:
+        return len(products)
+    if db.get_bind().dialect.name == "postgresql":
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            models.Product.__tablename__,
+            records=[tuple(row[column] for column in PRODUCT_IMPORT_COLUMNS) for row in rows],
+            columns=PRODUCT_IMPORT_COLUMNS,
+        )
+    else:
+        await db.execute(insert(models.Product), rows)
+    return len(products)
+
+async def import_products(db: AsyncSession, records, atomic: bool = False, chunk_size: int = BULK_IMPORT_CHUNK_SIZE):
+    """
+    Validate and insert a stream of product records in a single transaction.
+
+    Records are validated against schema.ProductCreate and inserted chunk by chunk,
+    so memory use is bounded by the chunk size rather than the size of the import.
+
+    Args:
+        db (AsyncSession): The async database session.
+        records (AsyncIterator[tuple]): (row number, record dict or parse error) pairs, as
+            produced by ingest.iter_ndjson_records or ingest.iter_csv_records.
+        atomic (bool): If True, insert nothing when any row is invalid.
+        chunk_size (int): The number of rows validated and inserted at a time.
+
+    Returns:
+        dict: The number of inserted and failed rows and the first errors, by row number.
+    """
+    inserted = 0
+    failed = 0
+    errors = []
+    # Bumping the catalog version first also opens the transaction the chunks join
+    await db.execute(catalog_version_bump(db))
+    async for batch in iter_batches(records, chunk_size):
+        products = []
+        for row, record in batch:
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                products.append((row, schema.ProductCreate.parse_obj(record)))
+            except (ValidationError, ValueError) as e:
+                failed += 1
+                if len(errors) < BULK_IMPORT_MAX_ERRORS:
+                    errors.append({"row": row, "error": _format_import_error(e)})
+        # One lookup per chunk for the categories its products reference
+        existing = await get_existing_category_ids(db, {category_id for _, product in products for category_id in product.category_ids})
+        valid = []
+        for row, product in products:
+            try:
+                check_category_ids(set(product.category_ids), existing)
+                valid.append(product)
+            except ValueError as e:
+                failed += 1
+                if len(errors) < BULK_IMPORT_MAX_ERRORS:
+                    errors.append({"row": row, "error": str(e)})
+        products = valid
+        if products and not (atomic and failed):
+            inserted += await add_products_bulk(db, products)
+    if atomic and failed:
+        await db.rollback()
+        inserted = 0
+    else:
+        await db.commit()
+        invalidate_product_cache()
+    return {"inserted": inserted, "failed": failed, "errors": errors}
+
+def _format_import_error(error: Exception):
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(str(loc) for loc in e['loc'])}: {e['msg']}" for e in error.errors())
+    return str(error)
+
+# CATEGORY
+
+async def get_category_list(db: AsyncSession):
+    """
+    Get all product categories with their number of products.
+
+    Args:
+        db (AsyncSession): The async database session.
+
+    Returns:
+        List[Row]: The categories with their precomputed product_count, by name.
+    """
+    result = await db.execute(category_with_count().order_by(models.Category.name, models.Category.category_id))
+    return result.all()
+
+async def get_category_by_id(db: AsyncSession, category_id: int):
+    """
+    Retrieve a product category and its number of products.
+
+    Args:
+        db (AsyncSession): The async database session.
+        category_id (int): The category's unique identifier.
+
+    Returns:
+        Row: The category with its precomputed product_count, or None if it does not exist.
+    """
+    result = await db.execute(category_with_count().filter(models.Category.category_id == category_id))
+    return result.first()
+
+async def add_category(db: AsyncSession, category: schema.CategoryCreate):
+    """
+    Add a new product category to the database.
+
+    Args:
+        db (AsyncSession): The async database session.
+        category (schema.CategoryCreate): Category data for creation.
+
+    Returns:
+        models.Category: The created category.
+    """
+    db_category = models.Category(**category.dict())
+    db.add(db_category)
+    await db.commit()
+    await db.refresh(db_category)
+    return db_category
+
+async def delete_category(db: AsyncSession, category_id: int):
+    """
+    Delete a product category, unlinking its products.
+
+    Args:
+        db (AsyncSession): The async database session.
+        category_id (int): The category's unique identifier.
+    """
+    await db.execute(delete(models.ProductCategory).filter(models.ProductCategory.category_id == category_id))
+    await db.execute(delete(models.CategoryFacet).filter(models.CategoryFacet.category_id == category_id))
+    await db.execute(delete(models.Category).filter(models.Category.category_id == category_id))
+    await db.execute(catalog_version_bump(db))
+    await db.commit()
+    invalidate_product_cache()
+
+# CART
+
+async def get_cart_by_user_id(db: AsyncSession, user_id: int):
+    """
+    Retrieve a user's shopping cart.
+
+    Args:
+        db (AsyncSession): The async database session.
+        user_id (int): The user's unique identifier.
+
+    Returns:
+        List[models.Cart]: A list of items in the user's shopping cart.
+    """
+    result = await db.execute(select(models.Cart).filter(models.Cart.user_id == user_id))
+    return result.scalars().all()
+
+async def get_priced_cart(db: AsyncSession, user_id: int):
+    """
+    Retrieve a user's cart lines joined with their products and priced in SQL.
+
+    Lines whose product no longer exists are left out.
+
+    Args:
+        db (AsyncSession): The async database session.
+        user_id (int): The user's unique identifier.
+
+    Returns:
+        List[Row]: The cart lines with product name, price, image URL, line_total and the
+        cart_total repeated on every row.
+    """
+    line_total = models.Product.price * models.Cart.quantity
+    query = (
+        select(
+            models.Cart.cart_id,
+            models.Cart.product_id,
+            models.Cart.quantity,
+            models.Product.name,
+            models.Product.price,
+            models.Product.image_url,
+            line_total.label("line_total"),
+            func.sum(line_total).over().label("cart_total"),
+        )
+        .join(models.Product, models.Product.product_id == models.Cart.product_id)
+        .filter(models.Cart.user_id == user_id)
+        .order_by(models.Cart.cart_id)
+    )
+    result = await db.execute(query)
+    return result.all()
+
+async def add_product_to_cart(db: AsyncSession, cart: schema.CartCreate):
+    """
+    Add a product to a user's shopping cart in the database.
+
+    If the product is already in the cart its quantity is incremented in the same
+    statement, so a cart holds a single row per product.
+
+    Args:
+        db (AsyncSession): The async database session.
+        cart (schema.CartCreate): Cart item data for addition.
+
+    Returns:
+        Row: The cart line for the product, with its quantity after the addition.
+    """
+    result = await db.execute(cart_upsert(db, cart))
+    db_cart = result.one()
+    await db.commit()
+    return db_cart
+
+# ORDER
+
+async def create_order(db: AsyncSession, order: schema.OrderCreate):
+    """
+    Create a new order and add it to the database.
+
+    Args:
+        db (AsyncSession): The async database session.
+        order (schema.OrderCreate): Order data for creation.
+
+    Returns:
+        models.Order: The created order.
+    """
+    db_order = models.Order(**order.dict())
+    db.add(db_order)
+    await db.commit()
+    await db.refresh(db_order)
+    return db_order
+
+async def checkout_cart(db: AsyncSession, user_id: int, payment_id: int):
+    """
+    Convert a user's cart into an order in a single transaction.
+
+    The cart lines are locked and priced from the product table in one query, then
+    the order and all of its line items are inserted and the cart is cleared. The
+    number of statements does not depend on the number of cart lines.
+
+    Args:
+        db (AsyncSession): The async database session.
+        user_id (int): The user's unique identifier.
+        payment_id (int): The user's payment to link to the order.
+
+    Returns:
+        dict: The created order with its line items, or None if the cart is empty.
+
+    Raises:
+        ValueError: If the payment does not belong to the user.
+    """
+    result = await db.execute(
+        select(models.Payment.payment_id).filter(models.Payment.payment_id == payment_id, models.Payment.user_id == user_id)
+    )
+    if result.first() is None:
+        raise ValueError("Payment not found for this user")
+    result = await db.execute(
+        select(models.Cart.cart_id, models.Cart.product_id, models.Cart.quantity, models.Product.price)
+        .join(models.Product, models.Product.product_id == models.Cart.product_id)
+        .filter(models.Cart.user_id == user_id)
+        .with_for_update(of=models.Cart)
+    )
+    lines = result.all()
+    if not lines:
+        await db.rollback()
+        return None
+    result = await db.execute(
+        insert(models.Order)
+        .values(
+            user_id=user_id,
+            date=date.today().isoformat(),
+            total_cost=sum(line.price * line.quantity for line in lines),
+            payment_id=payment_id,
+            status_id=CHECKOUT_STATUS_ID,
+        )
+        .returning(*ORDER_COLUMNS)
+    )
+    order = result.one()
+    items = [
+        {"order_id": order.order_id, "product_id": line.product_id, "quantity": line.quantity, "unit_price": line.price}
+        for line in lines
+    ]
+    await db.execute(insert(models.OrderItem), items)
+    await db.execute(delete(models.Cart).filter(models.Cart.cart_id.in_([line.cart_id for line in lines])))
+    await db.commit()
+    return dict(order._asdict(), items=items)
+
+async def get_orders_list(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "order_id"):
+    """
+    Get a list of orders with optional offset or keyset pagination.
+
+    Args:
+        db (AsyncSession): The async database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of ORDER_SORT_COLUMNS.
+
+    Returns:
+        List[models.Order]: A list of orders.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    query = paginate(select(models.Order), ORDER_SORT_COLUMNS, models.Order.order_id, sort, skip=skip, limit=limit, cursor=cursor)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def get_order_rows(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "order_id"):
+    """
+    Get a page of orders as response dicts, without loading ORM objects.
+
+    Args:
+        db (AsyncSession): The async database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of ORDER_SORT_COLUMNS.
+
+    Returns:
+        List[dict]: The orders, shaped like schema.Order.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    query = paginate(select(*ORDER_COLUMNS), ORDER_SORT_COLUMNS, models.Order.order_id, sort, skip=skip, limit=limit, cursor=cursor)
+    return row_dicts(await db.execute(query), ORDER_FIELDS)
+
+async def stream_orders(db: AsyncSession, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Stream every order from a server-side cursor.
+
+    Args:
+        db (AsyncSession): The async database session.
+        batch_size (int): The number of rows fetched from the cursor at a time.
+
+    Returns:
+        AsyncResult: The order rows, ordered by order ID and fetched 'batch_size' at a time.
+    """
+    query = select(*models.Order.__table__.columns).order_by(models.Order.order_id)
+    return await db.stream(query.execution_options(yield_per=batch_size))
+
+async def get_orders_by_user_id(db: AsyncSession, user_id: int):
+    """
+    Retrieve a user's orders.
+
+    Args:
+        db (AsyncSession): The async database session.
+        user_id (int): The user's unique identifier.
+
+    Returns:
+        List[models.Order]: A list of orders belonging to the user.
+    """
+    result = await db.execute(select(models.Order).filter(models.Order.user_id == user_id))
+    return result.scalars().all()
+
+async def get_order_rows_by_user_id(db: AsyncSession, user_id: int):
+    """
+    Retrieve a user's orders as response dicts, without loading ORM objects.
+
+    Args:
+        db (AsyncSession): The async database session.
+        user_id (int): The user's unique identifier.
+
+    Returns:
+        List[dict]: The user's orders, shaped like schema.Order.
+    """
+    return row_dicts(await db.execute(select(*ORDER_COLUMNS).filter(models.Order.user_id == user_id)), ORDER_FIELDS)
+
+async def get_order_by_id(db: AsyncSession, order_id: int):
+    """
+    Retrieve an order by its unique identifier (ID).
+
+    Args:
+        db (AsyncSession): The async database session.
+        order_id (int): The order's unique identifier.
+
+    Returns:
+        models.Order: The order with the specified ID.
+    """
+    result = await db.execute(select(models.Order).filter(models.Order.order_id == order_id))
+    return result.scalars().first()
+
+async def update_order_status_by_id(db: AsyncSession, order_id: int, status_id: int):
+    """
+    Update the status of an order by its unique identifier (ID).
+
+    The order is updated and read back in one UPDATE ... RETURNING statement, and the
+    status name is taken from the in-memory order_status table.
+
+    Args:
+        db (AsyncSession): The async database session.
+        order_id (int): The order's unique identifier.
+        status_id (int): The new status to set for the order, see resolve_order_status.
+
+    Returns:
+        dict: The updated order, shaped like schema.OrderWithStatus, or None if not found.
+    """
+    result = await db.execute(
+        update(models.Order).where(models.Order.order_id == order_id).values(status_id=status_id).returning(*ORDER_COLUMNS)
+    )
+    row = result.first()
+    await db.commit()
+    return await order_with_status(db, row)
+
+async def order_with_status(db: AsyncSession, order):
+    """
+    Add the status name to an order.
+
+    Args:
+        db (AsyncSession): The async database session, used only if the order_status table must be reloaded.
+        order (models.Order | Row | None): The order.
+
+    Returns:
+        dict: The order shaped like schema.OrderWithStatus, or None if order is None. The
+        status name is None if the order's status_id is not in the order_status table.
+    """
+    if order is None:
+        return None
+    order = {field: getattr(order, field) for field in ORDER_FIELDS}
+    order["status"] = await get_order_status_name(db, order["status_id"])
+    return order
+
+# ORDER STATUS
+
+async def load_order_statuses(db: AsyncSession):
+    """
+    Load the order_status table into memory.
+
+    Args:
+        db (AsyncSession): The async database session.
+    """
+    result = await db.execute(select(models.OrderStatus.status_id, models.OrderStatus.status))
+    order_status_registry.replace(result.all())
+
+async def resolve_order_status(db: AsyncSession, status_id: int | None = None, status: str | None = None):
+    """
+    Look up an order status by ID or name in the in-memory order_status table.
+
+    The table is reloaded when it is older than ORDER_STATUS_TTL. A status missing from it
+    is looked up in the database before it is rejected, and reloads the table if found.
+
+    Args:
+        db (AsyncSession): The async database session.
+        status_id (int | None): The status ID.
+        status (str | None): The status name.
+
+    Returns:
+        tuple: The status ID and name.
+
+    Raises:
+        ValueError: If the status does not exist, or the ID and name name different statuses.
+    """
+    if order_status_registry.is_stale():
+        await load_order_statuses(db)
+    resolved = cached_order_status(status_id, status)
+    if resolved is None:
+        query = select(models.OrderStatus.status_id, models.OrderStatus.status)
+        if status_id is not None:
+            query = query.filter(models.OrderStatus.status_id == status_id)
+        if status is not None:
+            query = query.filter(models.OrderStatus.status == status)
+        resolved = (await db.execute(query.limit(1))).first()
+        if resolved is None:
+            raise ValueError("Order status not found")
+        await load_order_statuses(db)
+    return tuple(resolved)
+
+async def get_order_status_name(db: AsyncSession, status_id: int):
+    """
+    Look up the name of an order status in the in-memory order_status table.
+
+    The table is reloaded when it is older than ORDER_STATUS_TTL, or when the status is
+    not found and the table has not been reloaded for a few seconds.
+
+    Args:
+        db (AsyncSession): The async database session, used only if the table must be reloaded.
+        status_id (int): The status ID.
+
+    Returns:
+        str | None: The status name, or None if the status does not exist.
+    """
+    if order_status_registry.is_stale():
+        await load_order_statuses(db)
+    name = order_status_registry.name(status_id)
+    if name is None and order_status_registry.can_reload_on_miss():
+        await load_order_statuses(db)
+        name = order_status_registry.name(status_id)
+    return name
+
+async def get_order_statuses(db: AsyncSession):
+    """
+    Retrieve every order status from the in-memory order_status table.
+
+    Args:
+        db (AsyncSession): The async database session, used only if the table must be reloaded.
+
+    Returns:
+        List[dict]: The statuses, shaped like schema.OrderStatus.
+    """
+    if order_status_registry.is_stale():
+        await load_order_statuses(db)
+    return order_status_registry.all()
+
+async def add_order_status(db: AsyncSession, status: schema.OrderStatusCreate):
+    """
+    Add a new order status and reload the in-memory order_status table.
+
+    Args:
+        db (AsyncSession): The async database session.
+        status (schema.OrderStatusCreate): The order status data to be added.
+
+    Returns:
+        models.OrderStatus: The created order status.
+    """
+    db_status = models.OrderStatus(status=status.status)
+    db.add(db_status)
+    await db.commit()
+    await db.refresh(db_status)
+    await load_order_statuses(db)
+    return db_status
+
+# CUSTOMER SERVICE
+
+async def get_inquiries_by_id(db: AsyncSession, inquiry_id: int):
+    """
+    Retrieve a customer service inquiry by its unique identifier (ID).
+
+    Args:
+        db (AsyncSession): The async database session.
+        inquiry_id (int): The inquiry's unique identifier.
+
+    Returns:
+        models.CustomerService: The inquiry with the specified ID.
+    """
+    result = await db.execute(select(models.CustomerService).filter(models.CustomerService.inquiry_id == inquiry_id))
+    return result.scalars().first()
+
+async def get_inquiries_list(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "inquiry_id"):
+    """
+    Get a list of customer service inquiries with optional offset or keyset pagination.
+
+    Args:
+        db (AsyncSession): The async database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of INQUIRY_SORT_COLUMNS.
+
+    Returns:
+        List[models.CustomerService]: A list of customer service inquiries.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    query = paginate(select(models.CustomerService), INQUIRY_SORT_COLUMNS, models.CustomerService.inquiry_id, sort, skip=skip, limit=limit, cursor=cursor)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def get_inquiry_rows(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "inquiry_id"):
+    """
+    Get a page of customer service inquiries as response dicts, without loading ORM objects.
+
+    Args:
+        db (AsyncSession): The async database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of INQUIRY_SORT_COLUMNS.
+
+    Returns:
+        List[dict]: The inquiries, shaped like schema.CustomerService.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    query = paginate(select(*INQUIRY_COLUMNS), INQUIRY_SORT_COLUMNS, models.CustomerService.inquiry_id, sort, skip=skip, limit=limit, cursor=cursor)
+    return row_dicts(await db.execute(query), INQUIRY_FIELDS)
+
+async def stream_inquiries(db: AsyncSession, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Stream every customer service inquiry from a server-side cursor.
+
+    Args:
+        db (AsyncSession): The async database session.
+        batch_size (int): The number of rows fetched from the cursor at a time.
+
+    Returns:
+        AsyncResult: The inquiry rows, ordered by inquiry ID and fetched 'batch_size' at a time.
+    """
+    query = select(*models.CustomerService.__table__.columns).order_by(models.CustomerService.inquiry_id)
+    return await db.stream(query.execution_options(yield_per=batch_size))
+
+async def get_inquiries_by_user_id(db: AsyncSession, user_id: int):
+    """
+    Retrieve customer service inquiries for a specific user.
+
+    Args:
+        db (AsyncSession): The async database session.
+        user_id (int): The user's unique identifier.
+
+    Returns:
+        List[models.CustomerService]: A list of inquiries belonging to the user.
+    """
+    result = await db.execute(select(models.CustomerService).filter(models.CustomerService.user_id == user_id))
+    return result.scalars().all()
+
+async def add_inquiry(db: AsyncSession, inquiry: schema.CustomerServiceCreate):
+    """
+    Add a new customer service inquiry to the database.
+
+    Args:
+        db (AsyncSession): The async database session.
+        inquiry (schema.CustomerServiceCreate): Inquiry data for creation.
+
+    Returns:
+        models.CustomerService: The created inquiry.
+    """
+    db_inquiry = models.CustomerService(**inquiry.dict())
+    db.add(db_inquiry)
+    await db.commit()
+    await db.refresh(db_inquiry)
+    return db_inquiry
+
+async def add_inquiries(db: AsyncSession, inquiries: list[dict]):
+    """
+    Add a batch of customer service inquiries with a single multi-row insert.
+
+    Args:
+        db (AsyncSession): The async database session.
+        inquiries (List[dict]): The inquiries, as schema.CustomerServiceCreate dicts.
+
+    Returns:
+        int: The number of inquiries inserted.
+    """
+    result = await db.execute(inquiry_batch_insert(inquiries))
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,225 @@
+# Description: This file contains the in-process caches.
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from config import AUTH_CACHE_SIZE, AUTH_CACHE_TTL, ORDER_STATUS_TTL, PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL
+
+class TTLCache:
+    """
+    A bounded, thread-safe LRU cache whose entries also expire after a TTL.
+
+    Safe to share between the event loop and threadpool-run sync handlers. Each
+    worker process has its own copy, so the TTL bounds how stale a worker can be
+    after a write handled by another worker or replica.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Look up a key, refreshing its LRU position.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The cached value, or None if the key is missing or expired.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, version: int | None = None, ttl: float | None = None):
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key: The cache key.
+            value: The value to cache; None is never cached.
+            version (int | None): The cache version read before loading the value. If an
+                invalidation happened since, the value may be stale and is not stored.
+            ttl (float | None): Seconds the entry stays valid, defaults to the cache TTL.
+        """
+        if value is None:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """
+        Remove a single key.
+
+        Args:
+            key: The cache key.
+        """
+        with self._lock:
+            self.version += 1
+            self._data.pop(key, None)
+
+    def invalidate_matching(self, predicate):
+        """
+        Remove every entry whose value matches a predicate.
+
+        This scans the whole cache, so it is meant for rare events such as deleting a user.
+
+        Args:
+            predicate (Callable): Called with each cached value; matching entries are removed.
+        """
+        with self._lock:
+            self.version += 1
+            for key in [key for key, (value, _) in self._data.items() if predicate(value)]:
+                del self._data[key]
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        with self._lock:
+            self.version += 1
+            self._data.clear()
+
+    def stats(self):
+        """
+        Report the cache counters.
+
+        Returns:
+            dict: Current size, capacity and hit/miss/eviction counters.
+        """
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+class OrderStatusRegistry:
+    """
+    The whole order_status table, held in memory.
+
+    The table is tiny and almost never changes, so it is loaded at once and swapped in
+    wholesale; readers never see a partially loaded table. An empty load is not trusted:
+    the table stays stale until statuses are found, so statuses seeded after startup show
+    up at once. A read that misses may reload it, at most once per miss_interval seconds,
+    so orders referencing a status that does not exist cannot turn every read into a
+    reload. Safe to share between the event loop and threadpool-run sync handlers.
+    """
+    def __init__(self, ttl: float, miss_interval: float = 5):
+        self.ttl = ttl
+        self.miss_interval = miss_interval
+        self.loads = 0
+        # (names by ID, IDs by name), replaced as one tuple
+        self._table = ({}, {})
+        self._loaded_at = None
+
+    def replace(self, statuses):
+        """
+        Replace the table with freshly loaded statuses.
+
+        Args:
+            statuses (Iterable[tuple]): (status_id, status) pairs.
+        """
+        names = {status_id: status for status_id, status in statuses}
+        self._table = (names, {status: status_id for status_id, status in names.items()})
+        self._loaded_at = time.monotonic() if names else None
+        self.loads += 1
+
+    def is_stale(self):
+        """
+        Check whether the table must be (re)loaded.
+
+        Returns:
+            bool: Whether the table was never loaded, was empty or is older than the TTL.
+        """
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def can_reload_on_miss(self):
+        """
+        Check whether a lookup that missed may reload the table.
+
+        Returns:
+            bool: Whether the last load is at least miss_interval seconds old.
+        """
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.miss_interval
+
+    def name(self, status_id: int):
+        """
+        Look up a status name.
+
+        Args:
+            status_id (int): The status ID.
+
+        Returns:
+            str | None: The status name, or None if the ID is unknown.
+        """
+        return self._table[0].get(status_id)
+
+    def id(self, status: str):
+        """
+        Look up a status ID.
+
+        Args:
+            status (str): The status name.
+
+        Returns:
+            int | None: The status ID, or None if the name is unknown.
+        """
+        return self._table[1].get(status)
+
+    def all(self):
+        """
+        List every status.
+
+        Returns:
+            List[dict]: The statuses, as schema.OrderStatus dicts ordered by ID.
+        """
+        return [{"status": status, "status_id": status_id} for status_id, status in sorted(self._table[0].items())]
+
+# A cached product with the validators it was loaded at
+CachedProduct = namedtuple("CachedProduct", ["product", "version", "updated_at"])
+
+# A cached product list page with the catalog validators it was loaded at
+CachedProductPage = namedtuple("CachedProductPage", ["products", "version", "updated_at"])
+
+# Cached product facets with the catalog validators they were loaded at
+CachedFacets = namedtuple("CachedFacets", ["facets", "version", "updated_at"])
+
+# Products by ID, as CachedProduct
+product_cache = TTLCache(PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL)
+
+# Product list pages by (skip, limit, cursor, sort, category), as CachedProductPage, and
+# the facets under "facets", as CachedFacets
+product_list_cache = TTLCache(PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL)
+
+# Validated access tokens, as the schema.User they resolve to; entries never outlive the token
+token_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+# Users by username, as schema.User, so fresh tokens of a known user skip the database
+user_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+# The order_status table
+order_status_registry = OrderStatusRegistry(ORDER_STATUS_TTL)
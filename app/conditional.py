@@ -0,0 +1,96 @@
+# Description: This file contains the HTTP conditional request (ETag / Last-Modified) utilities.
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the parts that identify a representation.
+
+    Args:
+        *parts: Values that change whenever the representation changes, e.g. a version
+            number and the query parameters.
+
+    Returns:
+        str: A quoted, opaque entity tag.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+def is_conditional(request: Request):
+    """
+    Check whether a request carries conditional GET headers.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        bool: True if If-None-Match or If-Modified-Since is present.
+    """
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime | None):
+    """
+    Evaluate If-None-Match / If-Modified-Since against the current validators.
+
+    If-None-Match takes precedence over If-Modified-Since, as required by RFC 9110.
+
+    Args:
+        request (Request): The incoming request.
+        etag (str): The current entity tag.
+        last_modified (datetime | None): The current modification time, in UTC.
+
+    Returns:
+        bool: True if the client's copy is still current and a 304 can be sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+def set_validators(response: Response, etag: str, last_modified: datetime | None):
+    """
+    Set the ETag and Last-Modified headers on a response.
+
+    Args:
+        response (Response): The outgoing response.
+        etag (str): The current entity tag.
+        last_modified (datetime | None): The current modification time, in UTC.
+    """
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+
+def not_modified_response(etag: str, last_modified: datetime | None):
+    """
+    Build an empty 304 Not Modified response carrying the current validators.
+
+    Args:
+        etag (str): The current entity tag.
+        last_modified (datetime | None): The current modification time, in UTC.
+
+    Returns:
+        Response: The 304 response.
+    """
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
+
+def _as_utc(value: datetime):
+    # Timestamps are stored as naive UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
@@ -2,9 +2,182 @@
 # Date: 18/04/2023
 # Description: This file contains the CRUD utilities.
 
+import bisect
+import re
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, and_, cast, delete, func, insert, or_, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
-import models, schema
+from config import CHECKOUT_STATUS_ID, EXPORT_BATCH_SIZE, PRICE_FACET_BUCKETS, SEARCH_MAX_TERMS
+from app import models, schema
+from app.cache import (
+    CachedFacets, CachedProduct, CachedProductPage, order_status_registry, product_cache, product_list_cache, token_cache, user_cache,
+)
+from app.database import primary_session
+from app.pagination import decode_cursor, encode_cursor, paginate
+from app.serialization import row_dicts, schema_columns
+from app.singleflight import product_flight, product_page_flight, product_validator_flight
+
+# Columns each listing may be sorted (and keyset-paginated) by
+PRODUCT_SORT_COLUMNS = {
+    "product_id": models.Product.product_id,
+    "price": models.Product.price,
+    "name": models.Product.name,
+}
+
+ORDER_SORT_COLUMNS = {
+    "order_id": models.Order.order_id,
+    "date": models.Order.date,
+    "total_cost": models.Order.total_cost,
+}
+
+INQUIRY_SORT_COLUMNS = {
+    "inquiry_id": models.CustomerService.inquiry_id,
+    "date": models.CustomerService.date,
+}
+
+# Search ranks are scaled by this and rounded to integers, so relevance cursors seek exactly
+SEARCH_SCORE_SCALE = 1_000_000_000
+
+# Columns selected by the fast list paths, in response schema field order
+PRODUCT_FIELDS = list(schema.Product.__fields__)
+PRODUCT_COLUMNS = schema_columns(models.Product, schema.Product)
+ORDER_FIELDS = list(schema.Order.__fields__)
+ORDER_COLUMNS = schema_columns(models.Order, schema.Order)
+INQUIRY_FIELDS = list(schema.CustomerService.__fields__)
+INQUIRY_COLUMNS = schema_columns(models.CustomerService, schema.CustomerService)
+
+def dialect_insert(db, model):
+    """
+    Build an INSERT for the session's database dialect.
+
+    Dialect inserts support ON CONFLICT clauses, which the generic insert does not.
+
+    Args:
+        db (Session | AsyncSession): The database session.
+        model: The model or table to insert into.
+
+    Returns:
+        Insert: A PostgreSQL or SQLite insert statement for the model.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+def cart_upsert(db, cart: schema.CartCreate):
+    """
+    Build the statement that adds a product to a cart, merging with an existing line.
+
+    Args:
+        db (Session | AsyncSession): The database session.
+        cart (schema.CartCreate): Cart item data for addition.
+
+    Returns:
+        Insert: An INSERT ... ON CONFLICT (user_id, product_id) DO UPDATE that increments
+        the quantity and returns the resulting cart row.
+    """
+    cart_table = models.Cart.__table__
+    stmt = dialect_insert(db, cart_table).values(**cart.dict())
+    return stmt.on_conflict_do_update(
+        index_elements=[cart_table.c.user_id, cart_table.c.product_id],
+        set_={"quantity": cart_table.c.quantity + stmt.excluded.quantity},
+    ).returning(*cart_table.columns)
+
+def price_bucket(price: int | None):
+    """
+    Find the price bucket a price falls in.
+
+    Args:
+        price (int | None): The product price.
+
+    Returns:
+        int | None: The lower bound of the bucket, one of PRICE_FACET_BUCKETS, or None if
+        the price is missing or below the first bucket.
+    """
+    if price is None:
+        return None
+    index = bisect.bisect_right(PRICE_FACET_BUCKETS, price) - 1
+    return PRICE_FACET_BUCKETS[index] if index >= 0 else None
+
+def product_category_changes(db, product_id: int, before: tuple | None, after: tuple | None):
+    """
+    Build the statements that keep a product's category links and the facet counts in step with a product write.
+
+    Facet counts are adjusted by the difference between the product's state before and
+    after the write, so they stay exact without ever counting the catalog.
+
+    Args:
+        db (Session | AsyncSession): The database session.
+        product_id (int): The product's unique identifier.
+        before (tuple | None): The (price, category IDs) before the write, None for a new product.
+        after (tuple | None): The (price, category IDs) after the write, None for a deleted product.
+
+    Returns:
+        List[tuple]: (statement, parameters) pairs to execute in the same transaction as the product write.
+    """
+    old_price, old_categories = before or (None, set())
+    new_price, new_categories = after or (None, set())
+    statements = []
+    removed = old_categories - new_categories
+    added = new_categories - old_categories
+    if removed:
+        statements.append((
+            delete(models.ProductCategory).filter(models.ProductCategory.product_id == product_id, models.ProductCategory.category_id.in_(removed)),
+            None,
+        ))
+    if added:
+        statements.append((insert(models.ProductCategory), [{"product_id": product_id, "category_id": category_id} for category_id in added]))
+    category_deltas = dict.fromkeys(added, 1) | dict.fromkeys(removed, -1)
+    bucket_deltas = {}
+    if price_bucket(old_price) != price_bucket(new_price):
+        for bucket, delta in [(price_bucket(old_price), -1), (price_bucket(new_price), 1)]:
+            if bucket is not None:
+                bucket_deltas[bucket] = delta
+    return statements + facet_count_bumps(db, category_deltas, bucket_deltas)
+
+def facet_count_bumps(db, category_deltas: dict, bucket_deltas: dict):
+    """
+    Build the statements that adjust the precomputed facet counts.
+
+    Args:
+        db (Session | AsyncSession): The database session.
+        category_deltas (dict): Product count changes by category ID.
+        bucket_deltas (dict): Product count changes by price bucket lower bound.
+
+    Returns:
+        List[tuple]: (statement, parameters) pairs, one upsert per facet table with changes.
+    """
+    statements = []
+    for model, key, deltas in [
+        (models.CategoryFacet, "category_id", category_deltas),
+        (models.PriceBucketFacet, "min_price", bucket_deltas),
+    ]:
+        rows = [{key: value, "product_count": delta} for value, delta in sorted(deltas.items()) if delta]
+        if rows:
+            table = model.__table__
+            stmt = dialect_insert(db, table).values(rows)
+            statements.append((
+                stmt.on_conflict_do_update(index_elements=[table.c[key]], set_={"product_count": table.c.product_count + stmt.excluded.product_count}),
+                None,
+            ))
+    return statements
+
+def check_category_ids(category_ids: set, existing: set):
+    """
+    Check that a product's categories all exist.
+
+    Args:
+        category_ids (set): The requested category IDs.
+        existing (set): Those of them found in the database.
+
+    Raises:
+        ValueError: If some of the categories do not exist.
+    """
+    unknown = category_ids - existing
+    if unknown:
+        raise ValueError(f"Unknown category IDs: {', '.join(str(category_id) for category_id in sorted(unknown))}")
 
 # USER
 
@@ -47,18 +220,19 @@ def get_user_by_username(db: Session, username: str):
     """
     return db.query(models.User).filter(models.User.username == username).first()
 
-def create_user(db: Session, user: schema.UserCreate):
+def create_user(db: Session, user: schema.UserCreate, hashed_password: str):
     """
     Create a new user and add them to the database.
 
     Args:
         db (Session): The database session.
         user (schema.UserCreate): User data for creation.
+        hashed_password (str): The hash of user.password, which is never stored itself.
 
     Returns:
         models.User: The created user.
     """
-    db_user = models.User(**user.dict())
+    db_user = models.User(**user.dict(exclude={"password"}), password=hashed_password)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
@@ -74,22 +248,66 @@ def delete_user(db: Session, user_id: int):
     """
     db.query(models.User).filter(models.User.user_id == user_id).delete()
     db.commit()
+    invalidate_user_cache(user_id)
+
+def invalidate_user_cache(user_id: int):
+    """
+    Drop a user's cached record and every cached token that resolves to them.
+
+    Args:
+        user_id (int): The user's unique identifier.
+    """
+    user_cache.invalidate_matching(lambda user: user.user_id == user_id)
+    token_cache.invalidate_matching(lambda user: user.user_id == user_id)
 
 # PRODUCT
 
-def get_product_list(db: Session, skip: int = 0, limit: int = 100):
+def get_product_list(db: Session, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "product_id", category: int | None = None):
     """
-    Get a list of products with optional pagination.
+    Get a list of products with optional offset or keyset pagination.
 
     Args:
         db (Session): The database session.
-        skip (int): The number of items to skip for pagination.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
         limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of PRODUCT_SORT_COLUMNS.
+        category (int | None): Only return products in this category.
 
     Returns:
         List[models.Product]: A list of products.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    query = db.query(models.Product)
+    if category is not None:
+        query = query.join(models.ProductCategory).filter(models.ProductCategory.category_id == category)
+    return paginate(query, PRODUCT_SORT_COLUMNS, models.Product.product_id, sort, skip=skip, limit=limit, cursor=cursor).all()
+
+def get_product_rows(db: Session, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "product_id", category: int | None = None):
+    """
+    Get a page of products as response dicts, without loading ORM objects.
+
+    Args:
+        db (Session): The database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of PRODUCT_SORT_COLUMNS.
+        category (int | None): Only return products in this category.
+
+    Returns:
+        List[dict]: The products, shaped like schema.Product.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
     """
-    return db.query(models.Product).offset(skip).limit(limit).all()
+    query = select(*PRODUCT_COLUMNS)
+    if category is not None:
+        query = query.join(models.ProductCategory, models.ProductCategory.product_id == models.Product.product_id).filter(models.ProductCategory.category_id == category)
+    query = paginate(query, PRODUCT_SORT_COLUMNS, models.Product.product_id, sort, skip=skip, limit=limit, cursor=cursor)
+    return row_dicts(db.execute(query), PRODUCT_FIELDS)
 
 def get_product_by_id(db: Session, product_id: int):
     """
@@ -104,6 +322,405 @@ def get_product_by_id(db: Session, product_id: int):
     """
     return db.query(models.Product).filter(models.Product.product_id == product_id).first()
 
+def get_product_category_ids(db: Session, product_id: int):
+    """
+    Retrieve the IDs of the categories a product belongs to.
+
+    Args:
+        db (Session): The database session.
+        product_id (int): The product's unique identifier.
+
+    Returns:
+        Set[int]: The product's category IDs.
+    """
+    return set(db.scalars(select(models.ProductCategory.category_id).filter(models.ProductCategory.product_id == product_id)))
+
+def get_existing_category_ids(db: Session, category_ids: set):
+    """
+    Retrieve which of the given categories exist.
+
+    Args:
+        db (Session): The database session.
+        category_ids (set): The category IDs to look for.
+
+    Returns:
+        Set[int]: The category IDs found.
+    """
+    if not category_ids:
+        return set()
+    return set(db.scalars(select(models.Category.category_id).filter(models.Category.category_id.in_(category_ids))))
+
+def get_product_validator(db: Session, product_id: int):
+    """
+    Retrieve only the cache validators of a product.
+
+    Concurrent lookups of the same product share one query.
+
+    Args:
+        db (Session): The database session.
+        product_id (int): The product's unique identifier.
+
+    Returns:
+        Row: The product's version and updated_at, or None if it does not exist.
+    """
+    return product_validator_flight.do((product_id, product_cache.version), _load_product_validator, db, product_id)
+
+def _load_product_validator(db: Session, product_id: int):
+    return db.query(models.Product.version, models.Product.updated_at).filter(models.Product.product_id == product_id).first()
+
+def get_catalog_validator(db: Session):
+    """
+    Retrieve the catalog-wide cache validators.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        tuple: The catalog version and the time of the last product write (None before the first write).
+    """
+    row = db.query(models.CatalogVersion.version, models.CatalogVersion.updated_at).filter(models.CatalogVersion.catalog_id == 1).first()
+    return tuple(row) if row is not None else (0, None)
+
+def catalog_version_bump(db):
+    """
+    Build the statement that increments the catalog version.
+
+    Args:
+        db (Session | AsyncSession): The database session.
+
+    Returns:
+        Insert: An upsert of the single catalog_version row, to run in the same
+        transaction as the product write.
+    """
+    stmt = dialect_insert(db, models.CatalogVersion).values(catalog_id=1, version=1, updated_at=datetime.utcnow())
+    return stmt.on_conflict_do_update(
+        index_elements=[models.CatalogVersion.catalog_id],
+        set_={"version": models.CatalogVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+    )
+
+def get_cached_product_entry(db: Session, product_id: int, load: bool = True, use_cache: bool = True):
+    """
+    Retrieve a product and its validators through the in-process product cache.
+
+    Concurrent cache misses for the same product share one query, which always runs on
+    the primary so that a lagging replica never fills the cache.
+
+    Args:
+        db (Session): The database session.
+        product_id (int): The product's unique identifier.
+        load (bool): Whether to load the product from the database on a cache miss.
+        use_cache (bool): Whether to use the cache at all; if False the product is read from db.
+
+    Returns:
+        CachedProduct: The product with its version and updated_at, or None if it does not
+        exist (or is not cached and load is False).
+    """
+    if not use_cache:
+        return _product_entry(db, product_id) if load else None
+    entry = product_cache.get(product_id)
+    if entry is None and load:
+        version = product_cache.version
+        entry = product_flight.do((product_id, version), _load_product_entry, db, product_id, version)
+    return entry
+
+def _product_entry(db: Session, product_id: int):
+    db_product = get_product_by_id(db, product_id)
+    if db_product is None:
+        return None
+    return CachedProduct(schema.Product.from_orm(db_product), db_product.version, db_product.updated_at)
+
+def _load_product_entry(db: Session, product_id: int, version: int):
+    with primary_session(db) as primary:
+        entry = _product_entry(primary, product_id)
+    if entry is not None:
+        product_cache.set(product_id, entry, version=version)
+    return entry
+
+def get_cached_product(db: Session, product_id: int):
+    """
+    Retrieve a product by ID through the in-process product cache.
+
+    Args:
+        db (Session): The database session.
+        product_id (int): The product's unique identifier.
+
+    Returns:
+        schema.Product: The product with the specified ID, or None if it does not exist.
+    """
+    entry = get_cached_product_entry(db, product_id)
+    return entry.product if entry is not None else None
+
+def get_cached_product_page(db: Session, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "product_id", category: int | None = None, load: bool = True, use_cache: bool = True):
+    """
+    Get a page of products and the catalog validators through the in-process product list cache.
+
+    Concurrent cache misses for the same page share one load, which always runs on the
+    primary so that a lagging replica never fills the cache.
+
+    Args:
+        db (Session): The database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of PRODUCT_SORT_COLUMNS.
+        category (int | None): Only return products in this category.
+        load (bool): Whether to load the page from the database on a cache miss.
+        use_cache (bool): Whether to use the cache at all; if False the page is read from db.
+
+    Returns:
+        CachedProductPage: The products, as schema.Product-shaped dicts, with the catalog version
+        and updated_at, or None if the page is not cached and load is False.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    key = (skip, limit, cursor, sort, category)
+    if not use_cache:
+        return _product_page(db, key) if load else None
+    page = product_list_cache.get(key)
+    if page is None and load:
+        version = product_list_cache.version
+        page = product_page_flight.do((key, version), _load_product_page, db, key, version)
+    return page
+
+def _product_page(db: Session, key: tuple):
+    skip, limit, cursor, sort, category = key
+    catalog_version, updated_at = get_catalog_validator(db)
+    products = get_product_rows(db, skip=skip, limit=limit, cursor=cursor, sort=sort, category=category)
+    return CachedProductPage(products, catalog_version, updated_at)
+
+def _load_product_page(db: Session, key: tuple, version: int):
+    with primary_session(db) as primary:
+        page = _product_page(primary, key)
+    product_list_cache.set(key, page, version=version)
+    return page
+
+def get_cached_product_list(db: Session, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "product_id", category: int | None = None):
+    """
+    Get a page of products through the in-process product list cache.
+
+    Args:
+        db (Session): The database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of PRODUCT_SORT_COLUMNS.
+        category (int | None): Only return products in this category.
+
+    Returns:
+        List[dict]: A list of products, shaped like schema.Product.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    return get_cached_product_page(db, skip=skip, limit=limit, cursor=cursor, sort=sort, category=category).products
+
+def get_cached_products(db: Session, product_ids: list[int], use_cache: bool = True):
+    """
+    Retrieve several products through the in-process product cache.
+
+    Cached products are served from memory; all the others are loaded from the primary
+    with a single IN query and added to the cache.
+
+    Args:
+        db (Session): The database session.
+        product_ids (List[int]): The products' unique identifiers.
+        use_cache (bool): Whether to use the cache at all; if False all products are read from db.
+
+    Returns:
+        Dict[int, schema.Product]: The products found, keyed by product ID.
+    """
+    if not use_cache:
+        return {
+            db_product.product_id: schema.Product.from_orm(db_product)
+            for db_product in db.query(models.Product).filter(models.Product.product_id.in_(set(product_ids)))
+        }
+    products = {}
+    missing = []
+    for product_id in dict.fromkeys(product_ids):
+        entry = product_cache.get(product_id)
+        if entry is not None:
+            products[product_id] = entry.product
+        else:
+            missing.append(product_id)
+    if missing:
+        version = product_cache.version
+        with primary_session(db) as primary:
+            for db_product in primary.query(models.Product).filter(models.Product.product_id.in_(missing)):
+                entry = CachedProduct(schema.Product.from_orm(db_product), db_product.version, db_product.updated_at)
+                product_cache.set(db_product.product_id, entry, version=version)
+                products[db_product.product_id] = entry.product
+    return products
+
+def get_products_by_ids(db: Session, product_ids: list[int], use_cache: bool = True):
+    """
+    Retrieve several products in the order they were asked for.
+
+    Cached products are served from memory; all the others are loaded with a single
+    IN query. Repeated IDs are returned once, at their first position.
+
+    Args:
+        db (Session): The database session.
+        product_ids (List[int]): The products' unique identifiers.
+        use_cache (bool): Whether to use the product cache at all.
+
+    Returns:
+        tuple: The products found, as a list of schema.Product in request order, and
+        the list of IDs that do not exist.
+    """
+    found = get_cached_products(db, product_ids, use_cache=use_cache)
+    ordered = list(dict.fromkeys(product_ids))
+    return [found[product_id] for product_id in ordered if product_id in found], [product_id for product_id in ordered if product_id not in found]
+
+def get_product_facets(db: Session):
+    """
+    Get the number of products per category and per price bucket.
+
+    The counts are read from the precomputed facet tables; empty facets are left out.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        schema.ProductFacets: The category and price bucket facets.
+    """
+    categories = db.execute(
+        select(models.Category.category_id, models.Category.name, models.CategoryFacet.product_count)
+        .join(models.CategoryFacet)
+        .filter(models.CategoryFacet.product_count > 0)
+        .order_by(models.Category.name, models.Category.category_id)
+    ).all()
+    counts = dict(db.execute(
+        select(models.PriceBucketFacet.min_price, models.PriceBucketFacet.product_count)
+        .filter(models.PriceBucketFacet.product_count > 0)
+    ).all())
+    upper_bounds = PRICE_FACET_BUCKETS[1:] + [None]
+    return schema.ProductFacets(
+        categories=[schema.CategoryWithCount.from_orm(category) for category in categories],
+        price_buckets=[
+            schema.PriceBucket(min_price=min_price, max_price=max_price, product_count=counts[min_price])
+            for min_price, max_price in zip(PRICE_FACET_BUCKETS, upper_bounds) if counts.get(min_price)
+        ],
+    )
+
+def get_cached_product_facets(db: Session, load: bool = True, use_cache: bool = True):
+    """
+    Get the product facets and the catalog validators through the in-process product list cache.
+
+    Cache misses are loaded from the primary so that a lagging replica never fills the cache.
+
+    Args:
+        db (Session): The database session.
+        load (bool): Whether to load the facets from the database on a cache miss.
+        use_cache (bool): Whether to use the cache at all; if False the facets are read from db.
+
+    Returns:
+        CachedFacets: The facets with the catalog version and updated_at, or None if they
+        are not cached and load is False.
+    """
+    if not use_cache:
+        return _product_facets(db) if load else None
+    entry = product_list_cache.get("facets")
+    if entry is None and load:
+        version = product_list_cache.version
+        with primary_session(db) as primary:
+            entry = _product_facets(primary)
+        product_list_cache.set("facets", entry, version=version)
+    return entry
+
+def _product_facets(db: Session):
+    catalog_version, updated_at = get_catalog_validator(db)
+    return CachedFacets(get_product_facets(db), catalog_version, updated_at)
+
+def search_products(db: Session, q: str, limit: int = 20, cursor: str | None = None):
+    """
+    Full-text search over product names and descriptions, best matches first.
+
+    Every word of the query must match, the last characters of each word being
+    treated as a prefix ("run sho" matches "running shoes"). PostgreSQL uses the
+    ix_product_search GIN index and ts_rank_cd; SQLite uses the product_fts FTS5
+    table and bm25. Results are keyset-paginated on (score, product_id); the score is
+    the rank scaled by SEARCH_SCORE_SCALE and rounded to an integer, so the cursor
+    compares equal to the score recomputed by the next query.
+
+    Args:
+        db (Session): The database session.
+        q (str): The search text.
+        limit (int): The maximum number of results to return.
+        cursor (str | None): The cursor of the previous page of results.
+
+    Returns:
+        tuple: The matching products (List[Row] with an integer score column, higher is better)
+        and the cursor for the next page, or None if this was the last page.
+
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    query = search_products_query(db, q, limit, cursor)
+    if query is None:
+        return [], None
+    rows = db.execute(*query).all()
+    next_page = encode_cursor("relevance", rows[-1].score, rows[-1].product_id) if rows and len(rows) == limit else None
+    return rows, next_page
+
+def search_products_query(db, q: str, limit: int, cursor: str | None = None):
+    """
+    Build the statement that runs a product search, see search_products.
+
+    Args:
+        db (Session | AsyncSession): The database session.
+        q (str): The search text.
+        limit (int): The maximum number of results to return.
+        cursor (str | None): The cursor of the previous page of results.
+
+    Returns:
+        tuple: The statement and its parameters, or None if the search cannot match anything.
+
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    terms = re.findall(r"\w+", q.lower())[:SEARCH_MAX_TERMS]
+    if not terms or limit < 1:
+        return None
+    after = decode_cursor(cursor, "relevance", int) if cursor is not None else None
+    if db.get_bind().dialect.name == "sqlite":
+        return _search_products_fts5(terms, limit, after)
+    return _search_products_tsvector(terms, limit, after)
+
+def _search_products_tsvector(terms: list[str], limit: int, after: tuple | None):
+    query = func.to_tsquery(text("'english'"), " & ".join(f"{term}:*" for term in terms))
+    score = cast(func.round(func.ts_rank_cd(models.product_search_document(), query) * SEARCH_SCORE_SCALE), BigInteger)
+    stmt = select(*models.Product.__table__.columns, score.label("score")).filter(models.product_search_document().op("@@")(query))
+    if after is not None:
+        stmt = stmt.filter(or_(score < after[0], and_(score == after[0], models.Product.product_id > after[1])))
+    return stmt.order_by(score.desc(), models.Product.product_id).limit(limit), {}
+
+def _search_products_fts5(terms: list[str], limit: int, after: tuple | None):
+    # bm25 is lower for better matches; negate it so both backends sort by score descending
+    score = f"CAST(round(-bm25(product_fts) * {SEARCH_SCORE_SCALE}) AS INTEGER)"
+    keyset = f"AND ({score} < :score OR ({score} = :score AND product.product_id > :key))" if after else ""
+    stmt = text(
+        f"SELECT product.*, {score} AS score FROM product_fts "
+        "JOIN product ON product.product_id = product_fts.rowid "
+        f"WHERE product_fts MATCH :match {keyset} "
+        "ORDER BY score DESC, product.product_id LIMIT :limit"
+    )
+    params = {"match": " ".join(f'"{term}"*' for term in terms), "limit": limit}
+    if after:
+        params.update(score=after[0], key=after[1])
+    return stmt, params
+
+def invalidate_product_cache(product_id: int | None = None):
+    """
+    Drop cached product data after a catalog write.
+
+    Args:
+        product_id (int | None): The product that changed; list pages are always dropped.
+    """
+    if product_id is not None:
+        product_cache.invalidate(product_id)
+    product_list_cache.clear()
+
 def add_product(db: Session, product: schema.ProductCreate):
     """
     Add a new product to the database.
@@ -114,23 +731,148 @@ def add_product(db: Session, product: schema.ProductCreate):
 
     Returns:
         models.Product: The created product.
+
+    Raises:
+        ValueError: If some of the product's categories do not exist.
     """
-    db_product = models.Product(**product.dict())
+    category_ids = set(product.category_ids)
+    check_category_ids(category_ids, get_existing_category_ids(db, category_ids))
+    db_product = models.Product(**product.dict(exclude={"category_ids"}))
     db.add(db_product)
+    db.flush()
+    for stmt, params in product_category_changes(db, db_product.product_id, None, (db_product.price, category_ids)):
+        db.execute(stmt, params)
+    db.execute(catalog_version_bump(db))
     db.commit()
     db.refresh(db_product)
+    invalidate_product_cache(db_product.product_id)
     return db_product
 
+def update_product(db: Session, product: models.Product, product_update: schema.ProductUpdate):
+    """
+    Update an existing product in the database.
+
+    The product row is locked and re-read before its old price and categories are
+    taken, so concurrent writes to the same product apply their facet count changes
+    one after the other instead of from the same starting state.
+
+    Args:
+        db (Session): The database session.
+        product (models.Product): The product to update.
+        product_update (schema.ProductUpdate): The updated product data; fields it leaves out keep their values.
+
+    Returns:
+        models.Product: The updated product.
+
+    Raises:
+        ValueError: If some of the product's new categories do not exist.
+    """
+    db.refresh(product, with_for_update=True)
+    old_categories = get_product_category_ids(db, product.product_id)
+    new_categories = old_categories if product_update.category_ids is None else set(product_update.category_ids)
+    check_category_ids(new_categories - old_categories, get_existing_category_ids(db, new_categories - old_categories))
+    before = (product.price, old_categories)
+    for field, value in product_update.dict(exclude={"category_ids"}, exclude_unset=True).items():
+        setattr(product, field, value)
+    for stmt, params in product_category_changes(db, product.product_id, before, (product.price, new_categories)):
+        db.execute(stmt, params)
+    db.execute(catalog_version_bump(db))
+    db.commit()
+    db.refresh(product)
+    invalidate_product_cache(product.product_id)
+    return product
+
 def delete_product(db: Session, product_id: int):
     """
     Delete a product from the database.
 
+    The product row is locked before its price and categories are read, like in
+    update_product.
+
     Args:
         db (Session): The database session.
         product_id (int): The product's unique identifier.
     """
+    row = db.execute(select(models.Product.price).filter(models.Product.product_id == product_id).with_for_update()).first()
+    if row is None:
+        db.rollback()
+        return
+    before = (row.price, get_product_category_ids(db, product_id))
+    for stmt, params in product_category_changes(db, product_id, before, None):
+        db.execute(stmt, params)
     db.query(models.Product).filter(models.Product.product_id == product_id).delete()
+    db.execute(catalog_version_bump(db))
+    db.commit()
+    invalidate_product_cache(product_id)
+
+# CATEGORY
+
+def get_category_list(db: Session):
+    """
+    Get all product categories with their number of products.
+
+    Args:
+        db (Session): The database session.
+
+    Returns:
+        List[Row]: The categories with their precomputed product_count, by name.
+    """
+    return db.execute(category_with_count().order_by(models.Category.name, models.Category.category_id)).all()
+
+def get_category_by_id(db: Session, category_id: int):
+    """
+    Retrieve a product category and its number of products.
+
+    Args:
+        db (Session): The database session.
+        category_id (int): The category's unique identifier.
+
+    Returns:
+        Row: The category with its precomputed product_count, or None if it does not exist.
+    """
+    return db.execute(category_with_count().filter(models.Category.category_id == category_id)).first()
+
+def category_with_count():
+    """
+    Build the select of categories with their precomputed number of products.
+
+    Returns:
+        Select: The category_id, name and product_count of every category.
+    """
+    product_count = func.coalesce(models.CategoryFacet.product_count, 0).label("product_count")
+    return select(models.Category.category_id, models.Category.name, product_count).outerjoin(models.CategoryFacet)
+
+def add_category(db: Session, category: schema.CategoryCreate):
+    """
+    Add a new product category to the database.
+
+    Args:
+        db (Session): The database session.
+        category (schema.CategoryCreate): Category data for creation.
+
+    Returns:
+        models.Category: The created category.
+    """
+    db_category = models.Category(**category.dict())
+    db.add(db_category)
+    db.commit()
+    db.refresh(db_category)
+    return db_category
+
+def delete_category(db: Session, category_id: int):
+    """
+    Delete a product category, unlinking its products.
+
+    Args:
+        db (Session): The database session.
+        category_id (int): The category's unique identifier.
+    """
+    db.execute(delete(models.ProductCategory).filter(models.ProductCategory.category_id == category_id))
+    db.execute(delete(models.CategoryFacet).filter(models.CategoryFacet.category_id == category_id))
+    db.execute(delete(models.Category).filter(models.Category.category_id == category_id))
+    db.execute(catalog_version_bump(db))
     db.commit()
+    invalidate_product_cache()
 
 # CART
 
@@ -147,21 +889,54 @@ def get_cart_by_user_id(db: Session, user_id: int):
     """
     return db.query(models.Cart).filter(models.Cart.user_id == user_id).all()
 
+def get_priced_cart(db: Session, user_id: int):
+    """
+    Retrieve a user's cart lines joined with their products and priced in SQL.
+
+    Lines whose product no longer exists are left out.
+
+    Args:
+        db (Session): The database session.
+        user_id (int): The user's unique identifier.
+
+    Returns:
+        List[Row]: The cart lines with product name, price, image URL, line_total and the
+        cart_total repeated on every row.
+    """
+    line_total = models.Product.price * models.Cart.quantity
+    query = (
+        select(
+            models.Cart.cart_id,
+            models.Cart.product_id,
+            models.Cart.quantity,
+            models.Product.name,
+            models.Product.price,
+            models.Product.image_url,
+            line_total.label("line_total"),
+            func.sum(line_total).over().label("cart_total"),
+        )
+        .join(models.Product, models.Product.product_id == models.Cart.product_id)
+        .filter(models.Cart.user_id == user_id)
+        .order_by(models.Cart.cart_id)
+    )
+    return db.execute(query).all()
+
 def add_product_to_cart(db: Session, cart: schema.CartCreate):
     """
     Add a product to a user's shopping cart in the database.
 
+    If the product is already in the cart its quantity is incremented in the same
+    statement, so a cart holds a single row per product.
+
     Args:
         db (Session): The database session.
         cart (schema.CartCreate): Cart item data for addition.
 
     Returns:
-        models.Cart: The updated shopping cart, including the newly added product.
+        Row: The cart line for the product, with its quantity after the addition.
     """
-    db_cart = models.Cart(**cart.dict())
-    db.add(db_cart)
+    db_cart = db.execute(cart_upsert(db, cart)).one()
     db.commit()
-    db.refresh(db_cart)
     return db_cart
 
 # ORDER
@@ -183,19 +958,110 @@ def create_order(db: Session, order: schema.OrderCreate):
     db.refresh(db_order)
     return db_order
 
-def get_orders_list(db: Session, skip: int = 0, limit: int = 100):
+def checkout_cart(db: Session, user_id: int, payment_id: int):
     """
-    Get a list of orders with optional pagination.
+    Convert a user's cart into an order in a single transaction.
+
+    The cart lines are locked and priced from the product table in one query, then
+    the order and all of its line items are inserted and the cart is cleared. The
+    number of statements does not depend on the number of cart lines.
 
     Args:
         db (Session): The database session.
-        skip (int): The number of items to skip for pagination.
+        user_id (int): The user's unique identifier.
+        payment_id (int): The user's payment to link to the order.
+
+    Returns:
+        dict: The created order with its line items, or None if the cart is empty.
+
+    Raises:
+        ValueError: If the payment does not belong to the user.
+    """
+    payment = db.query(models.Payment.payment_id).filter(models.Payment.payment_id == payment_id, models.Payment.user_id == user_id).first()
+    if payment is None:
+        raise ValueError("Payment not found for this user")
+    lines = db.execute(
+        select(models.Cart.cart_id, models.Cart.product_id, models.Cart.quantity, models.Product.price)
+        .join(models.Product, models.Product.product_id == models.Cart.product_id)
+        .filter(models.Cart.user_id == user_id)
+        .with_for_update(of=models.Cart)
+    ).all()
+    if not lines:
+        db.rollback()
+        return None
+    order = db.execute(
+        insert(models.Order)
+        .values(
+            user_id=user_id,
+            date=date.today().isoformat(),
+            total_cost=sum(line.price * line.quantity for line in lines),
+            payment_id=payment_id,
+            status_id=CHECKOUT_STATUS_ID,
+        )
+        .returning(*ORDER_COLUMNS)
+    ).one()
+    items = [
+        {"order_id": order.order_id, "product_id": line.product_id, "quantity": line.quantity, "unit_price": line.price}
+        for line in lines
+    ]
+    db.execute(insert(models.OrderItem), items)
+    db.execute(delete(models.Cart).filter(models.Cart.cart_id.in_([line.cart_id for line in lines])))
+    db.commit()
+    return dict(order._asdict(), items=items)
+
+def get_orders_list(db: Session, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "order_id"):
+    """
+    Get a list of orders with optional offset or keyset pagination.
+
+    Args:
+        db (Session): The database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
         limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of ORDER_SORT_COLUMNS.
 
     Returns:
         List[models.Order]: A list of orders.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    query = db.query(models.Order)
+    return paginate(query, ORDER_SORT_COLUMNS, models.Order.order_id, sort, skip=skip, limit=limit, cursor=cursor).all()
+
+def get_order_rows(db: Session, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "order_id"):
+    """
+    Get a page of orders as response dicts, without loading ORM objects.
+
+    Args:
+        db (Session): The database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of ORDER_SORT_COLUMNS.
+
+    Returns:
+        List[dict]: The orders, shaped like schema.Order.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    query = paginate(select(*ORDER_COLUMNS), ORDER_SORT_COLUMNS, models.Order.order_id, sort, skip=skip, limit=limit, cursor=cursor)
+    return row_dicts(db.execute(query), ORDER_FIELDS)
+
+def stream_orders(db: Session, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Stream every order from a server-side cursor.
+
+    Args:
+        db (Session): The database session.
+        batch_size (int): The number of rows fetched from the cursor at a time.
+
+    Returns:
+        Result: The order rows, ordered by order ID and fetched 'batch_size' at a time.
     """
-    return db.query(models.Order).offset(skip).limit(limit).all()
+    query = select(*models.Order.__table__.columns).order_by(models.Order.order_id)
+    return db.execute(query.execution_options(yield_per=batch_size))
 
 def get_orders_by_user_id(db: Session, user_id: int):
     """
@@ -210,6 +1076,19 @@ def get_orders_by_user_id(db: Session, user_id: int):
     """
     return db.query(models.Order).filter(models.Order.user_id == user_id).all()
 
+def get_order_rows_by_user_id(db: Session, user_id: int):
+    """
+    Retrieve a user's orders as response dicts, without loading ORM objects.
+
+    Args:
+        db (Session): The database session.
+        user_id (int): The user's unique identifier.
+
+    Returns:
+        List[dict]: The user's orders, shaped like schema.Order.
+    """
+    return row_dicts(db.execute(select(*ORDER_COLUMNS).filter(models.Order.user_id == user_id)), ORDER_FIELDS)
+
 def get_order_by_id(db: Session, order_id: int):
     """
     Retrieve an order by its unique identifier (ID).
@@ -227,20 +1106,172 @@ def update_order_status_by_id(db: Session, order_id: int, status_id: int):
     """
     Update the status of an order by its unique identifier (ID).
 
+    The order is updated and read back in one UPDATE ... RETURNING statement, and the
+    status name is taken from the in-memory order_status table.
+
     Args:
         db (Session): The database session.
         order_id (int): The order's unique identifier.
-        status_id (int): The new status to set for the order.
+        status_id (int): The new status to set for the order, see resolve_order_status.
 
     Returns:
-        models.Order: The updated order.
+        dict: The updated order, shaped like schema.OrderWithStatus, or None if not found.
     """
-    db.query(models.Order).filter(models.Order.order_id == order_id).update({models.Order.status_id: status_id})
+    row = db.execute(
+        update(models.Order).where(models.Order.order_id == order_id).values(status_id=status_id).returning(*ORDER_COLUMNS)
+    ).first()
     db.commit()
-    return db.query(models.Order).filter(models.Order.order_id == order_id).first()
+    return order_with_status(db, row)
+
+def order_with_status(db: Session, order):
+    """
+    Add the status name to an order.
+
+    Args:
+        db (Session): The database session, used only if the order_status table must be reloaded.
+        order (models.Order | Row | None): The order.
+
+    Returns:
+        dict: The order shaped like schema.OrderWithStatus, or None if order is None. The
+        status name is None if the order's status_id is not in the order_status table.
+    """
+    if order is None:
+        return None
+    order = {field: getattr(order, field) for field in ORDER_FIELDS}
+    order["status"] = get_order_status_name(db, order["status_id"])
+    return order
+
+# ORDER STATUS
+
+def load_order_statuses(db: Session):
+    """
+    Load the order_status table into memory.
+
+    Args:
+        db (Session): The database session.
+    """
+    order_status_registry.replace(db.execute(select(models.OrderStatus.status_id, models.OrderStatus.status)).all())
+
+def resolve_order_status(db: Session, status_id: int | None = None, status: str | None = None):
+    """
+    Look up an order status by ID or name in the in-memory order_status table.
+
+    The table is reloaded when it is older than ORDER_STATUS_TTL. A status missing from it
+    is looked up in the database before it is rejected, and reloads the table if found, so
+    statuses added by other workers or directly in the database are accepted at once.
+
+    Args:
+        db (Session): The database session.
+        status_id (int | None): The status ID.
+        status (str | None): The status name.
+
+    Returns:
+        tuple: The status ID and name.
+
+    Raises:
+        ValueError: If the status does not exist, or the ID and name name different statuses.
+    """
+    if order_status_registry.is_stale():
+        load_order_statuses(db)
+    resolved = cached_order_status(status_id, status)
+    if resolved is None:
+        query = select(models.OrderStatus.status_id, models.OrderStatus.status)
+        if status_id is not None:
+            query = query.filter(models.OrderStatus.status_id == status_id)
+        if status is not None:
+            query = query.filter(models.OrderStatus.status == status)
+        resolved = db.execute(query.limit(1)).first()
+        if resolved is None:
+            raise ValueError("Order status not found")
+        load_order_statuses(db)
+    return tuple(resolved)
+
+def get_order_status_name(db: Session, status_id: int):
+    """
+    Look up the name of an order status in the in-memory order_status table.
+
+    The table is reloaded when it is older than ORDER_STATUS_TTL, or when the status is
+    not found and the table has not been reloaded for a few seconds. Never fails.
+
+    Args:
+        db (Session): The database session, used only if the table must be reloaded.
+        status_id (int): The status ID.
+
+    Returns:
+        str | None: The status name, or None if the status does not exist.
+    """
+    if order_status_registry.is_stale():
+        load_order_statuses(db)
+    name = order_status_registry.name(status_id)
+    if name is None and order_status_registry.can_reload_on_miss():
+        load_order_statuses(db)
+        name = order_status_registry.name(status_id)
+    return name
+
+def cached_order_status(status_id: int | None, status: str | None):
+    """
+    Look up an order status by ID or name in the in-memory order_status table only.
+
+    Args:
+        status_id (int | None): The status ID.
+        status (str | None): The status name.
+
+    Returns:
+        tuple: The status ID and name, or None if not found or the ID and name do not match.
+    """
+    if status_id is None:
+        status_id = order_status_registry.id(status)
+    name = order_status_registry.name(status_id)
+    if name is None or (status is not None and status != name):
+        return None
+    return status_id, name
+
+def get_order_statuses(db: Session):
+    """
+    Retrieve every order status from the in-memory order_status table.
+
+    Args:
+        db (Session): The database session, used only if the table must be reloaded.
+
+    Returns:
+        List[dict]: The statuses, shaped like schema.OrderStatus.
+    """
+    if order_status_registry.is_stale():
+        load_order_statuses(db)
+    return order_status_registry.all()
+
+def add_order_status(db: Session, status: schema.OrderStatusCreate):
+    """
+    Add a new order status and reload the in-memory order_status table.
+
+    Args:
+        db (Session): The database session.
+        status (schema.OrderStatusCreate): The order status data to be added.
+
+    Returns:
+        models.OrderStatus: The created order status.
+    """
+    db_status = models.OrderStatus(status=status.status)
+    db.add(db_status)
+    db.commit()
+    db.refresh(db_status)
+    load_order_statuses(db)
+    return db_status
 
 # CUSTOMER SERVICE
 
+def inquiry_batch_insert(inquiries: list[dict]):
+    """
+    Build the multi-row insert that writes a batch of queued inquiries.
+
+    Args:
+        inquiries (List[dict]): The inquiries, as schema.CustomerServiceCreate dicts.
+
+    Returns:
+        Insert: The insert statement.
+    """
+    return insert(models.CustomerService).values(inquiries)
+
 def get_inquiries_by_id(db: Session, inquiry_id: int):
     """
     Retrieve a customer service inquiry by its unique identifier (ID).
@@ -254,19 +1285,59 @@ def get_inquiries_by_id(db: Session, inquiry_id: int):
     """
     return db.query(models.CustomerService).filter(models.CustomerService.inquiry_id == inquiry_id).first()
 
-def get_inquiries_list(db: Session, skip: int = 0, limit: int = 100):
+def get_inquiries_list(db: Session, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "inquiry_id"):
     """
-    Get a list of customer service inquiries with optional pagination.
+    Get a list of customer service inquiries with optional offset or keyset pagination.
 
     Args:
         db (Session): The database session.
-        skip (int): The number of items to skip for pagination.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
         limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of INQUIRY_SORT_COLUMNS.
 
     Returns:
         List[models.CustomerService]: A list of customer service inquiries.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    query = db.query(models.CustomerService)
+    return paginate(query, INQUIRY_SORT_COLUMNS, models.CustomerService.inquiry_id, sort, skip=skip, limit=limit, cursor=cursor).all()
+
+def get_inquiry_rows(db: Session, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "inquiry_id"):
+    """
+    Get a page of customer service inquiries as response dicts, without loading ORM objects.
+
+    Args:
+        db (Session): The database session.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The cursor of the previous page, for keyset pagination.
+        sort (str): The column to sort by, one of INQUIRY_SORT_COLUMNS.
+
+    Returns:
+        List[dict]: The inquiries, shaped like schema.CustomerService.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    query = paginate(select(*INQUIRY_COLUMNS), INQUIRY_SORT_COLUMNS, models.CustomerService.inquiry_id, sort, skip=skip, limit=limit, cursor=cursor)
+    return row_dicts(db.execute(query), INQUIRY_FIELDS)
+
+def stream_inquiries(db: Session, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Stream every customer service inquiry from a server-side cursor.
+
+    Args:
+        db (Session): The database session.
+        batch_size (int): The number of rows fetched from the cursor at a time.
+
+    Returns:
+        Result: The inquiry rows, ordered by inquiry ID and fetched 'batch_size' at a time.
     """
-    return db.query(models.CustomerService).offset(skip).limit(limit).all()
+    query = select(*models.CustomerService.__table__.columns).order_by(models.CustomerService.inquiry_id)
+    return db.execute(query.execution_options(yield_per=batch_size))
 
 def get_inquiries_by_user_id(db: Session, user_id: int):
     """
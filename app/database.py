@@ -1,17 +1,85 @@
 # Import necessary modules
+from contextlib import contextmanager
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from config import POSTGRES_URL
+from fastapi import Request
+from config import POSTGRES_URL, POSTGRES_REPLICA_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_PRE_PING, DB_POOL_RECYCLE, QUERY_PROFILER_ENABLED
+from app.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from app.profiler import install_query_profiler
+from app.read_your_writes import reads_from_primary
+
+# Async drivers used for each sync dialect in POSTGRES_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_url(url: str):
+    """
+    Derive the async driver URL from a sync database URL.
+
+    Args:
+        url (str): The sync database URL, e.g. "postgresql://...".
+
+    Returns:
+        URL: The same URL using the matching async driver, e.g. "postgresql+asyncpg://...".
+    """
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+# Connection pool settings shared by both engines; each engine (and each worker
+# process) gets its own pool, so size these per worker, not per deployment
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+    "pool_recycle": DB_POOL_RECYCLE,
+}
 
 # Create an engine for PostgreSQL
 engine = create_engine(
-    POSTGRES_URL
+    POSTGRES_URL,
+    poolclass=InstrumentedQueuePool,
+    **POOL_OPTIONS
+)
+
+# Create an engine for the read replica, used by read-only endpoints; without a replica
+# reads share the primary engine and its pool
+replica_engine = create_engine(
+    POSTGRES_REPLICA_URL,
+    poolclass=InstrumentedQueuePool,
+    **POOL_OPTIONS
+) if POSTGRES_REPLICA_URL else engine
+
+# Create an async engine for PostgreSQL, used by the async endpoints
+async_engine = create_async_engine(
+    get_async_url(POSTGRES_URL),
+    poolclass=InstrumentedAsyncQueuePool,
+    **POOL_OPTIONS
 )
 
+# Attach the opt-in query profiler (slow-query log and N+1 detection) to both engines
+if QUERY_PROFILER_ENABLED:
+    install_query_profiler(engine)
+    install_query_profiler(async_engine.sync_engine)
+    if replica_engine is not engine:
+        install_query_profiler(replica_engine)
+
 # Create an instance of the sessionmaker class to serve as a factory for new Session objects
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create a factory for read-only Session objects on the replica
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+# Create a factory for new AsyncSession objects; expire_on_commit is disabled so
+# returned objects can still be read after commit without an implicit (blocking) refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Create a base class for other schemas
 Base = declarative_base()
 
@@ -19,7 +87,7 @@ def get_db():
     """
     Dependency function to obtain a database session for use in endpoints.
 
-    This function provides a database session to endpoints that require database access. 
+    This function provides a database session to endpoints that require database access.
     The 'yield' statement is used to generate a context manager, and the session is returned to the caller.
     The session will be automatically closed when it's no longer needed.
 
@@ -30,4 +98,57 @@ def get_db():
     try:
         yield db  # Yield a database session
     finally:
-        db.close()  # Close the session when it's no longer needed
\ No newline at end of file
+        db.close()  # Close the session when it's no longer needed
+
+def get_read_db(request: Request):
+    """
+    Dependency function to obtain a database session for read-only endpoints.
+
+    The session reads from the replica (POSTGRES_REPLICA_URL), which may lag behind the
+    primary. Within READ_YOUR_WRITES_SECONDS of a write by the same client the session
+    reads from the primary instead, so clients always see their own writes.
+
+    Args:
+        request (Request): The request, used to read the read-your-writes cookie.
+
+    Yields:
+        Session: A SQLAlchemy database session on the replica or the primary.
+    """
+    db = SessionLocal() if reads_from_primary(request) else ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@contextmanager
+def primary_session(db):
+    """
+    Get a session on the primary for loads whose results are cached across requests.
+
+    A replica may lag behind the primary, so values read from it must not be stored
+    in the per-process caches, where they would outlive the invalidation of a newer write.
+
+    Args:
+        db (Session): The request's database session.
+
+    Yields:
+        Session: db itself if it already reads from the primary, otherwise a new primary session.
+    """
+    if db.get_bind() is engine:
+        yield db
+    else:
+        with SessionLocal() as primary:
+            yield primary
+
+async def get_async_db():
+    """
+    Dependency function to obtain an async database session for use in endpoints.
+
+    This is the async counterpart of get_db, for use in 'async def' endpoints so that
+    database round-trips do not block the event loop.
+
+    Yields:
+        AsyncSession: A SQLAlchemy async database session.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db  # Yield an async database session, closed when the block exits
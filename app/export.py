@@ -0,0 +1,64 @@
+# Description: This file contains the streaming NDJSON/CSV export utilities.
+
+import csv
+import io
+import json
+
+from app.database import ReplicaSessionLocal
+
+# Media type of each export format
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Bytes buffered before a chunk is sent to the client
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def iter_export(rows, columns: list[str], format: str):
+    """
+    Encode rows as NDJSON or CSV, yielding the output in chunks.
+
+    Args:
+        rows (Iterable[tuple]): The rows to encode, in column order.
+        columns (List[str]): The column names.
+        format (str): "ndjson" or "csv".
+
+    Yields:
+        bytes: Chunks of roughly EXPORT_CHUNK_SIZE bytes.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == "csv":
+        writer.writerow(columns)
+    for row in rows:
+        if format == "csv":
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(dict(zip(columns, row)), default=str))
+            buffer.write("\n")
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def export_rows(load_rows, format: str):
+    """
+    Stream the result of a query as NDJSON or CSV from its own session.
+
+    The session lives as long as the response body is being sent, so rows are
+    fetched from the server-side cursor only as fast as the client reads them.
+    Exports are long full scans, so they always read from the replica.
+
+    Args:
+        load_rows (Callable[[Session], Result]): Runs the streaming query on a session.
+        format (str): "ndjson" or "csv".
+
+    Yields:
+        bytes: Chunks of the encoded export.
+    """
+    with ReplicaSessionLocal() as db:
+        result = load_rows(db)
+        yield from iter_export(result, list(result.keys()), format)
@@ -0,0 +1,104 @@
+# Description: This file contains the streaming NDJSON/CSV ingestion utilities.
+
+import codecs
+import csv
+import json
+from typing import AsyncIterator
+
+async def iter_lines(stream: AsyncIterator[bytes]):
+    """
+    Split a byte stream into text lines as it arrives.
+
+    Args:
+        stream (AsyncIterator[bytes]): The request body stream.
+
+    Yields:
+        str: Each line, without its line terminator.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in stream:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+async def iter_ndjson_records(stream: AsyncIterator[bytes]):
+    """
+    Parse an NDJSON body one record at a time.
+
+    Args:
+        stream (AsyncIterator[bytes]): The request body stream.
+
+    Yields:
+        tuple: (row number, parsed object or the ValueError raised while parsing it). Blank
+        lines are skipped but still counted.
+    """
+    row = 0
+    async for line in iter_lines(stream):
+        row += 1
+        if not line.strip():
+            continue
+        try:
+            yield row, json.loads(line)
+        except ValueError as e:
+            yield row, e
+
+async def iter_csv_records(stream: AsyncIterator[bytes]):
+    """
+    Parse a CSV body with a header row one record at a time.
+
+    Quoted fields may span lines; lines are buffered until their quotes balance.
+
+    Args:
+        stream (AsyncIterator[bytes]): The request body stream.
+
+    Yields:
+        tuple: (row number, dict keyed by the header columns or the ValueError for a malformed
+        row). Row numbers count data rows, starting at 1 after the header.
+    """
+    header = None
+    pending = []
+    row = 0
+    async for line in iter_lines(stream):
+        pending.append(line)
+        record = "\n".join(pending)
+        if record.count('"') % 2:
+            continue
+        pending = []
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield row, dict(zip(header, values))
+    if pending:
+        yield row + 1, ValueError("Unterminated quoted field")
+
+async def iter_batches(records: AsyncIterator, size: int):
+    """
+    Group an async stream of items into lists.
+
+    Args:
+        records (AsyncIterator): The items to group.
+        size (int): The maximum number of items per batch.
+
+    Yields:
+        list: Consecutive batches of at most 'size' items.
+    """
+    batch = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
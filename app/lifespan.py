@@ -0,0 +1,154 @@
+# Description: This file contains the application lifespan: schema initialization at startup,
+# the readiness state reported by /health/ready, and closing the connection pools at shutdown.
+#
+# Importing the app never touches the database; connections are opened on first use. To
+# create the schema as a separate migration step (e.g. a Kubernetes Job), set
+# DB_INIT_SCHEMA=false for the app and run:
+#   python -m app.lifespan
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+
+from config import DB_INIT_RETRY_INTERVAL, DB_INIT_SCHEMA, DB_INIT_WAIT, DB_READY_TIMEOUT, INQUIRY_WRITE_BEHIND
+from app import async_crud, models
+from app.database import AsyncSessionLocal, async_engine, engine, replica_engine
+from app.rate_limit import rate_limiter
+from app.write_behind import inquiry_writer
+
+logger = logging.getLogger(__name__)
+
+class Readiness:
+    """
+    The startup state of this worker process.
+    """
+    def __init__(self):
+        self.schema_ready = False
+        self.started_at = time.perf_counter()
+        self.ready_after = None
+        self.error = None
+
+    def mark_ready(self):
+        self.schema_ready = True
+        self.error = None
+        self.ready_after = time.perf_counter() - self.started_at
+
+readiness = Readiness()
+
+def init_db(bind=engine):
+    """
+    Create every missing table, index and trigger.
+
+    Existing tables are left untouched, so this is safe to run on every deploy.
+
+    Args:
+        bind (Engine): The engine to create the schema with.
+    """
+    models.Base.metadata.create_all(bind=bind)
+
+async def init_db_with_retry():
+    """
+    Create the schema through the async engine, retrying while the database is unreachable.
+
+    Replicas starting together may race to create the same tables; the loser fails and
+    finds them present on its next attempt.
+    """
+    while True:
+        try:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(models.Base.metadata.create_all)
+        except Exception as e:
+            # Only the exception type is reported by /health/ready; the log has the details
+            readiness.error = f"schema initialization failed: {type(e).__name__}"
+            logger.warning("Schema initialization failed, retrying in %.1f s: %s: %s", DB_INIT_RETRY_INTERVAL, type(e).__name__, e)
+            await asyncio.sleep(DB_INIT_RETRY_INTERVAL)
+        else:
+            readiness.mark_ready()
+            return
+
+async def check_ready():
+    """
+    Check whether this worker can serve traffic.
+
+    Returns:
+        str | None: None if the schema is initialized and the database (and the read
+        replica, if any) answers within DB_READY_TIMEOUT, otherwise the reason the worker
+        is not ready.
+    """
+    if not readiness.schema_ready:
+        return readiness.error or "schema initialization in progress"
+    try:
+        async with asyncio.timeout(DB_READY_TIMEOUT):
+            async with async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        return f"database unavailable: {type(e).__name__}"
+    if replica_engine is not engine:
+        try:
+            # The replica only has a sync engine, so ping it off the event loop
+            await asyncio.wait_for(asyncio.to_thread(_ping, replica_engine), DB_READY_TIMEOUT)
+        except Exception as e:
+            return f"read replica unavailable: {type(e).__name__}"
+    return None
+
+async def preload_order_statuses():
+    """
+    Load the order_status table into memory, so the first status update skips it.
+
+    Best effort: on failure the table is loaded on first use instead.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            await async_crud.load_order_statuses(db)
+    except Exception as e:
+        logger.warning("Preloading order statuses failed: %s: %s", type(e).__name__, e)
+
+def _ping(bind):
+    with bind.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Run the startup and shutdown steps of the application.
+
+    At startup the schema is initialized if DB_INIT_SCHEMA is set. Startup waits at most
+    DB_INIT_WAIT seconds for it, so a slow database delays readiness instead of failing
+    the process; initialization keeps retrying in the background meanwhile. Once the
+    schema is ready the order_status table is preloaded. With
+    INQUIRY_WRITE_BEHIND set, the inquiry batch writer runs for the app's lifetime and
+    writes everything still queued at shutdown, before the connection pools are closed.
+
+    Args:
+        app (FastAPI): The application.
+    """
+    readiness.started_at = time.perf_counter()
+    task = None
+    if DB_INIT_SCHEMA:
+        task = asyncio.create_task(init_db_with_retry())
+        await asyncio.wait([task], timeout=DB_INIT_WAIT)
+    else:
+        readiness.mark_ready()
+    if readiness.schema_ready:
+        await preload_order_statuses()
+    if INQUIRY_WRITE_BEHIND:
+        inquiry_writer.start()
+    try:
+        yield
+    finally:
+        if task is not None and not task.done():
+            task.cancel()
+        await inquiry_writer.stop()
+        await rate_limiter.close()
+        await async_engine.dispose()
+        engine.dispose()
+        if replica_engine is not engine:
+            replica_engine.dispose()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    logger.info("Schema initialized")
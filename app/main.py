@@ -1,16 +1,38 @@
 from fastapi import Depends, FastAPI
-from config import DEBUG
+from config import DEBUG, QUERY_PROFILER_ENABLED, RATE_LIMIT_ENABLED, READ_YOUR_WRITES_SECONDS
 
 # Updated import paths for routers
-from app.routers import cart, products, orders, inquiries, items, token, users
+from app.lifespan import lifespan
+from app.metrics import MetricsMiddleware
+from app.profiler import QueryProfilerMiddleware
+from app.rate_limit import RateLimitMiddleware
+from app.read_your_writes import ReadYourWritesMiddleware
+from app.routers import cart, categories, products, orders, inquiries, items, token, users, health, metrics
 
 app = FastAPI(
     debug=DEBUG,
     title="FastAPI Demo",
     description="A demo of the FastAPI framework",
-    version="1.0.0"
+    version="1.0.0",
+    # Schema initialization at startup and closing the connection pools at shutdown
+    lifespan=lifespan
 )
 
+# Record per-route latency, size and database metrics for every request
+app.add_middleware(MetricsMiddleware)
+
+# Collect each request's statements for the N+1 detector and the X-Query-Summary header
+if QUERY_PROFILER_ENABLED:
+    app.add_middleware(QueryProfilerMiddleware)
+
+# Send each client's reads to the primary for a short window after it writes
+if READ_YOUR_WRITES_SECONDS > 0:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Reject requests over their route's rate limit; added last so it runs first and a rejection costs no other work
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # Documentation for the overall FastAPI app
 """
 This FastAPI application serves as the backend for your project. It includes various routers
@@ -26,6 +48,14 @@ Router for managing product-related endpoints.
 - tags: Products
 """
 
+app.include_router(categories.router)
+"""
+Router for managing product categories.
+
+- prefix: /categories
+- tags: Categories
+"""
+
 app.include_router(cart.router)
 """
 Router for managing shopping cart-related endpoints.
@@ -65,3 +95,27 @@ Router for handling authentication and token-related endpoints.
 - prefix: /token
 - tags: Token
 """
+
+app.include_router(users.router)
+"""
+Router for managing user accounts.
+
+- prefix: /users
+- tags: Users
+"""
+
+app.include_router(health.router)
+"""
+Router for health and runtime metrics endpoints.
+
+- prefix: /health
+- tags: Health
+"""
+
+app.include_router(metrics.router)
+"""
+Router for the Prometheus metrics endpoint.
+
+- path: /metrics
+- tags: Metrics
+"""
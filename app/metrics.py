@@ -0,0 +1,127 @@
+# Description: This file contains the Prometheus metrics and the middleware that records them.
+# With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory
+# before starting the server so every worker writes its samples there and /metrics reports
+# the sum across workers.
+
+import os
+import time
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Route label of requests that matched no route, so unknown paths cannot blow up the label set
+UNMATCHED_ROUTE = "<unmatched>"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+REQUESTS = Counter("http_requests_total", "HTTP requests handled.", ["method", "route", "status"])
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency.", ["method", "route"], buckets=LATENCY_BUCKETS)
+# The route is only known once the router has matched the request, so requests in progress are counted per method
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being handled.", ["method"], multiprocess_mode="livesum")
+REQUEST_SIZE = Histogram("http_request_size_bytes", "HTTP request body size.", ["method", "route"], buckets=SIZE_BUCKETS)
+RESPONSE_SIZE = Histogram("http_response_size_bytes", "HTTP response body size.", ["method", "route"], buckets=SIZE_BUCKETS)
+DB_STATEMENTS = Histogram("db_statements_per_request", "Database statements executed per HTTP request.", ["method", "route"], buckets=STATEMENT_BUCKETS)
+DB_TIME = Histogram("db_time_per_request_seconds", "Time spent in database statements per HTTP request.", ["method", "route"], buckets=LATENCY_BUCKETS)
+# Reads through the single-flight groups, by whether they ran or joined a call already in flight
+SINGLEFLIGHT_CALLS = Counter("singleflight_calls_total", "Reads through single-flight groups.", ["group", "outcome"])
+# Requests to rate-limited routes, by route, the key that rejected them ("" if allowed) and outcome
+RATE_LIMIT_DECISIONS = Counter("rate_limit_decisions_total", "Requests checked against rate limits.", ["route", "key", "outcome"])
+
+# [statement count, seconds in the database] of the request being handled
+_db_usage: ContextVar[list | None] = ContextVar("db_usage", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.metrics_started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    usage = _db_usage.get()
+    if usage is not None:
+        usage[0] += 1
+        usage[1] += time.perf_counter() - context.metrics_started
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status, in-flight, size and database metrics per route.
+
+    Requests are labelled with the path template of the route they matched (e.g.
+    /products/{product_id}), never the raw path. Sync endpoints run in the threadpool
+    with a copy of the request context, so their database statements are attributed to
+    the request as well.
+    """
+    def __init__(self, app):
+        self.app = app
+        self._routes = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        request_size = 0
+        response_size = 0
+        usage = [0, 0.0]
+        token = _db_usage.set(usage)
+
+        async def receive_wrapper():
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                request_size += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status, response_size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            _db_usage.reset(token)
+            route = self._route_template(scope)
+            REQUESTS.labels(method, route, str(status)).inc()
+            REQUEST_LATENCY.labels(method, route).observe(elapsed)
+            REQUEST_SIZE.labels(method, route).observe(request_size)
+            RESPONSE_SIZE.labels(method, route).observe(response_size)
+            DB_STATEMENTS.labels(method, route).observe(usage[0])
+            DB_TIME.labels(method, route).observe(usage[1])
+
+    def _route_template(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._routes is None:
+            self._routes = {route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")}
+        return self._routes.get(endpoint, UNMATCHED_ROUTE)
+
+def render_metrics():
+    """
+    Render every metric in the Prometheus text format.
+
+    In multiprocess mode (PROMETHEUS_MULTIPROC_DIR set) the samples of all workers are
+    aggregated; otherwise only this process is reported.
+
+    Returns:
+        tuple: The exposition body and its content type.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -2,10 +2,13 @@
 # Date: 18/04/2023
 # Description: This file contains the models for the database.
 
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from datetime import datetime
+
+from sqlalchemy import DDL, Boolean, Column, DateTime, ForeignKey, Index, Integer, String, event, func, text
+from sqlalchemy.dialects import postgresql  # registers the typed full-text search functions
 from sqlalchemy.orm import relationship
 
-from database import Base
+from app.database import Base
 
 class Order(Base):
     """
@@ -14,12 +17,30 @@ class Order(Base):
     Represents an order placed by a user, including details such as the user ID, date, total cost, payment ID, and status ID.
     """
     __tablename__ = "order"
+    __table_args__ = (
+        # Keyset pagination indexes for the allowed sort columns
+        Index("ix_order_date_order_id", "date", "order_id"),
+        Index("ix_order_total_cost_order_id", "total_cost", "order_id"),
+    )
     order_id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, unique=True)
+    user_id = Column(Integer, index=True)
     date = Column(String)
     total_cost = Column(Integer)
-    payment_id = Column(Integer, unique=True)
-    status_id = Column(Integer, unique=True)
+    payment_id = Column(Integer)
+    status_id = Column(Integer)
+
+class OrderItem(Base):
+    """
+    Model for order line items in the database.
+
+    Represents a product bought in an order, including the quantity and the unit price charged at checkout.
+    """
+    __tablename__ = "order_item"
+    order_item_id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("order.order_id"), index=True, nullable=False)
+    product_id = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    unit_price = Column(Integer, nullable=False)
 
 class OrderStatus(Base):
     """
@@ -64,6 +85,10 @@ class Cart(Base):
     Represents the items in a user's shopping cart, including the cart ID, user ID, product ID, and quantity.
     """
     __tablename__ = "cart"
+    __table_args__ = (
+        # One row per product in a user's cart; also serves lookups by user_id
+        Index("ix_cart_user_id_product_id", "user_id", "product_id", unique=True),
+    )
     cart_id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer)
     product_id = Column(Integer)
@@ -74,13 +99,65 @@ class Product(Base):
     Model for products in the database.
 
     Represents products available in the system, including the product ID, name, price, description, and image URL.
+    The version is incremented by the ORM on every update and, with updated_at, serves as the HTTP cache validator.
     """
     __tablename__ = "product"
+    __table_args__ = (
+        # Keyset pagination indexes for the allowed sort columns
+        Index("ix_product_price_product_id", "price", "product_id"),
+        Index("ix_product_name_product_id", "name", "product_id"),
+    )
     product_id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     price = Column(Integer)
     description = Column(String)
     image_url = Column(String)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __mapper_args__ = {"version_id_col": version}
+
+def product_search_document():
+    """
+    Build the PostgreSQL full-text document of a product.
+
+    The expression must match ix_product_search exactly for searches to use the index.
+
+    Returns:
+        ColumnElement: to_tsvector('english', name || ' ' || description).
+    """
+    columns = Product.__table__.c
+    document = func.coalesce(columns.name, text("''")) + text("' '") + func.coalesce(columns.description, text("''"))
+    return func.to_tsvector(text("'english'"), document)
+
+# PostgreSQL: GIN index over the product search document
+Index("ix_product_search", product_search_document(), postgresql_using="gin").ddl_if(dialect="postgresql")
+
+# SQLite: FTS5 index over name and description, kept in sync with the product table by triggers
+for statement in [
+    "CREATE VIRTUAL TABLE product_fts USING fts5(name, description, content='product', content_rowid='product_id', prefix='2 3')",
+    "CREATE TRIGGER product_fts_insert AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_fts (rowid, name, description) VALUES (new.product_id, new.name, new.description); END",
+    "CREATE TRIGGER product_fts_delete AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_fts (product_fts, rowid, name, description) VALUES ('delete', old.product_id, old.name, old.description); END",
+    "CREATE TRIGGER product_fts_update AFTER UPDATE ON product BEGIN "
+    "INSERT INTO product_fts (product_fts, rowid, name, description) VALUES ('delete', old.product_id, old.name, old.description); "
+    "INSERT INTO product_fts (rowid, name, description) VALUES (new.product_id, new.name, new.description); END",
+]:
+    event.listen(Product.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Product.__table__, "before_drop", DDL("DROP TABLE IF EXISTS product_fts").execute_if(dialect="sqlite"))
+
+class CatalogVersion(Base):
+    """
+    Model for the product catalog version in the database.
+
+    A single row whose version is incremented on every product write, so catalog-wide
+    cache validators can be read without scanning the product table.
+    """
+    __tablename__ = "catalog_version"
+    catalog_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
 
 class Category(Base):
     """
@@ -92,6 +169,38 @@ class Category(Base):
     category_id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
 
+class ProductCategory(Base):
+    """
+    Model for the product–category association in the database.
+
+    Links a product to one of its categories. The primary key leads with the category so
+    a category's products are read from the index in product ID order.
+    """
+    __tablename__ = "product_category"
+    category_id = Column(Integer, ForeignKey("category.category_id", ondelete="CASCADE"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("product.product_id", ondelete="CASCADE"), primary_key=True, index=True)
+
+class CategoryFacet(Base):
+    """
+    Model for the precomputed number of products per category in the database.
+
+    Kept up to date incrementally by every product write, so category pages never count the catalog.
+    """
+    __tablename__ = "category_facet"
+    category_id = Column(Integer, ForeignKey("category.category_id", ondelete="CASCADE"), primary_key=True)
+    product_count = Column(Integer, nullable=False)
+
+class PriceBucketFacet(Base):
+    """
+    Model for the precomputed number of products per price bucket in the database.
+
+    A bucket is identified by its lower price bound, one of PRICE_FACET_BUCKETS. Kept up to
+    date incrementally by every product write.
+    """
+    __tablename__ = "price_bucket_facet"
+    min_price = Column(Integer, primary_key=True)
+    product_count = Column(Integer, nullable=False)
+
 class CustomerService(Base):
     """
     Model for customer service inquiries in the database.
@@ -99,7 +208,11 @@ class CustomerService(Base):
     Represents customer service inquiries, including the inquiry ID, user ID, date, and message.
     """
     __tablename__ = "customer_service"
+    __table_args__ = (
+        # Keyset pagination index for the allowed sort column
+        Index("ix_customer_service_date_inquiry_id", "date", "inquiry_id"),
+    )
     inquiry_id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, unique=True)
+    user_id = Column(Integer, index=True)
     date = Column(String)
     message = Column(String)
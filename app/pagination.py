@@ -0,0 +1,124 @@
+# Description: This file contains the keyset (cursor) pagination utilities.
+
+import base64
+import json
+
+from sqlalchemy import and_, or_
+
+def encode_cursor(sort: str, value, key: int):
+    """
+    Encode the position after a row as an opaque cursor.
+
+    Args:
+        sort (str): The name of the sort column the cursor belongs to.
+        value: The row's value in the sort column.
+        key (int): The row's primary key, used as the tie-breaker.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    raw = json.dumps([sort, value, key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, value_type: type | None = None):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): The cursor string sent by the client.
+        sort (str): The sort column of the current request.
+        value_type (type | None): The Python type of the sort column's values; the value
+        must be of this type or None. Not checked if omitted.
+
+    Returns:
+        tuple: The (value, key) position encoded in the cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed, holds values of the wrong type or was
+        issued for another sort column.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort:
+        raise ValueError("Cursor does not match the requested sort")
+    if not _is_type(key, int) or (value_type is not None and value is not None and not _is_type(value, value_type)):
+        raise ValueError("Invalid cursor")
+    return value, key
+
+def _is_type(value, value_type: type):
+    # JSON has no separate bool or float-with-integral-value, so bools never pass and ints pass as floats
+    if isinstance(value, bool):
+        return value_type is bool
+    if value_type is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, value_type)
+
+def paginate(query, sort_columns: dict, key_column, sort: str, skip: int = 0, limit: int = 100, cursor: str | None = None):
+    """
+    Apply ordering and either keyset or offset pagination to a query.
+
+    Rows are ordered by (sort column, primary key), rows whose sort value is NULL
+    last. With a cursor the query seeks directly past the last row of the previous
+    page, so the database can walk an index instead of scanning and discarding 'skip'
+    rows. Without a cursor the old skip/limit behaviour is kept for compatibility.
+
+    Args:
+        query (Query | Select): The ORM query or select statement to paginate.
+        sort_columns (dict): Allowed sort names mapped to their columns.
+        key_column: The primary key column, used as the tie-breaker.
+        sort (str): The requested sort column name.
+        skip (int): The number of items to skip, used only without a cursor.
+        limit (int): The maximum number of items to return.
+        cursor (str | None): A cursor returned by a previous page.
+
+    Returns:
+        Query | Select: The paginated query.
+
+    Raises:
+        ValueError: If the sort column is not allowed or the cursor is invalid.
+    """
+    if sort not in sort_columns:
+        raise ValueError(f"Cannot sort by '{sort}'")
+    sort_column = sort_columns[sort]
+    if cursor is not None:
+        value, key = decode_cursor(cursor, sort, sort_column.type.python_type)
+        if sort_column is key_column:
+            query = query.filter(key_column > key)
+        elif value is None:
+            # Past the last row with a value: only NULLs remain, ordered by key
+            query = query.filter(and_(sort_column.is_(None), key_column > key))
+        else:
+            query = query.filter(or_(
+                sort_column > value, and_(sort_column == value, key_column > key), sort_column.is_(None)
+            ))
+    if sort_column is key_column:
+        query = query.order_by(key_column)
+    else:
+        # Explicit, as SQLite puts NULLs first by default and PostgreSQL last
+        query = query.order_by(sort_column.asc().nulls_last(), key_column)
+    if cursor is None and skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def next_cursor(rows: list, limit: int, sort: str, key: str):
+    """
+    Build the cursor for the page following 'rows'.
+
+    Args:
+        rows (list): The rows of the current page, as objects or dicts.
+        limit (int): The page size that was requested.
+        sort (str): The sort column name.
+        key (str): The primary key attribute name.
+
+    Returns:
+        str | None: The cursor for the next page, or None if this was the last page.
+    """
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    if isinstance(last, dict):
+        return encode_cursor(sort, last[sort], last[key])
+    return encode_cursor(sort, getattr(last, sort), getattr(last, key))
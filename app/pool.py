@@ -0,0 +1,103 @@
+# Description: This file contains the instrumented connection pools and pool metrics.
+
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+class PoolStats:
+    """
+    Counters for connection checkouts from a pool.
+
+    Tracks how many checkouts happened, how long callers waited for a connection
+    and how many gave up after the pool timeout.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def record(self, wait_time: float, timed_out: bool = False):
+        """
+        Record a single checkout attempt.
+
+        Args:
+            wait_time (float): Seconds spent waiting for a connection.
+            timed_out (bool): Whether the attempt failed with a pool timeout.
+        """
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max, wait_time)
+
+class _InstrumentedPoolMixin:
+    """
+    Mixin that times every connection checkout of a QueuePool.
+
+    The stats object is carried over when the pool is recreated (e.g. on engine.dispose()),
+    so counters survive reconnects.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """
+    QueuePool for the sync engine that records checkout wait times.
+    """
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool for the async engine that records checkout wait times.
+    """
+
+def get_pool_status(engine):
+    """
+    Report the live state of an engine's connection pool.
+
+    Args:
+        engine (Engine | AsyncEngine): The engine whose pool should be inspected.
+
+    Returns:
+        dict: Pool size, checked-in/checked-out connections, overflow and checkout wait statistics.
+    """
+    pool = engine.pool
+    status = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+    }
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        attempts = stats.checkouts + stats.timeouts
+        status.update({
+            "checkouts": stats.checkouts,
+            "timeouts": stats.timeouts,
+            "wait_time_total_ms": stats.wait_time_total * 1000,
+            "wait_time_avg_ms": stats.wait_time_total * 1000 / attempts if attempts else 0.0,
+            "wait_time_max_ms": stats.wait_time_max * 1000,
+        })
+    return status
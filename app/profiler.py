@@ -0,0 +1,222 @@
+# Description: This file contains the opt-in query profiler: statement fingerprints, the
+# slow-query log and the per-request N+1 detector. It is attached to the engines in
+# app/database.py when QUERY_PROFILER_ENABLED is set.
+
+import functools
+import hashlib
+import logging
+import re
+import sys
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from config import DEBUG, N_PLUS_ONE_THRESHOLD, SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+# Modules whose functions are reported as the caller of a statement
+CALLER_MODULES = ("app.crud", "app.async_crud")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_VALUE_LIST = re.compile(r"\(\?(?:, \?)*\)(?:, \(\?(?:, \?)*\))+")
+_IN_LIST = re.compile(r"\bIN \(\?(?:, \?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+class RequestProfile:
+    """
+    The statements executed while handling one request.
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.callers = {}
+
+    def record(self, fingerprint: str, duration: float, caller: str):
+        self.count += 1
+        self.duration += duration
+        self.fingerprints[fingerprint] += 1
+        self.callers.setdefault(fingerprint, caller)
+
+    def repeated(self):
+        """
+        Find the statements repeated often enough to be likely N+1 queries.
+
+        Returns:
+            List[tuple]: (fingerprint, executions, caller) for every fingerprint executed at
+            least N_PLUS_ONE_THRESHOLD times, most repeated first.
+        """
+        return [
+            (fingerprint, executions, self.callers[fingerprint])
+            for fingerprint, executions in self.fingerprints.most_common()
+            if executions >= N_PLUS_ONE_THRESHOLD
+        ]
+
+    def summary(self):
+        """
+        Summarize the request's statements for the X-Query-Summary header.
+
+        Returns:
+            str: The statement count, total time and likely N+1 callers.
+        """
+        parts = [f"count={self.count}", f"time_ms={self.duration * 1000:.1f}", f"distinct={len(self.fingerprints)}"]
+        parts += [f"repeated={caller}*{executions}" for _, executions, caller in self.repeated()]
+        return "; ".join(parts)
+
+# The profile of the request being handled
+_request_profile: ContextVar[RequestProfile | None] = ContextVar("request_profile", default=None)
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(statement: str):
+    """
+    Reduce a SQL statement to its shape, independent of literal and parameter values.
+
+    Literals and placeholders become '?', IN lists and multi-row VALUES are collapsed, so
+    the same query issued with different arguments always gets the same fingerprint.
+
+    Args:
+        statement (str): The SQL statement.
+
+    Returns:
+        str: The normalized statement.
+    """
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    return _VALUE_LIST.sub("(...), ...", normalized)
+
+def fingerprint_id(statement_fingerprint: str):
+    """
+    Shorten a fingerprint to a stable identifier for logs.
+
+    Args:
+        statement_fingerprint (str): A statement fingerprint.
+
+    Returns:
+        str: The first 12 hex digits of the fingerprint's SHA-1.
+    """
+    return hashlib.sha1(statement_fingerprint.encode()).hexdigest()[:12]
+
+def redact(parameters):
+    """
+    Replace parameter values by their type names, so logs never contain user data.
+
+    Args:
+        parameters: The statement parameters (dict, sequence, or a list of them for executemany).
+
+    Returns:
+        The parameters with every value redacted, e.g. {"email": "<str>"}.
+    """
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"<{len(parameters)} parameter sets>"
+        return [f"<{type(value).__name__}>" for value in parameters]
+    return parameters
+
+def find_caller():
+    """
+    Find the application function that issued the current statement.
+
+    For statements run by an AsyncSession the crud call is in the suspended parent
+    greenlet, so its frames are searched too.
+
+    Returns:
+        str: The module-qualified name of the crud function, or of the nearest application
+        function, or "<unknown>".
+    """
+    frames = [sys._getframe(1)]
+    greenlet = sys.modules.get("greenlet")
+    if greenlet is not None:
+        current = greenlet.getcurrent().parent
+        while current is not None:
+            if current.gr_frame is not None:
+                frames.append(current.gr_frame)
+            current = current.parent
+    fallback = None
+    for frame in frames:
+        while frame is not None:
+            module = frame.f_globals.get("__name__", "")
+            if module in CALLER_MODULES:
+                return f"{module}.{frame.f_code.co_name}"
+            if fallback is None and module.startswith("app.") and module != __name__:
+                fallback = f"{module}.{frame.f_code.co_name}"
+            frame = frame.f_back
+    return fallback or "<unknown>"
+
+def install_query_profiler(engine):
+    """
+    Attach the query profiler to an engine.
+
+    Every statement is fingerprinted and attributed to the request being handled;
+    statements slower than SLOW_QUERY_MS are logged with their caller and redacted
+    parameters.
+
+    Args:
+        engine (Engine): The sync engine, or the sync_engine of an async engine.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.profiler_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context.profiler_started
+    profile = _request_profile.get()
+    slow = duration * 1000 >= SLOW_QUERY_MS
+    if profile is None and not slow:
+        return
+    statement_fingerprint = fingerprint(statement)
+    # Walking the stack is the costly part, so a request looks up each fingerprint's caller once
+    if profile is not None and not slow and statement_fingerprint in profile.callers:
+        caller = profile.callers[statement_fingerprint]
+    else:
+        caller = find_caller()
+    if profile is not None:
+        profile.record(statement_fingerprint, duration, caller)
+    if slow:
+        logger.warning(
+            "Slow query %s took %.1f ms in %s: %s; parameters=%s",
+            fingerprint_id(statement_fingerprint), duration * 1000, caller, statement_fingerprint, redact(parameters),
+        )
+
+class QueryProfilerMiddleware:
+    """
+    ASGI middleware collecting the statements of each request.
+
+    Fingerprints repeated at least N_PLUS_ONE_THRESHOLD times in one request are logged
+    as likely N+1 queries. With DEBUG on, the response carries an X-Query-Summary header.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = RequestProfile()
+        token = _request_profile.set(profile)
+
+        async def send_wrapper(message):
+            if DEBUG and message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-query-summary", profile.summary().encode("latin-1", "replace"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_profile.reset(token)
+            for statement_fingerprint, executions, caller in profile.repeated():
+                logger.warning(
+                    "Likely N+1 query in %s %s: %s ran %d times from %s: %s",
+                    scope["method"], scope["path"], fingerprint_id(statement_fingerprint), executions, caller, statement_fingerprint,
+                )
@@ -0,0 +1,462 @@
+# Description: This file contains the token-bucket rate limiter applied in front of the routes.
+#
+# Every limited route has a bucket per client IP and, optionally, per user; a request takes
+# one token from each and is rejected with 429 when any is empty, the tokens it took from the
+# others being given back. Buckets live in this worker's
+# memory by default. With RATE_LIMIT_REDIS_URL set they live in Redis instead, so all workers
+# and replicas share one budget per key; if Redis fails or is slow the in-memory buckets are
+# used, so an outage of the store never takes the API down with it.
+#
+# The client IP is the connection's peer address; behind a proxy run uvicorn with
+# --proxy-headers (and --forwarded-allow-ips) so it is the real client's address.
+
+import asyncio
+import logging
+import math
+import threading
+import time
+import zlib
+from collections import OrderedDict, namedtuple
+from urllib.parse import parse_qs
+
+import orjson
+from jose import JWTError, jwt
+
+from config import (
+    ALGORITHM, RATE_LIMIT_MAX_BODY, RATE_LIMIT_MAX_KEYS, RATE_LIMIT_REDIS_TIMEOUT, RATE_LIMIT_REDIS_URL, RATE_LIMIT_RULES,
+    RATE_LIMIT_SHARDS, SECRET_KEY,
+)
+from app.metrics import RATE_LIMIT_DECISIONS
+
+logger = logging.getLogger(__name__)
+
+# Request keys a rule can limit by
+RATE_LIMIT_KEYS = ("ip", "user")
+
+# Seconds the shared store is bypassed after it fails
+SHARED_RETRY_INTERVAL = 1.0
+
+# A limit of 'limit' requests per 'period' seconds on one route, per key in 'keys'
+RateLimitRule = namedtuple("RateLimitRule", ["method", "path", "limit", "period", "keys"])
+
+def parse_rate_limit_rules(spec: str):
+    """
+    Parse rate limit rules of the form "METHOD PATH=LIMIT/PERIOD[:KEY,...]", separated by ';'.
+
+    For example "POST /users/=10/60:ip" allows 10 user sign-ups per minute per client IP.
+    Keys default to "ip".
+
+    Args:
+        spec (str): The rules.
+
+    Returns:
+        dict: The rules by (method, path without trailing slash).
+
+    Raises:
+        ValueError: If a rule is malformed.
+    """
+    rules = {}
+    for part in filter(None, (part.strip() for part in spec.split(";"))):
+        try:
+            route, budget = part.split("=", 1)
+            method, path = route.split()
+            budget, _, keys = budget.partition(":")
+            limit, period = budget.split("/")
+            keys = tuple(key.strip() for key in keys.split(",")) if keys else ("ip",)
+            rule = RateLimitRule(method.upper(), path.rstrip("/") or "/", int(limit), float(period), keys)
+        except ValueError:
+            raise ValueError(f"Malformed rate limit rule: {part!r}")
+        if rule.limit < 1 or rule.period <= 0 or not set(rule.keys) <= set(RATE_LIMIT_KEYS):
+            raise ValueError(f"Invalid rate limit rule: {part!r}")
+        rules[(rule.method, rule.path)] = rule
+    return rules
+
+class LocalBuckets:
+    """
+    Token buckets in this worker's memory, sharded by key.
+
+    Each shard has its own lock and its own LRU of buckets, so concurrent callers rarely
+    contend. Memory stays bounded: a bucket that has refilled completely is
+    indistinguishable from a new one and is dropped once it reaches the LRU head, and each
+    shard keeps at most max_keys / shards buckets, evicting the least recently used.
+    """
+    def __init__(self, shards: int, max_keys: int):
+        self.max_keys_per_shard = max(1, max_keys // shards)
+        self.evicted = 0
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+
+    def take(self, key: str, limit: int, period: float, now: float | None = None):
+        """
+        Take one token from a key's bucket.
+
+        Args:
+            key (str): The bucket key.
+            limit (int): The bucket capacity, refilled over 'period' seconds.
+            period (float): Seconds to refill an empty bucket.
+            now (float | None): The current monotonic time.
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one is available.
+        """
+        now = time.monotonic() if now is None else now
+        rate = limit / period
+        lock, buckets = self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+        with lock:
+            # [tokens, last refill, time the bucket is full again]
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [float(limit), now, now]
+            else:
+                buckets.move_to_end(key)
+                bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                return (1 - bucket[0]) / rate
+            bucket[0] -= 1
+            bucket[2] = now + (limit - bucket[0]) / rate
+            self._evict(buckets, now)
+            return 0.0
+
+    def refund(self, key: str, limit: int, period: float):
+        """
+        Give back a token taken from a key's bucket.
+
+        Args:
+            key (str): The bucket key.
+            limit (int): The bucket capacity, refilled over 'period' seconds.
+            period (float): Seconds to refill an empty bucket.
+        """
+        lock, buckets = self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+        with lock:
+            # An evicted bucket starts full again anyway
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(limit, bucket[0] + 1)
+                bucket[2] = bucket[1] + (limit - bucket[0]) * period / limit
+
+    def _evict(self, buckets: OrderedDict, now: float):
+        while len(buckets) > self.max_keys_per_shard:
+            buckets.popitem(last=False)
+            self.evicted += 1
+        # Bounded work per call: idle buckets are dropped a couple at a time
+        for _ in range(2):
+            key, bucket = next(iter(buckets.items()))
+            if bucket[2] > now:
+                break
+            del buckets[key]
+            self.evicted += 1
+
+    def __len__(self):
+        return sum(len(buckets) for _, buckets in self._shards)
+
+# Atomic token bucket: KEYS[1] holds tokens and the last refill time in milliseconds.
+# Uses the Redis clock, so replicas with skewed clocks still agree, and expires idle buckets.
+REDIS_TAKE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local period_ms = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or limit
+local ts = tonumber(state[2]) or now
+tokens = math.min(limit, tokens + (now - ts) * limit / period_ms)
+local wait_ms = 0
+if tokens < 1 then
+    wait_ms = math.ceil((1 - tokens) * period_ms / limit)
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((limit - tokens) * period_ms / limit) + 1000)
+return wait_ms
+"""
+
+# Gives back one token to KEYS[1], if the bucket still exists
+REDIS_REFUND_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(tonumber(ARGV[1]), tokens + 1)))
+end
+return 0
+"""
+
+class RedisBuckets:
+    """
+    Token buckets in Redis, shared by every worker and replica.
+
+    The connection is opened on first use. Buckets expire in Redis once they have refilled.
+
+    Raises:
+        RuntimeError: If the redis package is not installed, so a misconfigured worker
+        fails at startup instead of silently limiting per worker.
+    """
+    def __init__(self, url: str, timeout: float):
+        try:
+            import redis.asyncio
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_REDIS_URL requires the redis package (pip install redis)")
+        self.url = url
+        self.timeout = timeout
+        self._redis = redis.asyncio
+        self._client = None
+        self._take_script = None
+        self._refund_script = None
+
+    async def take(self, key: str, limit: int, period: float):
+        """
+        Take one token from a key's bucket.
+
+        Args:
+            key (str): The bucket key.
+            limit (int): The bucket capacity, refilled over 'period' seconds.
+            period (float): Seconds to refill an empty bucket.
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one is available.
+
+        Raises:
+            Exception: If Redis cannot be reached within the timeout.
+        """
+        self._connect()
+        async with asyncio.timeout(self.timeout):
+            wait_ms = await self._take_script(keys=[f"rate_limit:{key}"], args=[limit, int(period * 1000)])
+        return int(wait_ms) / 1000
+
+    async def refund(self, key: str, limit: int, period: float):
+        """
+        Give back a token taken from a key's bucket.
+
+        Args:
+            key (str): The bucket key.
+            limit (int): The bucket capacity, refilled over 'period' seconds.
+            period (float): Seconds to refill an empty bucket.
+
+        Raises:
+            Exception: If Redis cannot be reached within the timeout.
+        """
+        self._connect()
+        async with asyncio.timeout(self.timeout):
+            await self._refund_script(keys=[f"rate_limit:{key}"], args=[limit])
+
+    def _connect(self):
+        if self._client is None:
+            self._client = self._redis.from_url(self.url, socket_timeout=self.timeout, socket_connect_timeout=self.timeout)
+            self._take_script = self._client.register_script(REDIS_TAKE_SCRIPT)
+            self._refund_script = self._client.register_script(REDIS_REFUND_SCRIPT)
+
+    async def close(self):
+        """
+        Close the connection pool, if one was opened.
+        """
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+class RateLimiter:
+    """
+    Applies the per-route rules to requests, using Redis when configured and memory otherwise.
+    """
+    def __init__(self, rules: dict, local: LocalBuckets, shared: RedisBuckets | None = None):
+        self.rules = rules
+        self.local = local
+        self.shared = shared
+        self.allowed = 0
+        self.rejected = 0
+        self.shared_errors = 0
+        self._metrics = {}
+        # Monotonic time until which the shared store is skipped after a failure
+        self._shared_retry_at = 0.0
+
+    def rule_for(self, method: str, path: str):
+        """
+        Find the rule limiting a route.
+
+        Args:
+            method (str): The request method.
+            path (str): The request path.
+
+        Returns:
+            RateLimitRule | None: The rule, or None if the route is not limited.
+        """
+        return self.rules.get((method, path.rstrip("/") or "/"))
+
+    async def check(self, rule: RateLimitRule, keys: dict):
+        """
+        Take a token from every bucket of a request.
+
+        A rejected request gives back the tokens it already took, so a client over its
+        per-user budget does not also drain the budget of everyone sharing its IP.
+
+        Args:
+            rule (RateLimitRule): The route's rule.
+            keys (dict): The request's key values by key name, e.g. {"ip": "10.0.0.1"}.
+
+        Returns:
+            float: 0 if the request is allowed, otherwise seconds until it would be.
+        """
+        taken = []
+        for name, value in keys.items():
+            key = f"{rule.method} {rule.path} {name}:{value}"
+            retry_after, buckets = await self._take(key, rule.limit, rule.period)
+            if retry_after:
+                for taken_key, taken_buckets in taken:
+                    await self._refund(taken_buckets, taken_key, rule.limit, rule.period)
+                self.rejected += 1
+                self._count(rule, name, "rejected")
+                return retry_after
+            taken.append((key, buckets))
+        self.allowed += 1
+        self._count(rule, "", "allowed")
+        return 0.0
+
+    async def _take(self, key: str, limit: int, period: float):
+        # Returns the wait and the buckets the token was taken from, for a refund
+        if self.shared is not None and time.monotonic() >= self._shared_retry_at:
+            try:
+                retry_after = await self.shared.take(key, limit, period)
+            except Exception as e:
+                # Logged once per outage, and the store is left alone for a second before retrying
+                if not self._shared_retry_at:
+                    logger.warning("Shared rate limit store failed, using local buckets: %s: %s", type(e).__name__, e)
+                self._shared_retry_at = time.monotonic() + SHARED_RETRY_INTERVAL
+                self.shared_errors += 1
+            else:
+                self._shared_retry_at = 0.0
+                return retry_after, self.shared
+        return self.local.take(key, limit, period), self.local
+
+    async def _refund(self, buckets, key: str, limit: int, period: float):
+        if buckets is self.local:
+            self.local.refund(key, limit, period)
+            return
+        try:
+            await buckets.refund(key, limit, period)
+        except Exception:
+            # A lost refund only makes the limit stricter until the bucket refills
+            self.shared_errors += 1
+
+    def _count(self, rule: RateLimitRule, key: str, outcome: str):
+        metric = self._metrics.get((rule, key, outcome))
+        if metric is None:
+            metric = self._metrics[(rule, key, outcome)] = RATE_LIMIT_DECISIONS.labels(f"{rule.method} {rule.path}", key, outcome)
+        metric.inc()
+
+    async def close(self):
+        """
+        Close the shared store's connections.
+        """
+        if self.shared is not None:
+            await self.shared.close()
+
+    def stats(self):
+        """
+        Report the limiter's configuration and counters.
+
+        Returns:
+            dict: The backend, the rules, the in-memory bucket and eviction counts, and the
+            allowed, rejected and shared store failure counts.
+        """
+        return {
+            "backend": "redis" if self.shared is not None else "memory",
+            "rules": [f"{rule.method} {rule.path}={rule.limit}/{rule.period:g}:{','.join(rule.keys)}" for rule in self.rules.values()],
+            "buckets": len(self.local),
+            "evicted": self.local.evicted,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "shared_errors": self.shared_errors,
+        }
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware rejecting requests over their route's rate limit with 429.
+
+    Rejections are answered before the request reaches routing, authentication or the
+    password hasher, and carry a Retry-After header. The "user" key is the subject of a
+    valid bearer token, otherwise the 'username' form field or 'user_id' JSON field of the
+    request body, read only for routes limited per user. Body fields are not
+    authenticated, which is what a login limit needs: guesses at one account share that
+    account's budget whoever sends them.
+    """
+    def __init__(self, app, limiter=None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rule = self.limiter.rule_for(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+        keys = {}
+        if "ip" in rule.keys:
+            keys["ip"] = scope["client"][0] if scope.get("client") else "unknown"
+        if "user" in rule.keys:
+            user, receive = await _request_user(scope, receive)
+            if user is not None:
+                keys["user"] = user
+        retry_after = await self.limiter.check(rule, keys)
+        if retry_after:
+            await _reject(send, retry_after)
+            return
+        await self.app(scope, receive, send)
+
+async def _request_user(scope, receive):
+    # Returns the request's user, if any, and a receive callable that replays the body
+    headers = dict(scope["headers"])
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    if authorization[:7].lower() == "bearer ":
+        try:
+            subject = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+        except JWTError:
+            subject = None
+        if subject is not None:
+            return str(subject), receive
+    content_type = headers.get(b"content-type", b"").split(b";")[0].strip()
+    if content_type not in (b"application/x-www-form-urlencoded", b"application/json"):
+        return None, receive
+    messages = []
+    body = b""
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        body += message.get("body", b"")
+        if len(body) > RATE_LIMIT_MAX_BODY or not message.get("more_body", False):
+            break
+
+    async def replay():
+        return messages.pop(0) if messages else await receive()
+
+    if len(body) > RATE_LIMIT_MAX_BODY or messages[-1].get("more_body", False):
+        return None, replay
+    try:
+        if content_type == b"application/json":
+            user = orjson.loads(body).get("user_id")
+        else:
+            user = parse_qs(body.decode("latin-1")).get("username", [None])[0]
+    except (ValueError, AttributeError):
+        user = None
+    return (str(user) if user is not None else None), replay
+
+async def _reject(send, retry_after: float):
+    body = b'{"detail":"Too many requests"}'
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+# The limiter of this worker, used by RateLimitMiddleware when RATE_LIMIT_ENABLED is set
+rate_limiter = RateLimiter(
+    parse_rate_limit_rules(RATE_LIMIT_RULES),
+    LocalBuckets(RATE_LIMIT_SHARDS, RATE_LIMIT_MAX_KEYS),
+    RedisBuckets(RATE_LIMIT_REDIS_URL, RATE_LIMIT_REDIS_TIMEOUT) if RATE_LIMIT_REDIS_URL else None,
+)
@@ -0,0 +1,65 @@
+# Description: This file contains the opt-in read-your-writes window for replica reads.
+#
+# After a successful write the response sets a short-lived cookie; while it is valid the
+# client's reads are served by the primary instead of a replica that may not have applied
+# the write yet. The cookie only ever routes reads to the primary, so a forged or replayed
+# one cannot expose stale or foreign data.
+
+import time
+from http.cookies import SimpleCookie
+
+from fastapi import Request
+
+from config import READ_YOUR_WRITES_SECONDS
+
+# Cookie holding the Unix time until which the client's reads go to the primary
+READ_YOUR_WRITES_COOKIE = "read_primary_until"
+
+# Request methods that never write
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+def reads_from_primary(request: Request):
+    """
+    Check whether a request falls within its client's read-your-writes window.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        bool: Whether the request's reads must go to the primary.
+    """
+    if READ_YOUR_WRITES_SECONDS <= 0:
+        return False
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware opening a read-your-writes window after every successful write.
+
+    Responses to successful non-GET/HEAD/OPTIONS requests set the READ_YOUR_WRITES_COOKIE
+    cookie for READ_YOUR_WRITES_SECONDS; get_read_db reads from the primary while it is valid.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[READ_YOUR_WRITES_COOKIE] = str(int(time.time() + READ_YOUR_WRITES_SECONDS) + 1)
+                cookie[READ_YOUR_WRITES_COOKIE]["max-age"] = int(READ_YOUR_WRITES_SECONDS) + 1
+                cookie[READ_YOUR_WRITES_COOKIE]["path"] = "/"
+                cookie[READ_YOUR_WRITES_COOKIE]["httponly"] = True
+                cookie[READ_YOUR_WRITES_COOKIE]["samesite"] = "lax"
+                header = cookie.output(header="").strip().encode("latin-1")
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", header)]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
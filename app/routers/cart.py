@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-import crud, schema
+from app import crud, schema
 
-from database import get_db
+from app.database import get_db, get_read_db
+from app.read_your_writes import reads_from_primary
 
 router = APIRouter(
     prefix="/cart",
@@ -10,7 +11,7 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=list[schema.Cart])
-def read_cart(user_id: int, db: Session = Depends(get_db)):
+def read_cart(user_id: int, db: Session = Depends(get_read_db)):
     """
     Retrieve the user's shopping cart.
 
@@ -19,7 +20,7 @@ def read_cart(user_id: int, db: Session = Depends(get_db)):
 
     Args:
         user_id (int): The ID of the user whose cart is to be retrieved.
-        db (Session): The database session.
+        db (Session): The read-only database session.
 
     Returns:
         List[schema.Cart]: A list of items in the user's shopping cart.
@@ -35,6 +36,50 @@ def read_cart(user_id: int, db: Session = Depends(get_db)):
     cart = crud.get_cart_by_user_id(db, user_id=user_id)
     return cart
 
+@router.get("/priced", response_model=schema.PricedCart)
+def read_priced_cart(user_id: int, request: Request, use_cache: bool = False, db: Session = Depends(get_read_db)):
+    """
+    Retrieve the user's shopping cart with product details and totals.
+
+    This endpoint returns each cart line with its product's name, price and image
+    and the line total, plus the cart total, so clients do not need one product
+    request per line. By default lines are joined to products and priced in a single
+    query; with use_cache the cart rows are hydrated from the product cache, loading
+    any uncached products with one IN query. Within the client's read-your-writes
+    window the join is always used, so the client sees its own writes.
+
+    Args:
+        user_id (int): The ID of the user whose cart is to be retrieved.
+        request (Request): The request, used to read the read-your-writes cookie.
+        use_cache (bool): Hydrate products from the product cache instead of a join.
+        db (Session): The read-only database session.
+
+    Returns:
+        schema.PricedCart: The priced cart lines and the cart total.
+
+    Example:
+        - You can send a GET request with a user ID to render the cart page in one call.
+
+    """
+    if not use_cache or reads_from_primary(request):
+        lines = crud.get_priced_cart(db, user_id=user_id)
+        return {"user_id": user_id, "items": lines, "total": lines[0].cart_total if lines else 0}
+    cart = crud.get_cart_by_user_id(db, user_id=user_id)
+    products = crud.get_cached_products(db, [line.product_id for line in cart])
+    items = [
+        schema.CartLine(
+            cart_id=line.cart_id,
+            product_id=line.product_id,
+            quantity=line.quantity,
+            name=products[line.product_id].name,
+            price=products[line.product_id].price,
+            image_url=products[line.product_id].image_url,
+            line_total=products[line.product_id].price * line.quantity,
+        )
+        for line in cart if line.product_id in products
+    ]
+    return {"user_id": user_id, "items": items, "total": sum(item.line_total for item in items)}
+
 @router.post("/", response_model=schema.Cart)
 def add_to_cart(cart: schema.CartCreate, db: Session = Depends(get_db)):
     """
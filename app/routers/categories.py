@@ -0,0 +1,104 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app import crud, schema
+
+from app.database import get_db, get_read_db
+
+router = APIRouter(
+    prefix="/categories",
+    responses={404: {"description": "Not found"}},
+    tags=["Categories"]
+)
+
+@router.get("/", response_model=list[schema.CategoryWithCount])
+def read_categories(db: Session = Depends(get_read_db)):
+    """
+    Get all product categories.
+
+    This endpoint retrieves every category with its number of products. The counts
+    are precomputed on product writes, so no products are counted here.
+
+    Args:
+        db (Session): The read-only database session.
+
+    Returns:
+        List[schema.CategoryWithCount]: The categories with their product counts, by name.
+
+    Example:
+        - You can send a GET request to retrieve the category navigation.
+
+    """
+    return crud.get_category_list(db)
+
+@router.get("/{category_id}", response_model=schema.CategoryWithCount)
+def read_category(category_id: int, db: Session = Depends(get_read_db)):
+    """
+    Get a product category by ID.
+
+    This endpoint retrieves a category and its number of products. Use
+    GET /products/?category= to list its products.
+
+    Args:
+        category_id (int): The ID of the category to retrieve.
+        db (Session): The read-only database session.
+
+    Returns:
+        schema.CategoryWithCount: The category with its product count.
+
+    Raises:
+        HTTPException: If the specified category is not found.
+
+    Example:
+        - You can send a GET request with a category ID to render a category page header.
+
+    """
+    category = crud.get_category_by_id(db, category_id=category_id)
+    if category is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return category
+
+@router.post("/", response_model=schema.Category)
+def create_category(category: schema.CategoryCreate, db: Session = Depends(get_db)):
+    """
+    Create a new product category.
+
+    Args:
+        category (schema.CategoryCreate): The data to create a new category.
+        db (Session): The database session.
+
+    Returns:
+        schema.Category: The created category's information.
+
+    Example:
+        - You can send a POST request with a category name to create a new category.
+
+    """
+    return crud.add_category(db, category=category)
+
+@router.delete("/{category_id}", response_model=schema.Category)
+def delete_category(category_id: int, db: Session = Depends(get_db)):
+    """
+    Delete a product category by ID.
+
+    The category's products are kept and simply no longer belong to it.
+
+    Args:
+        category_id (int): The ID of the category to delete.
+        db (Session): The database session.
+
+    Returns:
+        schema.Category: The deleted category's information.
+
+    Raises:
+        HTTPException: If the specified category is not found.
+
+    Example:
+        - You can send a DELETE request with a category ID to delete the category.
+
+    """
+    category = crud.get_category_by_id(db, category_id=category_id)
+    if category is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    deleted_category = schema.Category.from_orm(category)
+    crud.delete_category(db, category_id=category_id)
+    return deleted_category
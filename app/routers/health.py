@@ -0,0 +1,175 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app import schema
+from config import RATE_LIMIT_ENABLED
+from app.cache import product_cache, product_list_cache, token_cache, user_cache
+from app.database import async_engine, engine, replica_engine
+from app.lifespan import check_ready
+from app.pool import get_pool_status
+from app.rate_limit import rate_limiter
+from app.security.hashing import password_hasher
+from app.singleflight import singleflight_groups
+from app.write_behind import inquiry_writer
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.get("/live", response_model=schema.HealthStatus)
+def read_liveness():
+    """
+    Check that the worker process is running.
+
+    This endpoint never touches the database, so a slow or unreachable database
+    does not get the pod restarted; use it as the Kubernetes liveness probe.
+
+    Returns:
+        schema.HealthStatus: Always "ok".
+
+    Example:
+        - You can send a GET request to check that the process answers at all.
+
+    """
+    return {"status": "ok"}
+
+@router.get("/ready", response_model=schema.HealthStatus, responses={503: {"model": schema.HealthStatus, "description": "Not ready"}})
+async def read_readiness():
+    """
+    Check that the worker can serve traffic.
+
+    This endpoint reports ready once the schema has been initialized and the
+    database answers a trivial query; use it as the Kubernetes readiness probe.
+
+    Returns:
+        schema.HealthStatus: "ready", or a 503 response with "not ready" and the reason.
+
+    Example:
+        - You can send a GET request to see whether a new pod should receive traffic.
+
+    """
+    reason = await check_ready()
+    if reason is not None:
+        return JSONResponse(status_code=503, content={"status": "not ready", "detail": reason})
+    return {"status": "ready"}
+
+@router.get("/pool", response_model=dict[str, schema.PoolStatus])
+def read_pool_status():
+    """
+    Get the live state of the database connection pools.
+
+    This endpoint reports, for the sync, async and read replica engines of this
+    worker process, how many connections are checked out, how much overflow is in
+    use and how long requests have waited for a connection.
+
+    Returns:
+        Dict[str, schema.PoolStatus]: Pool status keyed by engine ("sync", "async" and,
+        if a replica is configured, "replica").
+
+    Example:
+        - You can send a GET request to check whether latency spikes come from pool starvation.
+
+    """
+    pools = {
+        "sync": get_pool_status(engine),
+        "async": get_pool_status(async_engine.sync_engine),
+    }
+    if replica_engine is not engine:
+        pools["replica"] = get_pool_status(replica_engine)
+    return pools
+
+@router.get("/cache", response_model=dict[str, schema.CacheStats])
+def read_cache_stats():
+    """
+    Get the counters of the in-process caches.
+
+    This endpoint reports, for this worker process, the size and hit, miss and
+    eviction counts of each cache. Hits on the auth_token and auth_user caches are
+    authentication database round-trips that were saved.
+
+    Returns:
+        Dict[str, schema.CacheStats]: Cache counters keyed by cache name.
+
+    Example:
+        - You can send a GET request to check the product cache hit rate.
+
+    """
+    return {
+        "product": product_cache.stats(),
+        "product_list": product_list_cache.stats(),
+        "auth_token": token_cache.stats(),
+        "auth_user": user_cache.stats(),
+    }
+
+@router.get("/hashing", response_model=schema.HasherStats)
+def read_hasher_stats():
+    """
+    Get the state of the password hashing pool.
+
+    This endpoint reports, for this worker process, how many bcrypt jobs are
+    running and queued, and how many were completed or rejected because the
+    queue was full.
+
+    Returns:
+        schema.HasherStats: The pool limits, occupancy and counters.
+
+    Example:
+        - You can send a GET request during a login burst to see the queue depth.
+
+    """
+    return password_hasher.stats()
+
+@router.get("/singleflight", response_model=dict[str, schema.SingleFlightStats])
+def read_singleflight_stats():
+    """
+    Get the counters of the single-flight groups.
+
+    This endpoint reports, for this worker process, how many hot reads ran against
+    the database and how many were coalesced into an identical read already in
+    flight. Coalesced reads are database round-trips that were saved.
+
+    Returns:
+        Dict[str, schema.SingleFlightStats]: Counters keyed by group name.
+
+    Example:
+        - You can send a GET request during a flash sale to see how many product lookups were shared.
+
+    """
+    return {name: group.stats() for name, group in singleflight_groups.items()}
+
+@router.get("/write-behind", response_model=dict[str, schema.WriteBehindStats])
+def read_write_behind_stats():
+    """
+    Get the state of the write-behind batch writers.
+
+    This endpoint reports, for this worker process, how many rows are waiting to be
+    written and how many were accepted, rejected because the queue was full, written
+    or dropped after failing repeatedly, and how many writes failed.
+
+    Returns:
+        Dict[str, schema.WriteBehindStats]: Writer state keyed by writer name.
+
+    Example:
+        - You can send a GET request during an outage to see whether the inquiry queue is filling up.
+
+    """
+    return {inquiry_writer.name: inquiry_writer.stats()}
+
+@router.get("/rate-limit", response_model=schema.RateLimitStats)
+def read_rate_limit_stats():
+    """
+    Get the state of the rate limiter.
+
+    This endpoint reports, for this worker process, whether rate limiting is
+    enabled, where the buckets are kept, the rules per route, how many in-memory
+    buckets exist and were evicted, and how many requests were allowed or rejected.
+
+    Returns:
+        schema.RateLimitStats: The rate limiter's configuration and counters.
+
+    Example:
+        - You can send a GET request during a login storm to see how many attempts are rejected.
+
+    """
+    return {"enabled": RATE_LIMIT_ENABLED, **rate_limiter.stats()}
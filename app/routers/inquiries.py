@@ -1,8 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import crud, schema
+from app import async_crud, crud, schema
 
-from database import get_db
+from config import INQUIRY_WRITE_BEHIND
+from app.database import get_async_db, get_read_db
+from app.export import EXPORT_MEDIA_TYPES, export_rows
+from app.pagination import next_cursor
+from app.serialization import list_response
+from app.write_behind import QueueFullError, inquiry_writer
 
 router = APIRouter(
     prefix="/inquiries",
@@ -10,56 +17,107 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=list[schema.CustomerService])
-def read_inquiries(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_inquiries(skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "inquiry_id", db: Session = Depends(get_read_db)):
     """
     Get a list of customer inquiries.
 
     This endpoint retrieves a list of customer inquiries with optional pagination.
+    When more inquiries follow, the cursor for the next page is returned in the
+    X-Next-Cursor header. The inquiries are selected as plain rows and encoded with
+    orjson.
 
     Args:
-        skip (int): The number of items to skip for pagination.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
         limit (int): The maximum number of items to return for pagination.
-        db (Session): The database session.
+        cursor (str | None): The X-Next-Cursor value of the previous page, for keyset pagination.
+        sort (str): The column to sort by (inquiry_id or date).
+        db (Session): The read-only database session.
 
     Returns:
         List[schema.CustomerService]: A list of customer inquiries.
 
     Raises:
-        HTTPException: If there's an issue with retrieving the inquiries.
+        HTTPException: If the sort column or cursor is invalid.
 
     Example:
         - You can send a GET request to retrieve a list of customer inquiries.
 
     """
-    inquiries = crud.get_inquiries_list(db, skip=skip, limit=limit)
-    return inquiries
-
-@router.post("/", response_model=schema.CustomerService)
-def create_inquiry(inquiry: schema.CustomerServiceCreate, db: Session = Depends(get_db)):
+    try:
+        inquiries = crud.get_inquiry_rows(db, skip=skip, limit=limit, cursor=cursor, sort=sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_page = next_cursor(inquiries, limit, sort, "inquiry_id")
+    return list_response(inquiries, headers={"X-Next-Cursor": next_page} if next_page else None)
+
+@router.post("/", response_model=schema.CustomerService, responses={202: {"model": schema.InquiryAccepted, "description": "Queued for write-behind"}})
+async def create_inquiry(inquiry: schema.CustomerServiceCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new customer inquiry.
 
     This endpoint allows you to create a new customer inquiry with the provided information.
 
+    With INQUIRY_WRITE_BEHIND set, the validated inquiry is queued instead and written
+    with other queued inquiries in one multi-row insert shortly after; the response is
+    202 Accepted without the inquiry ID. Queued inquiries are lost if the worker
+    crashes, and an inquiry the database keeps rejecting is dropped after
+    INQUIRY_MAX_ATTEMPTS attempts.
+
     Args:
         inquiry (schema.CustomerServiceCreate): The data to create a new inquiry.
-        db (Session): The database session.
+        db (AsyncSession): The async database session.
 
     Returns:
-        schema.CustomerService: The created customer inquiry.
+        schema.CustomerService: The created customer inquiry, or a 202 response if it was queued.
 
     Raises:
-        HTTPException: If there's an issue with inquiry creation.
+        HTTPException: If the write-behind queue is full (503).
 
     Example:
         - You can send a POST request with inquiry data to create a new customer inquiry.
 
     """
-    db_inquiry = crud.add_inquiry(db, inquiry=inquiry)
+    if INQUIRY_WRITE_BEHIND:
+        try:
+            inquiry_writer.submit(inquiry.dict())
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        return JSONResponse(status_code=202, content=schema.InquiryAccepted().dict())
+    db_inquiry = await async_crud.add_inquiry(db, inquiry=inquiry)
     return db_inquiry
 
+@router.get("/export")
+def export_inquiries(format: str = "ndjson"):
+    """
+    Export all inquiries as a stream.
+
+    This endpoint streams every inquiry as NDJSON or CSV, reading rows from a
+    server-side cursor as the client consumes the response, so memory use stays
+    flat regardless of the number of inquiries.
+
+    Args:
+        format (str): The export format, "ndjson" or "csv".
+
+    Returns:
+        StreamingResponse: The exported inquiries.
+
+    Raises:
+        HTTPException: If the format is not supported.
+
+    Example:
+        - You can send a GET request with format=csv to download a full inquiry dump.
+
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Format must be 'ndjson' or 'csv'")
+    return StreamingResponse(
+        export_rows(crud.stream_inquiries, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="inquiries.{format}"'}
+    )
+
 @router.get("/{inquiry_id}", response_model=schema.CustomerService)
-def read_inquiry(inquiry_id: int, db: Session = Depends(get_db)):
+def read_inquiry(inquiry_id: int, db: Session = Depends(get_read_db)):
     """
     Get a customer inquiry by ID.
 
@@ -67,7 +125,7 @@ def read_inquiry(inquiry_id: int, db: Session = Depends(get_db)):
 
     Args:
         inquiry_id (int): The ID of the inquiry to retrieve.
-        db (Session): The database session.
+        db (Session): The read-only database session.
 
     Returns:
         schema.CustomerService: The customer inquiry information.
@@ -79,7 +137,7 @@ def read_inquiry(inquiry_id: int, db: Session = Depends(get_db)):
         - You can send a GET request with an inquiry ID to retrieve its details.
 
     """
-    db_inquiry = crud.get_inquiry_by_id(db, inquiry_id=inquiry_id)
+    db_inquiry = crud.get_inquiries_by_id(db, inquiry_id=inquiry_id)
     if db_inquiry is None:
         raise HTTPException(status_code=404, detail="Inquiry not found")
     return db_inquiry
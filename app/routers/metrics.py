@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Response
+
+from app.metrics import render_metrics
+
+router = APIRouter(
+    tags=["Metrics"]
+)
+
+@router.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """
+    Get the application metrics in the Prometheus text format.
+
+    This endpoint reports per-route request counts, latency, request and response
+    sizes and database statements and time per request, aggregated across all
+    uvicorn workers when PROMETHEUS_MULTIPROC_DIR is set.
+
+    Returns:
+        Response: The metrics exposition.
+
+    Example:
+        - You can point a Prometheus scrape job at /metrics.
+
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -1,10 +1,14 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-import crud, schema
+from app import crud, schema
 
-from database import get_db
+from app.database import get_db, get_read_db
+from app.export import EXPORT_MEDIA_TYPES, export_rows
+from app.pagination import next_cursor
+from app.serialization import list_response
 
 router = APIRouter(
     prefix="/orders",
@@ -13,16 +17,16 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=list[schema.Order])
-def read_orders(user_id: int, db: Session = Depends(get_db)):
+def read_orders(user_id: int, db: Session = Depends(get_read_db)):
     """
     Get a list of orders by user ID.
 
     This endpoint retrieves a list of orders for a specific user based on their
-    user ID.
+    user ID. The orders are selected as plain rows and encoded with orjson.
 
     Args:
         user_id (int): The ID of the user whose orders are to be retrieved.
-        db (Session): The database session.
+        db (Session): The read-only database session.
 
     Returns:
         List[schema.Order]: A list of orders for the specified user.
@@ -34,86 +38,208 @@ def read_orders(user_id: int, db: Session = Depends(get_db)):
         - You can send a GET request with a user ID to retrieve their orders.
 
     """
-    orders = crud.get_orders_by_user_id(db, user_id=user_id)
-    return orders
+    orders = crud.get_order_rows_by_user_id(db, user_id=user_id)
+    return list_response(orders)
 
-@router.get("/{order_id}", response_model=schema.Order)
-def read_order(order_id: int, db: Session = Depends(get_db)):
+@router.post("/checkout", response_model=schema.OrderDetail)
+def checkout(checkout: schema.CheckoutRequest, db: Session = Depends(get_db)):
     """
-    Get order by ID.
+    Check out the user's shopping cart.
 
-    This endpoint retrieves an order by its unique identifier (ID).
+    This endpoint converts the user's cart into an order in one transaction: the
+    cart lines are locked and priced from the product catalog, the order and its
+    line items are created with the server-computed total, and the cart is cleared.
 
     Args:
-        order_id (int): The ID of the order to retrieve.
+        checkout (schema.CheckoutRequest): The user and the payment to link to the order.
         db (Session): The database session.
 
     Returns:
-        schema.Order: The order information.
+        schema.OrderDetail: The created order with its line items.
 
     Raises:
-        HTTPException: If the specified order is not found.
+        HTTPException: If the payment does not belong to the user (404) or the cart
+        is empty (400).
 
     Example:
-        - You can send a GET request with an order ID to retrieve its details.
+        - You can send a POST request with a user ID and payment ID to place an order
+        for everything in the user's cart.
 
     """
-    db_order = crud.get_order_by_id(db, order_id=order_id)
-    if db_order is None:
-        raise HTTPException(status_code=404, detail="Order not found")
-    return db_order
+    try:
+        order = crud.checkout_cart(db, user_id=checkout.user_id, payment_id=checkout.payment_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if order is None:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+    return order
 
-@router.put("/{order_id}/status", response_model=schema.Order)
-def update_order_status(order_id: int, status: schema.OrderStatus, db: Session = Depends(get_db)):
+@router.get("/all", response_model=list[schema.Order])
+def read_all_orders(skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "order_id", db: Session = Depends(get_read_db)):
     """
-    Update the status of an order.
+    Get a list of all orders with optional pagination.
 
-    This endpoint allows you to update the status of an existing order by providing
-    its ID and the updated status.
+    This endpoint retrieves a list of all orders with optional pagination. When
+    more orders follow, the cursor for the next page is returned in the
+    X-Next-Cursor header. The orders are selected as plain rows and encoded with
+    orjson.
 
     Args:
-        order_id (int): The ID of the order to update.
-        status (schema.OrderStatus): The updated status for the order.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
+        limit (int): The maximum number of items to return for pagination.
+        cursor (str | None): The X-Next-Cursor value of the previous page, for keyset pagination.
+        sort (str): The column to sort by (order_id, date or total_cost).
+        db (Session): The read-only database session.
+
+    Returns:
+        List[schema.Order]: A list of all orders.
+
+    Raises:
+        HTTPException: If the sort column or cursor is invalid.
+
+    Example:
+        - You can send a GET request to retrieve a list of all orders.
+
+    """
+    try:
+        orders = crud.get_order_rows(db, skip=skip, limit=limit, cursor=cursor, sort=sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_page = next_cursor(orders, limit, sort, "order_id")
+    return list_response(orders, headers={"X-Next-Cursor": next_page} if next_page else None)
+
+@router.get("/export")
+def export_orders(format: str = "ndjson"):
+    """
+    Export all orders as a stream.
+
+    This endpoint streams every order as NDJSON or CSV, reading rows from a
+    server-side cursor as the client consumes the response, so memory use stays
+    flat regardless of the number of orders.
+
+    Args:
+        format (str): The export format, "ndjson" or "csv".
+
+    Returns:
+        StreamingResponse: The exported orders.
+
+    Raises:
+        HTTPException: If the format is not supported.
+
+    Example:
+        - You can send a GET request with format=csv to download a full order dump.
+
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Format must be 'ndjson' or 'csv'")
+    return StreamingResponse(
+        export_rows(crud.stream_orders, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'}
+    )
+
+@router.get("/statuses", response_model=list[schema.OrderStatus])
+def read_order_statuses(db: Session = Depends(get_read_db)):
+    """
+    Get the list of order statuses.
+
+    This endpoint retrieves every order status from the in-memory order_status
+    table, reloading it from the database only once it is older than ORDER_STATUS_TTL.
+
+    Args:
+        db (Session): The read-only database session.
+
+    Returns:
+        List[schema.OrderStatus]: A list of all order statuses.
+
+    Example:
+        - You can send a GET request to retrieve the statuses an order can be set to.
+
+    """
+    return crud.get_order_statuses(db)
+
+@router.post("/statuses", response_model=schema.OrderStatus)
+def create_order_status(status: schema.OrderStatusCreate, db: Session = Depends(get_db)):
+    """
+    Create a new order status.
+
+    This endpoint adds an order status and reloads this worker's in-memory
+    order_status table; other workers pick it up on first use.
+
+    Args:
+        status (schema.OrderStatusCreate): The order status to create.
         db (Session): The database session.
 
     Returns:
-        schema.Order: The updated order's information.
+        schema.OrderStatus: The created order status.
+
+    Example:
+        - You can send a POST request with {"status": "Returned"} to add a status.
+
+    """
+    return crud.add_order_status(db, status=status)
+
+@router.get("/{order_id}", response_model=schema.OrderWithStatus)
+def read_order(order_id: int, db: Session = Depends(get_read_db)):
+    """
+    Get order by ID.
+
+    This endpoint retrieves an order by its unique identifier (ID), with the name of
+    its status taken from the in-memory order_status table.
+
+    Args:
+        order_id (int): The ID of the order to retrieve.
+        db (Session): The read-only database session.
+
+    Returns:
+        schema.OrderWithStatus: The order information with its status name.
 
     Raises:
-        HTTPException: If the specified order is not found or there's an issue
-        with the update.
+        HTTPException: If the specified order is not found.
 
     Example:
-        - You can send a PUT request with an order ID and updated status to modify
-        the order's status.
+        - You can send a GET request with an order ID to retrieve its details.
 
     """
-    db_order = crud.get_order(db, order_id=order_id)
+    db_order = crud.get_order_by_id(db, order_id=order_id)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
-    return crud.update_order(db=db, order=db_order, status=status)
+    return crud.order_with_status(db, db_order)
 
-@router.get("/all", response_model=list[schema.Order])
-def read_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.put("/{order_id}/status", response_model=schema.OrderWithStatus)
+def update_order_status(order_id: int, status: schema.OrderStatusUpdate, db: Session = Depends(get_db)):
     """
-    Get a list of all orders with optional pagination.
+    Update the status of an order.
 
-    This endpoint retrieves a list of all orders with optional pagination.
+    This endpoint allows you to update the status of an existing order by providing
+    its ID and the new status ID or name. The status is validated against the
+    in-memory order_status table, and the order is updated and returned in a single
+    UPDATE ... RETURNING statement.
 
     Args:
-        skip (int): The number of items to skip for pagination.
-        limit (int): The maximum number of items to return for pagination.
+        order_id (int): The ID of the order to update.
+        status (schema.OrderStatusUpdate): The new status for the order.
         db (Session): The database session.
 
     Returns:
-        List[schema.Order]: A list of all orders.
+        schema.OrderWithStatus: The updated order's information with its status name.
 
     Raises:
-        HTTPException: If there's an issue with retrieving the orders.
+        HTTPException: If the status does not exist (400) or the specified order is
+        not found (404).
 
     Example:
-        - You can send a GET request to retrieve a list of all orders.
+        - You can send a PUT request with an order ID and {"status": "Shipped"} to
+        modify the order's status.
 
     """
-    orders = crud.get_order_list(db, skip=skip, limit=limit)
-    return orders
+    try:
+        status_id, _ = crud.resolve_order_status(db, status_id=status.status_id, status=status.status)
+    except ValueError as e:
+        if crud.get_order_by_id(db, order_id=order_id) is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        raise HTTPException(status_code=400, detail=str(e))
+    db_order = crud.update_order_status_by_id(db, order_id=order_id, status_id=status_id)
+    if db_order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return db_order
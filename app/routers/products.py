@@ -1,8 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import crud, schema
+from app import async_crud, crud, schema
 
-from database import get_db
+from config import PRODUCT_LOOKUP_MAX_IDS, SEARCH_MAX_RESULTS
+
+from app.conditional import is_conditional, is_not_modified, make_etag, not_modified_response, set_validators
+from app.database import get_async_db, get_db, get_read_db
+from app.ingest import iter_csv_records, iter_ndjson_records
+from app.pagination import next_cursor
+from app.read_your_writes import reads_from_primary
+from app.serialization import list_response
+
+# Content types accepted by the bulk import endpoint
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+CSV_CONTENT_TYPES = {"text/csv"}
 
 router = APIRouter(
     prefix="/products",
@@ -10,44 +22,209 @@ router = APIRouter(
     tags=["Products"]
 )
 
+def _check_ids(product_ids: list[int]):
+    if not product_ids:
+        raise HTTPException(status_code=400, detail="At least one product ID is required")
+    if len(product_ids) > PRODUCT_LOOKUP_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {PRODUCT_LOOKUP_MAX_IDS} product IDs can be looked up at once")
+    return product_ids
+
+def _parse_ids(ids: str):
+    try:
+        return _check_ids([int(part) for part in ids.split(",") if part.strip()])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of product IDs")
+
 @router.get("/", response_model=list[schema.Product])
-def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_products(request: Request, skip: int = 0, limit: int = 100, cursor: str | None = None, sort: str = "product_id", category: int | None = None, ids: str | None = None, db: Session = Depends(get_read_db)):
     """
     Get a list of products.
 
-    This endpoint retrieves a list of products with optional pagination.
+    This endpoint retrieves a list of products with optional pagination. When more
+    products follow, the opaque cursor for the next page is returned in the
+    X-Next-Cursor header; pass it back as 'cursor' to fetch that page without an
+    offset scan.
+
+    The response carries an ETag and Last-Modified derived from the catalog version;
+    a request whose If-None-Match or If-Modified-Since still matches gets an empty
+    304 response without the page being loaded or serialized.
+
+    Pages are cached as plain dicts selected straight from the product columns and
+    encoded with orjson, skipping per-item response model validation. Within the client's
+    read-your-writes window the cache is bypassed and the page is read from the primary.
+
+    With 'ids', exactly those products are returned instead of a page, in the order
+    given: cached products are served from memory and all the others are loaded with
+    a single IN query. IDs that do not exist are listed in the X-Missing-Ids header.
+    Use POST /products/lookup for sets too long for a URL.
 
     Args:
-        skip (int): The number of items to skip for pagination.
+        request (Request): The request, used to read the conditional headers and the read-your-writes cookie.
+        skip (int): The number of items to skip for pagination, ignored when a cursor is given.
         limit (int): The maximum number of items to return for pagination.
-        db (Session): The database session.
+        cursor (str | None): The X-Next-Cursor value of the previous page, for keyset pagination.
+        sort (str): The column to sort by (product_id, price or name).
+        category (int | None): Only return products in this category.
+        ids (str | None): Comma-separated product IDs to fetch, e.g. "3,1,2".
+        db (Session): The read-only database session.
 
     Returns:
-        List[schema.Product]: A list of products.
+        List[schema.Product]: A list of products, or a 304 response if the client's copy is current.
 
     Raises:
-        HTTPException: If there's an issue with retrieving the product list.
+        HTTPException: If the sort column, cursor or ID list is invalid.
 
     Example:
         - You can send a GET request to retrieve a list of products.
+        - You can send a GET request with ids=3,1,2 to render a cart or an order in one call.
 
     """
-    products = crud.get_product_list(db, skip=skip, limit=limit)
+    if ids is not None:
+        products, missing = crud.get_products_by_ids(db, _parse_ids(ids), use_cache=not reads_from_primary(request))
+        headers = {"X-Missing-Ids": ",".join(map(str, missing))} if missing else None
+        return list_response([product.dict() for product in products], headers=headers)
+    use_cache = not reads_from_primary(request)
+    try:
+        # For a conditional request that misses the cache, check the catalog version
+        # before loading the page at all
+        page = crud.get_cached_product_page(db, skip=skip, limit=limit, cursor=cursor, sort=sort, category=category, load=not is_conditional(request), use_cache=use_cache)
+        if page is None:
+            version, updated_at = crud.get_catalog_validator(db)
+            etag = make_etag("products", version, skip, limit, cursor, sort, category)
+            if is_not_modified(request, etag, updated_at):
+                return not_modified_response(etag, updated_at)
+            page = crud.get_cached_product_page(db, skip=skip, limit=limit, cursor=cursor, sort=sort, category=category, use_cache=use_cache)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    etag = make_etag("products", page.version, skip, limit, cursor, sort, category)
+    if is_not_modified(request, etag, page.updated_at):
+        return not_modified_response(etag, page.updated_at)
+    response = list_response(page.products)
+    set_validators(response, etag, page.updated_at)
+    next_page = next_cursor(page.products, limit, sort, "product_id")
+    if next_page:
+        response.headers["X-Next-Cursor"] = next_page
+    return response
+
+@router.get("/facets", response_model=schema.ProductFacets)
+def read_product_facets(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """
+    Get the product facets.
+
+    This endpoint returns the number of products per category and per price bucket.
+    The counts are maintained incrementally on every product write, so this never
+    counts the catalog. The response carries the same catalog validators as the
+    product list, and a request whose copy is still current gets an empty 304.
+
+    Args:
+        request (Request): The request, used to read the conditional headers and the read-your-writes cookie.
+        response (Response): The response, used to set the validator headers.
+        db (Session): The read-only database session.
+
+    Returns:
+        schema.ProductFacets: The category and price bucket facets, or a 304 response if
+        the client's copy is current.
+
+    Example:
+        - You can send a GET request to render the filters of a catalog page.
+
+    """
+    use_cache = not reads_from_primary(request)
+    entry = crud.get_cached_product_facets(db, load=not is_conditional(request), use_cache=use_cache)
+    if entry is None:
+        version, updated_at = crud.get_catalog_validator(db)
+        etag = make_etag("facets", version)
+        if is_not_modified(request, etag, updated_at):
+            return not_modified_response(etag, updated_at)
+        entry = crud.get_cached_product_facets(db, use_cache=use_cache)
+    etag = make_etag("facets", entry.version)
+    if is_not_modified(request, etag, entry.updated_at):
+        return not_modified_response(etag, entry.updated_at)
+    set_validators(response, etag, entry.updated_at)
+    return entry.facets
+
+@router.get("/search", response_model=list[schema.Product])
+def search_products(response: Response, q: str, limit: int = Query(20, ge=1, le=SEARCH_MAX_RESULTS), cursor: str | None = None, db: Session = Depends(get_read_db)):
+    """
+    Search products by name and description.
+
+    This endpoint runs an indexed full-text search and returns the best matches
+    first. Each word of the query must match, and words match as prefixes. When
+    more results follow, the cursor for the next page is returned in the
+    X-Next-Cursor header.
+
+    Args:
+        response (Response): The response, used to set the X-Next-Cursor header.
+        q (str): The search text.
+        limit (int): The maximum number of results to return, from 1 to SEARCH_MAX_RESULTS.
+        cursor (str | None): The X-Next-Cursor value of the previous page.
+        db (Session): The read-only database session.
+
+    Returns:
+        List[schema.Product]: The matching products, best matches first.
+
+    Raises:
+        HTTPException: If the cursor is invalid.
+
+    Example:
+        - You can send a GET request with q=run sho to find "Red running shoes".
+
+    """
+    try:
+        products, next_page = crud.search_products(db, q=q, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_page:
+        response.headers["X-Next-Cursor"] = next_page
     return products
 
+@router.post("/lookup", response_model=schema.ProductLookupResult)
+def lookup_products(lookup: schema.ProductLookupRequest, request: Request, db: Session = Depends(get_read_db)):
+    """
+    Look up several products at once.
+
+    This endpoint is the POST form of GET /products/?ids=, for sets of IDs too long
+    for a URL. Cached products are served from memory and all the others are loaded
+    with a single IN query.
+
+    Args:
+        lookup (schema.ProductLookupRequest): The IDs of the products, in the order they should be returned.
+        request (Request): The request, used to read the read-your-writes cookie.
+        db (Session): The read-only database session.
+
+    Returns:
+        schema.ProductLookupResult: The products found, in request order, and the IDs that do not exist.
+
+    Raises:
+        HTTPException: If no IDs or more than PRODUCT_LOOKUP_MAX_IDS IDs are given.
+
+    Example:
+        - You can send a POST request with {"ids": [3, 1, 2]} to fetch the products of a large wishlist.
+
+    """
+    products, missing = crud.get_products_by_ids(db, _check_ids(lookup.ids), use_cache=not reads_from_primary(request))
+    return {"items": products, "missing": missing}
+
 @router.get("/{product_id}", response_model=schema.Product)
-def read_product(product_id: int, db: Session = Depends(get_db)):
+def read_product(product_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
     """
     Get product by ID.
 
     This endpoint retrieves a product by its unique identifier (ID).
 
+    The response carries an ETag and Last-Modified derived from the product version;
+    a request whose If-None-Match or If-Modified-Since still matches gets an empty
+    304 response without the product being loaded or serialized. Within the client's
+    read-your-writes window the product cache is bypassed.
+
     Args:
         product_id (int): The ID of the product to retrieve.
-        db (Session): The database session.
+        request (Request): The request, used to read the conditional headers and the read-your-writes cookie.
+        response (Response): The response, used to set the validator headers.
+        db (Session): The read-only database session.
 
     Returns:
-        schema.Product: The product information.
+        schema.Product: The product information, or a 304 response if the client's copy is current.
 
     Raises:
         HTTPException: If the specified product is not found.
@@ -56,10 +233,25 @@ def read_product(product_id: int, db: Session = Depends(get_db)):
         - You can send a GET request with a product ID to retrieve its details.
 
     """
-    db_product = crud.get_product_by_id(db, product_id=product_id)
-    if db_product is None:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return db_product
+    # For a conditional request that misses the cache, check only the product's
+    # validators before loading the full row
+    use_cache = not reads_from_primary(request)
+    entry = crud.get_cached_product_entry(db, product_id=product_id, load=not is_conditional(request), use_cache=use_cache)
+    if entry is None:
+        validator = crud.get_product_validator(db, product_id=product_id)
+        if validator is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        etag = make_etag("product", product_id, validator.version)
+        if is_not_modified(request, etag, validator.updated_at):
+            return not_modified_response(etag, validator.updated_at)
+        entry = crud.get_cached_product_entry(db, product_id=product_id, use_cache=use_cache)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+    etag = make_etag("product", product_id, entry.version)
+    if is_not_modified(request, etag, entry.updated_at):
+        return not_modified_response(etag, entry.updated_at)
+    set_validators(response, etag, entry.updated_at)
+    return entry.product
 
 @router.post("/", response_model=schema.Product)
 def create_product(product: schema.ProductCreate, db: Session = Depends(get_db)):
@@ -76,22 +268,62 @@ def create_product(product: schema.ProductCreate, db: Session = Depends(get_db))
         schema.Product: The created product's information.
 
     Raises:
-        HTTPException: If there's an issue with product creation.
+        HTTPException: If there's an issue with product creation, such as an unknown category.
 
     Example:
         - You can send a POST request with product data to create a new product.
 
     """
-    db_product = crud.add_product(db, product=product)
+    try:
+        db_product = crud.add_product(db, product=product)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return db_product
 
+@router.post("/bulk", response_model=schema.BulkImportResult)
+async def bulk_import_products(request: Request, atomic: bool = False, db: AsyncSession = Depends(get_async_db)):
+    """
+    Import many products from a streamed NDJSON or CSV body.
+
+    This endpoint reads the request body as it arrives, validates rows against
+    schema.ProductCreate in chunks and inserts them in a single transaction (COPY on
+    PostgreSQL, multi-row INSERTs elsewhere). Rejected rows are reported back by row
+    number.
+
+    Args:
+        request (Request): The request, whose body is one JSON object per line
+            (application/x-ndjson) or CSV with a header row (text/csv).
+        atomic (bool): If True, nothing is inserted when any row is rejected.
+        db (AsyncSession): The async database session.
+
+    Returns:
+        schema.BulkImportResult: The number of inserted and rejected rows and the first rejected rows.
+
+    Raises:
+        HTTPException: If the content type is not NDJSON or CSV.
+
+    Example:
+        - You can send a POST request with a CSV file of products to load a catalog
+        in one call.
+
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        records = iter_ndjson_records(request.stream())
+    elif content_type in CSV_CONTENT_TYPES:
+        records = iter_csv_records(request.stream())
+    else:
+        raise HTTPException(status_code=415, detail="Expected an application/x-ndjson or text/csv body")
+    return await async_crud.import_products(db, records, atomic=atomic)
+
 @router.put("/{product_id}", response_model=schema.Product)
 def update_product(product_id: int, product: schema.ProductUpdate, db: Session = Depends(get_db)):
     """
     Update an existing product.
 
     This endpoint allows you to update an existing product by providing its ID and
-    the updated data.
+    the updated data. Optional fields left out of the request keep their current
+    values; send them as null to clear them.
 
     Args:
         product_id (int): The ID of the product to update.
@@ -113,7 +345,10 @@ def update_product(product_id: int, product: schema.ProductUpdate, db: Session =
     db_product = crud.get_product_by_id(db, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return crud.update_product(db=db, product=db_product, product_update=product)
+    try:
+        return crud.update_product(db=db, product=db_product, product_update=product)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{product_id}", response_model=schema.Product)
 def delete_product(product_id: int, db: Session = Depends(get_db)):
@@ -140,4 +375,6 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
     db_product = crud.get_product_by_id(db, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return crud.delete_product(db=db, product_id=product_id)
+    deleted_product = schema.Product.from_orm(db_product)
+    crud.delete_product(db=db, product_id=product_id)
+    return deleted_product
@@ -4,6 +4,9 @@ from datetime import timedelta
 from app import schema
 from fastapi.security import OAuth2PasswordRequestForm
 from app.security.authentication import authenticate_user, generate_access_token
+from app.security.hashing import HasherBusyError
+from app.database import get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from config import ACCESS_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter(
@@ -13,7 +16,7 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=schema.Token)
-async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
+async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: AsyncSession = Depends(get_async_db)):
     """
     Obtain an access token for authentication.
 
@@ -24,12 +27,14 @@ async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm,
     Args:
         form_data (OAuth2PasswordRequestForm): The form data containing the
         username and password.
+        db (AsyncSession): The async database session.
 
     Returns:
         schema.Token: The access token and its type ("bearer").
 
     Raises:
-        HTTPException: If the provided username or password is incorrect.
+        HTTPException: If the provided username or password is incorrect, or if
+        the server is too busy verifying other logins (503).
 
     Example:
         - You can send a GET request with a valid username and password to
@@ -37,7 +42,14 @@ async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm,
 
     """
 
-    user = authenticate_user(form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except HasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, try again shortly",
+            headers={"Retry-After": "1"}
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
 from app import schema
-from app.security.authentication import get_current_user
-from app import crud
-from app.database import get_db
-from sqlalchemy.orm import Session
+from app.security.authentication import get_current_user, get_password_hash_async
+from app.security.hashing import HasherBusyError
+from app import async_crud
+from app.database import get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(
     prefix="/users",
@@ -34,25 +35,34 @@ async def read_users_me(current_user: schema.User = Depends(get_current_user)):
     return current_user
 
 @router.post("/", response_model=schema.User)
-async def create_user(user: schema.UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: schema.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new user.
 
     This endpoint allows you to create a new user with the provided information.
+    The password is hashed on the password hashing pool and only its hash is stored.
 
     Args:
         user (schema.UserCreate): The user data to create a new user.
-        db (Session): The database session.
+        db (AsyncSession): The async database session.
 
     Returns:
         schema.User: The created user's profile information.
 
     Raises:
-        HTTPException: If there's an issue with user creation.
+        HTTPException: If the server is too busy hashing other passwords (503).
 
     Example:
         - You can send a POST request with user data to create a new user.
 
     """
-    db_user = crud.create_user(db=db, user=user)
+    try:
+        hashed_password = await get_password_hash_async(user.password)
+    except HasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many password operations in progress, try again shortly",
+            headers={"Retry-After": "1"}
+        )
+    db_user = await async_crud.create_user(db=db, user=user, hashed_password=hashed_password)
     return db_user
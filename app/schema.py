@@ -3,7 +3,7 @@
 # Description: This file contains the Pydantic models.
 
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, root_validator, validator
 
 class OrderBase(BaseModel):
     """
@@ -36,6 +36,36 @@ class Order(OrderBase):
     class Config:
         orm_mode = True
 
+class OrderItem(BaseModel):
+    """
+    Model for a line item of an order.
+
+    Includes the product, quantity and unit price charged at checkout.
+    """
+    product_id: int
+    quantity: int
+    unit_price: int
+
+    class Config:
+        orm_mode = True
+
+class OrderDetail(Order):
+    """
+    Model for retrieving an order with its line items.
+
+    Inherited from Order, includes the order's line items.
+    """
+    items: List[OrderItem]
+
+class CheckoutRequest(BaseModel):
+    """
+    Model for checking out a shopping cart.
+
+    Includes the user whose cart is checked out and the payment to link to the order.
+    """
+    user_id: int
+    payment_id: int
+
 class OrderStatusBase(BaseModel):
     """
     Base model for order statuses.
@@ -63,6 +93,31 @@ class OrderStatus(OrderStatusBase):
     class Config:
         orm_mode = True
 
+class OrderStatusUpdate(BaseModel):
+    """
+    Model for changing the status of an order.
+
+    The new status is given by its ID or by its name; when both are given they must
+    name the same status.
+    """
+    status_id: Optional[int] = None
+    status: Optional[str] = None
+
+    @root_validator(skip_on_failure=True)
+    def _require_status(cls, values):
+        if values.get("status_id") is None and values.get("status") is None:
+            raise ValueError("status_id or status is required")
+        return values
+
+class OrderWithStatus(Order):
+    """
+    Model for retrieving an order with the name of its status.
+
+    Inherited from Order, includes the status name, or None if the order's status does
+    not exist in the order_status table.
+    """
+    status: Optional[str] = None
+
 class PaymentBase(BaseModel):
     """
     Base model for payment information.
@@ -151,6 +206,33 @@ class Cart(CartBase):
     class Config:
         orm_mode = True
 
+class CartLine(BaseModel):
+    """
+    Model for a priced line of a shopping cart.
+
+    Includes the cart item with its product's details and the line total.
+    """
+    cart_id: int
+    product_id: int
+    quantity: int
+    name: str
+    price: int
+    image_url: Optional[str] = None
+    line_total: int
+
+    class Config:
+        orm_mode = True
+
+class PricedCart(BaseModel):
+    """
+    Model for a shopping cart with product details and totals.
+
+    Includes the priced cart lines and the cart total.
+    """
+    user_id: int
+    items: List[CartLine]
+    total: int
+
 class ProductBase(BaseModel):
     """
     Base model for product information.
@@ -162,21 +244,33 @@ class ProductBase(BaseModel):
     description: Optional[str] = None
     image_url: Optional[str] = None
 
+def _split_category_ids(value):
+    # CSV imports carry the category IDs as a single "1,2,3" field
+    if isinstance(value, str):
+        return [part for part in value.replace(";", ",").split(",") if part.strip()]
+    return value
+
 class ProductCreate(ProductBase):
     """
     Model for creating a new product.
 
-    Inherited from ProductBase, includes fields required for product creation.
+    Inherited from ProductBase, includes fields required for product creation and the
+    IDs of the categories the product belongs to.
     """
-    pass
+    category_ids: List[int] = []
+
+    _split_category_ids = validator("category_ids", pre=True, allow_reuse=True)(_split_category_ids)
 
 class ProductUpdate(ProductBase):
     """
     Model for updating product information.
 
-    Inherited from ProductBase, includes fields for updating product details.
+    Inherited from ProductBase, includes fields for updating product details. The
+    categories are replaced when category_ids is given and kept otherwise.
     """
-    pass
+    category_ids: Optional[List[int]] = None
+
+    _split_category_ids = validator("category_ids", pre=True, allow_reuse=True)(_split_category_ids)
 
 class Product(ProductBase):
     """
@@ -189,6 +283,42 @@ class Product(ProductBase):
     class Config:
         orm_mode = True
 
+class ProductLookupRequest(BaseModel):
+    """
+    Model for looking up several products at once.
+
+    Includes the IDs of the products, in the order they should be returned.
+    """
+    ids: List[int]
+
+class ProductLookupResult(BaseModel):
+    """
+    Model for the outcome of a product lookup.
+
+    Includes the products found, in request order, and the IDs that do not exist.
+    """
+    items: List[Product]
+    missing: List[int]
+
+class BulkImportError(BaseModel):
+    """
+    Model for a row rejected by a bulk import.
+
+    Includes the row number in the uploaded file and the reason it was rejected.
+    """
+    row: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    """
+    Model for the outcome of a bulk import.
+
+    Includes the number of inserted and rejected rows and the first rejected rows.
+    """
+    inserted: int
+    failed: int
+    errors: List[BulkImportError]
+
 class CategoryBase(BaseModel):
     """
     Base model for product categories.
@@ -216,6 +346,34 @@ class Category(CategoryBase):
     class Config:
         orm_mode = True
 
+class CategoryWithCount(Category):
+    """
+    Model for a product category with its number of products.
+
+    Inherited from Category, includes the precomputed product count.
+    """
+    product_count: int
+
+class PriceBucket(BaseModel):
+    """
+    Model for a product price bucket facet.
+
+    Includes the bucket's price range (max_price is exclusive, None for the last
+    bucket) and its number of products.
+    """
+    min_price: int
+    max_price: Optional[int] = None
+    product_count: int
+
+class ProductFacets(BaseModel):
+    """
+    Model for the product catalog facets.
+
+    Includes the number of products per category and per price bucket.
+    """
+    categories: List[CategoryWithCount]
+    price_buckets: List[PriceBucket]
+
 class CustomerServiceBase(BaseModel):
     """
     Base model for customer service inquiries.
@@ -253,3 +411,112 @@ class Token(BaseModel):
     """
     access_token: str
     token_type: str
+
+class TokenData(BaseModel):
+    """
+    Model for the data carried in an access token.
+
+    Includes the username the token was issued to.
+    """
+    username: Optional[str] = None
+
+class PoolStatus(BaseModel):
+    """
+    Model for the live state of a database connection pool.
+
+    Includes pool occupancy and connection checkout wait statistics.
+    """
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_time_total_ms: float = 0.0
+    wait_time_avg_ms: float = 0.0
+    wait_time_max_ms: float = 0.0
+
+class HealthStatus(BaseModel):
+    """
+    Model for the result of a liveness or readiness probe.
+
+    Includes the probe status and, for a worker that is not ready, the reason.
+    """
+    status: str
+    detail: Optional[str] = None
+
+class SingleFlightStats(BaseModel):
+    """
+    Model for the counters of a single-flight group.
+
+    Includes how many reads ran and how many joined a read already in flight.
+    """
+    executed: int
+    coalesced: int
+    errors: int
+    in_flight: int
+
+class InquiryAccepted(BaseModel):
+    """
+    Model for an inquiry accepted for write-behind ingestion.
+
+    The inquiry is queued and written to the database shortly after.
+    """
+    status: str = "accepted"
+
+class WriteBehindStats(BaseModel):
+    """
+    Model for the state of a write-behind batch writer.
+
+    Includes the queue occupancy and the row and batch counters.
+    """
+    queued: int
+    max_queue: int
+    accepted: int
+    rejected: int
+    written: int
+    dropped: int
+    batches: int
+    failures: int
+
+class RateLimitStats(BaseModel):
+    """
+    Model for the state of the rate limiter.
+
+    Includes the backend and rules, the in-memory bucket counts and the decision counters.
+    """
+    enabled: bool
+    backend: str
+    rules: List[str]
+    buckets: int
+    evicted: int
+    allowed: int
+    rejected: int
+    shared_errors: int
+
+class HasherStats(BaseModel):
+    """
+    Model for the state of the password hashing pool.
+
+    Includes the worker and queue limits, current occupancy and job counters.
+    """
+    workers: int
+    max_queue: int
+    active: int
+    queued: int
+    completed: int
+    rejected: int
+    queue_wait_avg_ms: float
+
+class CacheStats(BaseModel):
+    """
+    Model for the counters of an in-process cache.
+
+    Includes the cache occupancy and hit, miss and eviction counts.
+    """
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
@@ -3,15 +3,16 @@ from fastapi import HTTPException, status, Depends
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
 from config import *
-from app import crud, schema, models
-from app.database import engine, get_db
-
-# Create database tables if they don't exist
-models.Base.metadata.create_all(bind=engine)
+from app import async_crud, schema
+from app.cache import token_cache, user_cache
+from app.database import get_async_db
+from app.security.hashing import password_hasher
+from app.singleflight import auth_user_flight
 
 # Create a password context for hashing and verifying passwords
 password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -44,22 +45,56 @@ def get_password_hash(password):
     """
     return password_context.hash(password)
 
-def authenticate_user(db: Session, username: str, password: str):
+async def verify_password_async(plain_password, hashed_password):
+    """
+    Verify a plaintext password on the password hashing pool, without blocking the event loop.
+
+    Args:
+        plain_password (str): The plaintext password.
+        hashed_password (str): The hashed password.
+
+    Returns:
+        bool: True if the passwords match, False otherwise.
+
+    Raises:
+        HasherBusyError: If the password hashing queue is full.
+    """
+    return await password_hasher.run(password_context.verify, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """
+    Hash a password on the password hashing pool, without blocking the event loop.
+
+    Args:
+        password (str): The password to be hashed.
+
+    Returns:
+        str: The hashed password.
+
+    Raises:
+        HasherBusyError: If the password hashing queue is full.
+    """
+    return await password_hasher.run(password_context.hash, password)
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
     """
     Authenticate a user with a username and password.
 
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The async database session.
         username (str): The username of the user.
         password (str): The user's password.
 
     Returns:
         schema.User | bool: The authenticated user or False if authentication fails.
+
+    Raises:
+        HasherBusyError: If the password hashing queue is full.
     """
-    user = crud.get_user_by_username(db, username)
+    user = await async_crud.get_user_by_username(db, username)
     if not user:
         return False
-    if not verify_password(password, user.password):
+    if not await verify_password_async(password, user.password):
         return False
     return user
 
@@ -74,7 +109,7 @@ def generate_access_token(user: schema.UserBase, expires_delta: timedelta | None
     Returns:
         str: The generated access token.
     """
-    to_encode = user.dict()
+    to_encode = {"sub": user.username}
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -83,13 +118,25 @@ def generate_access_token(user: schema.UserBase, expires_delta: timedelta | None
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)):
+async def _load_user(db: AsyncSession, username: str, version: int):
+    db_user = await async_crud.get_user_by_username(db, username)
+    if db_user is None:
+        return None
+    user = schema.User.from_orm(db_user)
+    user_cache.set(username, user, version=version)
+    return user
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: AsyncSession = Depends(get_async_db)):
     """
     Get the current user based on the provided access token.
 
+    Validated tokens and resolved users are cached for at most AUTH_CACHE_TTL seconds,
+    and never past the token's expiry, so repeat requests skip both the JWT decode
+    and the user lookup. Deleting a user drops their cached entries.
+
     Args:
         token (Annotated[str, Depends(oauth2_scheme)]): The access token for authentication.
-        db (Session): The database session.
+        db (AsyncSession): The async database session.
 
     Returns:
         schema.User: The authenticated user.
@@ -102,6 +149,10 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Se
         detail="Invalid authentication credentials",
         headers={"WWW-Authenticate": "Bearer"}
     )
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+    version = token_cache.version
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -110,7 +161,14 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Se
         token_data = schema.TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = crud.get_user_by_username(db, token_data.username)
+    user = user_cache.get(token_data.username)
     if user is None:
-        raise credentials_exception
+        # Concurrent requests with tokens of the same uncached user share one lookup
+        user_version = user_cache.version
+        user = await auth_user_flight.do((token_data.username, user_version), _load_user, db, token_data.username, user_version)
+        if user is None:
+            raise credentials_exception
+    ttl = min(AUTH_CACHE_TTL, payload.get("exp", 0) - time.time())
+    if ttl > 0:
+        token_cache.set(token, user, version=version, ttl=ttl)
     return user
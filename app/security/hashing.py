@@ -0,0 +1,89 @@
+# Description: This file contains the bounded worker pool for password hashing.
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE
+
+class HasherBusyError(Exception):
+    """
+    Raised when the password hashing queue is full.
+    """
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL, so work on this pool does not stall the event loop;
+    capping the workers and the queue keeps a burst of logins from occupying the
+    shared threadpool that serves sync endpoints, and lets excess logins be
+    rejected immediately instead of piling up.
+    """
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        self._lock = threading.Lock()
+
+    async def run(self, fn, *args):
+        """
+        Run a hashing function on the pool and wait for its result.
+
+        Args:
+            fn (Callable): The hashing or verification function.
+            *args: Arguments for fn.
+
+        Returns:
+            The result of fn.
+
+        Raises:
+            HasherBusyError: If all workers are busy and the queue is full.
+        """
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HasherBusyError("Password hashing queue is full")
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, time.perf_counter(), fn, args)
+        finally:
+            self.in_flight -= 1
+
+    def _call(self, submitted: float, fn, args):
+        with self._lock:
+            self.active += 1
+            self.queue_wait_total += time.perf_counter() - submitted
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    def stats(self):
+        """
+        Report the pool occupancy and counters.
+
+        Returns:
+            dict: Worker and queue limits, running and queued jobs, completed and rejected
+            jobs and the average time jobs waited in the queue.
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": max(self.in_flight - self.active, 0),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_wait_avg_ms": self.queue_wait_total * 1000 / self.completed if self.completed else 0.0,
+            }
+
+# Shared pool for all password hashing in this worker process
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
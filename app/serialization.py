@@ -0,0 +1,50 @@
+# Description: This file contains the fast serialization path for list endpoints.
+#
+# List endpoints select only the response schema's columns, turn the column tuples into
+# plain dicts and encode them with orjson. This skips building ORM objects, validating
+# each item through an orm_mode pydantic model and the stdlib json encoder, while
+# producing the same JSON as the response_model.
+
+from fastapi.responses import ORJSONResponse
+
+def schema_columns(model, response_schema):
+    """
+    Get a model's columns for the fields of a response schema, in the schema's field order.
+
+    Args:
+        model: The ORM model, e.g. models.Product.
+        response_schema: The pydantic response model, e.g. schema.Product.
+
+    Returns:
+        List[InstrumentedAttribute]: One column per schema field.
+    """
+    return [getattr(model, field) for field in response_schema.__fields__]
+
+def row_dicts(rows, fields: list[str]):
+    """
+    Turn column tuples into response dicts.
+
+    Args:
+        rows (Iterable[tuple]): Rows selected with the columns of 'fields', in the same order.
+        fields (List[str]): The response schema's field names.
+
+    Returns:
+        List[dict]: One dict per row, keyed by field name.
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
+def list_response(items: list[dict], headers: dict | None = None):
+    """
+    Encode a list endpoint's items with orjson.
+
+    Returning a Response directly bypasses FastAPI's per-item response_model validation,
+    so 'items' must already match the response schema, e.g. as built by row_dicts.
+
+    Args:
+        items (List[dict]): The response items.
+        headers (dict | None): Extra response headers.
+
+    Returns:
+        ORJSONResponse: The encoded response.
+    """
+    return ORJSONResponse(items, headers=headers)
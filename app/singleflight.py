@@ -0,0 +1,191 @@
+# Description: This file contains the single-flight groups that coalesce concurrent identical reads.
+#
+# While a read for a key is in flight, further callers asking for the same key wait for it
+# and share its result instead of issuing their own query. Results are shared between
+# requests, so they must be immutable or detached values (schema objects, rows), never ORM
+# objects bound to the leader's session. Keys should include the version of the cache the
+# result is stored in, so a read started before a write is not shared with callers that
+# arrive after it.
+
+import asyncio
+import threading
+
+from app.metrics import SINGLEFLIGHT_CALLS
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls made from threads, e.g. sync endpoints.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.executed = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._executed_metric = SINGLEFLIGHT_CALLS.labels(name, "executed")
+        self._coalesced_metric = SINGLEFLIGHT_CALLS.labels(name, "coalesced")
+        singleflight_groups[name] = self
+
+    def do(self, key, fn, *args):
+        """
+        Call fn(*args), or wait for the call already in flight for the same key.
+
+        Args:
+            key: Identifies identical calls; must be hashable.
+            fn (Callable): The function to call.
+            *args: Arguments for fn.
+
+        Returns:
+            The result of the call for this key.
+
+        Raises:
+            Exception: Whatever the call raised, re-raised in every waiting caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            self._coalesced_metric.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        self._executed_metric.inc()
+        try:
+            call.result = fn(*args)
+            return call.result
+        except Exception as e:
+            call.error = e
+            self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """
+        Report the group's counters.
+
+        Returns:
+            dict: Calls executed, calls coalesced into an in-flight call, failed executions
+            and calls in flight.
+        """
+        with self._lock:
+            return _stats(self)
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent identical calls made from coroutines on one event loop.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.executed = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._calls = {}
+        self._executed_metric = SINGLEFLIGHT_CALLS.labels(name, "executed")
+        self._coalesced_metric = SINGLEFLIGHT_CALLS.labels(name, "coalesced")
+        singleflight_groups[name] = self
+
+    async def do(self, key, fn, *args):
+        """
+        Await fn(*args), or wait for the call already in flight for the same key.
+
+        If the caller running the call is cancelled (e.g. its client disconnected), one of
+        the waiting callers runs it again instead of failing.
+
+        Args:
+            key: Identifies identical calls; must be hashable.
+            fn (Callable): The coroutine function to call.
+            *args: Arguments for fn.
+
+        Returns:
+            The result of the call for this key.
+
+        Raises:
+            Exception: Whatever the call raised, re-raised in every waiting caller.
+        """
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                return await self._execute(key, fn, args)
+            self.coalesced += 1
+            self._coalesced_metric.inc()
+            try:
+                # Shielded, so a waiter being cancelled does not cancel the shared call
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+    async def _execute(self, key, fn, args):
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.executed += 1
+        self._executed_metric.inc()
+        try:
+            result = await fn(*args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.errors += 1
+            future.set_exception(e)
+            # Retrieved here so an error nobody else waited for is not reported as unhandled
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self):
+        """
+        Report the group's counters.
+
+        Returns:
+            dict: Calls executed, calls coalesced into an in-flight call, failed executions
+            and calls in flight.
+        """
+        return _stats(self)
+
+def _stats(group):
+    return {
+        "executed": group.executed,
+        "coalesced": group.coalesced,
+        "errors": group.errors,
+        "in_flight": len(group._calls),
+    }
+
+# Every single-flight group by name, for /health/singleflight
+singleflight_groups = {}
+
+# Product cache misses of GET /products/{product_id}, by (product ID, cache version)
+product_flight = SingleFlight("product")
+
+# Product validator lookups of conditional GET /products/{product_id}, by (product ID, cache version)
+product_validator_flight = SingleFlight("product_validator")
+
+# Product list cache misses, by (page key, cache version)
+product_page_flight = SingleFlight("product_page")
+
+# User lookups of token authentication, by (username, cache version)
+auth_user_flight = AsyncSingleFlight("auth_user")
+
+# Async counterparts of the product groups, for the async_crud cached readers
+async_product_flight = AsyncSingleFlight("async_product")
+async_product_validator_flight = AsyncSingleFlight("async_product_validator")
+async_product_page_flight = AsyncSingleFlight("async_product_page")
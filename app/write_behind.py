@@ -0,0 +1,179 @@
+# Description: This file contains the write-behind batch writer used for inquiry ingestion.
+#
+# Requests hand their rows to the writer and return immediately; a background task on the
+# event loop writes them in multi-row batches, turning thousands of single-row transactions
+# a second into a few large ones. Rows wait in memory only, so a crashed worker loses what
+# was queued; a normal shutdown writes everything still queued first. A batch that fails on
+# its data is split until the failing rows are isolated, so one bad row never holds back the
+# rest of the queue.
+
+import asyncio
+import logging
+from collections import deque
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from config import INQUIRY_BATCH_SIZE, INQUIRY_DRAIN_TIMEOUT, INQUIRY_FLUSH_INTERVAL, INQUIRY_MAX_ATTEMPTS, INQUIRY_QUEUE_SIZE
+from app import async_crud
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Errors raised when the database cannot be reached, as opposed to rejecting the rows
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+
+class QueueFullError(Exception):
+    """
+    Raised when the write-behind queue is full.
+    """
+
+class BatchWriter:
+    """
+    A bounded in-memory queue of rows flushed to the database in batches.
+
+    A batch is written as soon as batch_size rows are queued, and whatever is queued is
+    written every flush_interval seconds. A batch failing because the database is
+    unreachable is put back at the head of the queue and retried on the next flush. A
+    batch failing for any other reason is split in halves until the failing rows are
+    isolated and the others are written; a failing row is retried on later flushes and
+    dropped, with an error logged, after max_attempts failures. All methods must be called
+    from the event loop.
+    """
+    def __init__(self, name: str, write_batch, max_queue: int, batch_size: int, flush_interval: float, drain_timeout: float, max_attempts: int):
+        self.name = name
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drain_timeout = drain_timeout
+        self.max_attempts = max_attempts
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failures = 0
+        self._write_batch = write_batch
+        # [row, failed attempts] entries
+        self._pending = deque()
+        self._full = None
+        self._task = None
+        self._stopping = False
+
+    def submit(self, row: dict):
+        """
+        Queue a row for the next batch.
+
+        Args:
+            row (dict): The row to insert.
+
+        Raises:
+            QueueFullError: If max_queue rows are already waiting.
+        """
+        if len(self._pending) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"The {self.name} queue is full")
+        self._pending.append([row, 0])
+        self.accepted += 1
+        if len(self._pending) >= self.batch_size and self._full is not None:
+            self._full.set()
+
+    def start(self):
+        """
+        Start the background flush task.
+        """
+        self._stopping = False
+        # Created here so the event belongs to the loop the application runs on
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the flush task and write every queued row.
+
+        Rows that still cannot be written after drain_timeout seconds are logged as lost.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        self._full.set()
+        await self._task
+        self._task = None
+        deadline = asyncio.get_running_loop().time() + self.drain_timeout
+        while self._pending and not await self._flush():
+            if asyncio.get_running_loop().time() >= deadline:
+                break
+            await asyncio.sleep(min(self.flush_interval, 1))
+        if self._pending:
+            logger.error("Lost %d queued %s at shutdown", len(self._pending), self.name)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self._full.clear()
+            await self._flush()
+
+    async def _flush(self):
+        # Write every queued row; returns False if rows were put back for a later flush
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            retry = await self._write(batch)
+            if retry:
+                self._pending.extendleft(reversed(retry))
+                return False
+        return True
+
+    async def _write(self, batch: list):
+        # Write a batch of entries, splitting it to isolate failing rows; returns the entries to retry
+        try:
+            written = await self._write_batch([row for row, _ in batch])
+        except Exception as e:
+            self.failures += 1
+            if isinstance(e, TRANSIENT_ERRORS):
+                logger.warning("Writing %d %s failed, retrying: %s: %s", len(batch), self.name, type(e).__name__, e)
+                return batch
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                return await self._write(batch[:middle]) + await self._write(batch[middle:])
+            entry = batch[0]
+            entry[1] += 1
+            if entry[1] < self.max_attempts:
+                logger.warning("Writing one of %s failed (attempt %d), retrying: %s: %s", self.name, entry[1], type(e).__name__, e)
+                return batch
+            self.dropped += 1
+            logger.error("Dropping one of %s after %d failed attempts: %s: %s: %r", self.name, entry[1], type(e).__name__, e, entry[0])
+            return []
+        self.batches += 1
+        self.written += written
+        return []
+
+    def stats(self):
+        """
+        Report the writer's queue and counters.
+
+        Returns:
+            dict: Queued rows and the queue limit, and the accepted, rejected, written and
+            dropped (failed max_attempts times) row, batch and failed write counts.
+        """
+        return {
+            "queued": len(self._pending),
+            "max_queue": self.max_queue,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "failures": self.failures,
+        }
+
+async def _write_inquiries(inquiries: list[dict]):
+    async with AsyncSessionLocal() as db:
+        return await async_crud.add_inquiries(db, inquiries)
+
+# Queued customer service inquiries, used when INQUIRY_WRITE_BEHIND is set
+inquiry_writer = BatchWriter(
+    "inquiries", _write_inquiries, INQUIRY_QUEUE_SIZE, INQUIRY_BATCH_SIZE, INQUIRY_FLUSH_INTERVAL, INQUIRY_DRAIN_TIMEOUT,
+    INQUIRY_MAX_ATTEMPTS,
+)
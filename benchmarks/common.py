@@ -0,0 +1,30 @@
+# Description: Helpers shared by the benchmark scripts.
+
+import socket
+
+def percentile(samples: list[float], pct: float):
+    """
+    Nearest-rank percentile of a list of samples.
+
+    Args:
+        samples (List[float]): The samples.
+        pct (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile value, or 0.0 if there are no samples.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+def free_port():
+    """
+    Find a free TCP port on the loopback interface for a benchmark server.
+
+    Returns:
+        int: The port number.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,83 @@
+# Description: Measures catalog latency while the server is flooded with logins.
+#
+# Usage (against a running server with a seeded user):
+#   python benchmarks/login_storm.py --base-url http://localhost:8000 \
+#       --username alice --password secret --logins 200 --duration 10
+#
+# Runs the catalog load twice, alone and during a login storm, and prints the
+# p50/p95/p99 latency of GET /products/ for both runs.
+
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlencode
+
+import httpx
+
+from common import percentile
+
+async def catalog_load(client: httpx.AsyncClient, duration: float, concurrency: int):
+    """
+    Request GET /products/ from 'concurrency' clients for 'duration' seconds.
+
+    Returns:
+        List[float]: Request latencies in milliseconds.
+    """
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await client.get("/products/", params={"limit": 20})
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+async def login_storm(client: httpx.AsyncClient, duration: float, concurrency: int, username: str, password: str):
+    """
+    Send login requests from 'concurrency' clients for 'duration' seconds.
+
+    Returns:
+        dict: Response counts by status code.
+    """
+    statuses = {}
+    deadline = time.perf_counter() + duration
+    body = urlencode({"username": username, "password": password})
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            response = await client.request("GET", "/token/", content=body, headers=headers)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return statuses
+
+def report(name: str, latencies: list[float]):
+    print(f"{name:<14} n={len(latencies):<7} mean={statistics.fmean(latencies) if latencies else 0:8.2f}ms "
+          f"p50={percentile(latencies, 50):8.2f}ms p95={percentile(latencies, 95):8.2f}ms p99={percentile(latencies, 99):8.2f}ms")
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.catalog_clients + args.logins)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        baseline = await catalog_load(client, args.duration, args.catalog_clients)
+        storm_latencies, statuses = await asyncio.gather(
+            catalog_load(client, args.duration, args.catalog_clients),
+            login_storm(client, args.duration, args.logins, args.username, args.password),
+        )
+    report("catalog alone", baseline)
+    report("during storm", storm_latencies)
+    print(f"login responses by status: {dict(sorted(statuses.items()))}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=100, help="concurrent login clients")
+    parser.add_argument("--catalog-clients", type=int, default=10, help="concurrent catalog clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    asyncio.run(main(parser.parse_args()))
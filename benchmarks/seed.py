@@ -0,0 +1,169 @@
+# Description: Seeds a database with realistic volumes for the benchmark suite.
+#
+# Usage:
+#   POSTGRES_URL=sqlite:////tmp/bench.db python benchmarks/seed.py --scale 1 --reset
+#
+# POSTGRES_URL selects the database (SQLite or a throwaway PostgreSQL); it must be set
+# before the app is imported, so run this as a script or call seed() from a process whose
+# environment already points at the benchmark database.
+
+import argparse
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Row counts at --scale 1
+BASE_VOLUMES = {
+    "users": 1_000,
+    "categories": 25,
+    "products": 10_000,
+    "orders": 20_000,
+}
+
+# Password of every seeded user, for the token and users benchmarks
+SEED_PASSWORD = "benchmark"
+
+ORDER_STATUSES = ["placed", "paid", "shipped", "delivered", "cancelled"]
+
+ADJECTIVES = ["red", "blue", "running", "leather", "wireless", "organic", "compact", "vintage", "waterproof", "classic"]
+NOUNS = ["shoe", "jacket", "headphones", "backpack", "lamp", "mug", "watch", "keyboard", "tent", "bottle"]
+
+# Rows inserted per statement
+CHUNK_SIZE = 5_000
+
+def volumes(scale: float):
+    """
+    Scale the base row counts.
+
+    Args:
+        scale (float): The multiplier applied to BASE_VOLUMES.
+
+    Returns:
+        dict: Row counts by table group.
+    """
+    return {name: max(1, int(count * scale)) for name, count in BASE_VOLUMES.items()}
+
+def _insert(connection, table, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        connection.execute(insert(table), rows[start:start + CHUNK_SIZE])
+
+def seed(engine, scale: float = 1.0, reset: bool = False, rng_seed: int = 42):
+    """
+    Create the schema and fill it with deterministic pseudo-random data.
+
+    Nothing is inserted if the database already holds products, unless reset is set.
+    Facet counts and the catalog version are filled in to match the seeded catalog.
+
+    Args:
+        engine (Engine): The engine of the benchmark database.
+        scale (float): The multiplier applied to BASE_VOLUMES.
+        reset (bool): Drop and recreate every table first.
+        rng_seed (int): The random seed, so runs against a reseeded database are comparable.
+
+    Returns:
+        dict: The row counts of the seeded tables, or of the existing data.
+    """
+    from app import crud, models
+    from app.security.authentication import get_password_hash
+
+    if reset:
+        models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    counts = volumes(scale)
+    with engine.begin() as connection:
+        existing = connection.scalar(select(func.count()).select_from(models.Product))
+        if existing:
+            return {
+                "users": connection.scalar(select(func.count()).select_from(models.User)),
+                "categories": connection.scalar(select(func.count()).select_from(models.Category)),
+                "products": existing,
+                "orders": connection.scalar(select(func.count()).select_from(models.Order)),
+                "inquiries": connection.scalar(select(func.count()).select_from(models.CustomerService)),
+            }
+        rng = random.Random(rng_seed)
+        now = datetime.utcnow()
+        password = get_password_hash(SEED_PASSWORD)
+
+        _insert(connection, models.OrderStatus, [{"status_id": i + 1, "status": status} for i, status in enumerate(ORDER_STATUSES)])
+        _insert(connection, models.User, [
+            {"user_id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": password}
+            for i in range(1, counts["users"] + 1)
+        ])
+        _insert(connection, models.Payment, [
+            {"payment_id": i, "user_id": i, "card_number": f"4000{i:012d}", "card_holder": f"User {i}", "expiration_date": "2030-12", "cvv": 100 + i % 900}
+            for i in range(1, counts["users"] + 1)
+        ])
+        _insert(connection, models.Category, [{"category_id": i, "name": f"Category {i}"} for i in range(1, counts["categories"] + 1)])
+
+        products = []
+        links = []
+        category_deltas = {}
+        bucket_deltas = {}
+        for product_id in range(1, counts["products"] + 1):
+            name = f"{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {product_id}"
+            price = rng.randint(1, 1000)
+            products.append({
+                "product_id": product_id, "name": name, "price": price, "description": f"A {name} for everyday use",
+                "image_url": f"https://example.com/images/{product_id}.jpg", "version": 1, "updated_at": now,
+            })
+            for category_id in rng.sample(range(1, counts["categories"] + 1), k=min(counts["categories"], rng.randint(1, 3))):
+                links.append({"product_id": product_id, "category_id": category_id})
+                category_deltas[category_id] = category_deltas.get(category_id, 0) + 1
+            bucket = crud.price_bucket(price)
+            if bucket is not None:
+                bucket_deltas[bucket] = bucket_deltas.get(bucket, 0) + 1
+        _insert(connection, models.Product, products)
+        _insert(connection, models.ProductCategory, links)
+        _insert(connection, models.CategoryFacet, [{"category_id": key, "product_count": count} for key, count in category_deltas.items()])
+        _insert(connection, models.PriceBucketFacet, [{"min_price": key, "product_count": count} for key, count in bucket_deltas.items()])
+        _insert(connection, models.CatalogVersion, [{"catalog_id": 1, "version": 1, "updated_at": now}])
+
+        orders = []
+        items = []
+        start = date(2023, 1, 1)
+        for order_id in range(1, counts["orders"] + 1):
+            user_id = rng.randint(1, counts["users"])
+            lines = [(rng.randint(1, counts["products"]), rng.randint(1, 3)) for _ in range(rng.randint(1, 4))]
+            total = 0
+            for product_id, quantity in lines:
+                unit_price = products[product_id - 1]["price"]
+                items.append({"order_id": order_id, "product_id": product_id, "quantity": quantity, "unit_price": unit_price})
+                total += unit_price * quantity
+            orders.append({
+                "order_id": order_id, "user_id": user_id, "date": (start + timedelta(days=rng.randint(0, 364))).isoformat(),
+                "total_cost": total, "payment_id": user_id, "status_id": rng.randint(1, len(ORDER_STATUSES)),
+            })
+        _insert(connection, models.Order, orders)
+        _insert(connection, models.OrderItem, items)
+
+        # customer_service.user_id is unique, so at most one inquiry per user
+        _insert(connection, models.CustomerService, [
+            {"inquiry_id": i, "user_id": i, "date": (start + timedelta(days=rng.randint(0, 364))).isoformat(), "message": f"Question {i} about my order"}
+            for i in range(1, counts["users"] + 1)
+        ])
+        if connection.dialect.name == "postgresql":
+            _reset_sequences(connection, models.Base.metadata)
+    return dict(counts, inquiries=counts["users"])
+
+def _reset_sequences(connection, metadata):
+    # Rows were inserted with explicit IDs, so move each PostgreSQL serial past them
+    for table in metadata.sorted_tables:
+        key = table.autoincrement_column
+        if key is None:
+            continue
+        name = connection.dialect.identifier_preparer.format_table(table)
+        connection.execute(text(f"SELECT setval(pg_get_serial_sequence('{name}', '{key.name}'), coalesce(max({key.name}), 1)) FROM {name}"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the benchmark database named by POSTGRES_URL.")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the base row counts")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate every table first")
+    args = parser.parse_args()
+
+    from app.database import engine
+    print(seed(engine, scale=args.scale, reset=args.reset))
@@ -0,0 +1,86 @@
+# Description: Compares the ORM + response_model serialization of list endpoints with the
+# column tuple + orjson fast path.
+#
+# Usage:
+#   POSTGRES_URL=sqlite:////tmp/bench.db python benchmarks/serialization.py --limit 100 --limit 1000
+#
+# The database is seeded like the benchmark suite (see seed.py) if it holds no products.
+# For each list and page size, both paths load the same page and render the response body;
+# the bodies are checked to be identical before the timings are printed.
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common import percentile
+
+async def orm_body(field, load, db, limit):
+    # What FastAPI does for a route returning ORM objects with a response_model
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+
+    content = await serialize_response(field=field, response_content=load(db, limit=limit))
+    return JSONResponse(content).body
+
+async def fast_body(load_rows, db, limit):
+    from app.serialization import list_response
+
+    return list_response(load_rows(db, limit=limit)).body
+
+async def measure(render, iterations: int):
+    """
+    Time 'iterations' calls of an async body renderer.
+
+    Returns:
+        List[float]: Call latencies in milliseconds.
+    """
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await render()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+async def main(limits: list[int], iterations: int, scale: float):
+    from fastapi.utils import create_response_field
+
+    from app import crud, schema
+    from app.database import SessionLocal, engine
+    from seed import seed
+
+    seed(engine, scale=scale)
+    lists = [
+        ("products", list[schema.Product], crud.get_product_list, crud.get_product_rows),
+        ("orders", list[schema.Order], crud.get_orders_list, crud.get_order_rows),
+        ("inquiries", list[schema.CustomerService], crud.get_inquiries_list, crud.get_inquiry_rows),
+    ]
+    print(f"{'list':<10} {'limit':>6} {'path':<5} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'speedup':>8}")
+    with SessionLocal() as db:
+        for name, response_type, load, load_rows in lists:
+            field = create_response_field(name="Response", type_=response_type)
+            for limit in limits:
+                slow = lambda: orm_body(field, load, db, limit)
+                fast = lambda: fast_body(load_rows, db, limit)
+                if await slow() != await fast():
+                    raise SystemExit(f"{name}: the fast path rendered a different body")
+                results = [("orm", await measure(slow, iterations)), ("fast", await measure(fast, iterations))]
+                baseline = statistics.mean(results[0][1])
+                for path, latencies in results:
+                    mean = statistics.mean(latencies)
+                    print(
+                        f"{name:<10} {limit:>6} {path:<5} {percentile(latencies, 50):>8.2f} {percentile(latencies, 95):>8.2f} "
+                        f"{mean:>8.2f} {baseline / mean:>7.1f}x"
+                    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare list endpoint serialization paths.")
+    parser.add_argument("--limit", type=int, action="append", help="page size to measure (repeatable, default 100 and 1000)")
+    parser.add_argument("--iterations", type=int, default=50, help="renders per list, page size and path")
+    parser.add_argument("--scale", type=float, default=1.0, help="seed scale if the database is empty")
+    args = parser.parse_args()
+    asyncio.run(main(args.limit or [100, 1000], args.iterations, args.scale))
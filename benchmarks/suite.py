@@ -0,0 +1,276 @@
+# Description: Benchmark suite driving every router against a seeded database.
+#
+# Usage:
+#   python benchmarks/suite.py --mode asgi --save benchmarks/baseline.json
+#   python benchmarks/suite.py --mode server --workers 4 --compare benchmarks/baseline.json
+#
+# 'asgi' runs the app in-process through httpx's ASGI transport, which measures the
+# application and database cost without any network or server overhead. 'server' starts
+# uvicorn with several workers and drives it over HTTP, which also measures the server,
+# the worker fan-out and per-worker pools and caches.
+#
+# The database is named by --database-url (default: a SQLite file in the temp directory)
+# and seeded on first use; see benchmarks/seed.py. Every endpoint gets --requests requests
+# from --concurrency concurrent clients, and throughput and p50/p95/p99 latency are
+# reported per endpoint. --save writes the results as a JSON baseline; --compare exits
+# with status 1 when an endpoint's p95 latency or throughput regressed past --threshold.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable
+from urllib.parse import urlencode
+
+import httpx
+
+from common import free_port, percentile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'fastapi-benchmark.db')}"
+
+@dataclass
+class Scenario:
+    """
+    One benchmarked endpoint.
+
+    'build' is called before every request with a random generator and the run context
+    and returns the request path and the extra httpx request arguments.
+    """
+    name: str
+    method: str
+    build: Callable
+    # Requests per run relative to --requests, for endpoints too slow to run in full (bcrypt)
+    weight: float = 1.0
+    # Status codes counted as successful
+    expected: tuple = (200,)
+
+def _login_body(rng, ctx):
+    user = rng.randint(1, ctx["users"])
+    return "/token/", {
+        "content": urlencode({"username": f"user{user}", "password": ctx["password"]}),
+        "headers": {"Content-Type": "application/x-www-form-urlencoded"},
+    }
+
+SCENARIOS = [
+    # products
+    Scenario("products.list", "GET", lambda rng, ctx: ("/products/", {"params": {"limit": 20, "skip": rng.randint(0, 50) * 20}})),
+    Scenario("products.list_by_price", "GET", lambda rng, ctx: ("/products/", {"params": {"limit": 20, "sort": "price"}})),
+    Scenario("products.list_by_category", "GET", lambda rng, ctx: ("/products/", {"params": {"limit": 20, "category": rng.randint(1, ctx["categories"])}})),
+    Scenario("products.get", "GET", lambda rng, ctx: (f"/products/{rng.randint(1, ctx['products'])}", {})),
+    Scenario("products.search", "GET", lambda rng, ctx: ("/products/search", {"params": {"q": rng.choice(["run", "red sho", "wireless", "leather jack"]), "limit": 20}})),
+    Scenario("products.facets", "GET", lambda rng, ctx: ("/products/facets", {})),
+    # cart
+    Scenario("cart.add", "POST", lambda rng, ctx: ("/cart/", {"json": {"user_id": rng.randint(1, ctx["users"]), "product_id": rng.randint(1, ctx["products"]), "quantity": 1}})),
+    Scenario("cart.priced", "GET", lambda rng, ctx: ("/cart/priced", {"params": {"user_id": rng.randint(1, ctx["users"])}})),
+    # orders
+    Scenario("orders.by_user", "GET", lambda rng, ctx: ("/orders/", {"params": {"user_id": rng.randint(1, ctx["users"])}})),
+    Scenario("orders.get", "GET", lambda rng, ctx: (f"/orders/{rng.randint(1, ctx['orders'])}", {})),
+    Scenario("orders.all", "GET", lambda rng, ctx: ("/orders/all", {"params": {"limit": 50, "sort": "date"}})),
+    # inquiries
+    Scenario("inquiries.list", "GET", lambda rng, ctx: ("/inquiries/", {"params": {"limit": 50}})),
+    Scenario("inquiries.get", "GET", lambda rng, ctx: (f"/inquiries/{rng.randint(1, ctx['inquiries'])}", {})),
+    # users
+    Scenario("users.me", "GET", lambda rng, ctx: ("/users/me/", {"headers": {"Authorization": f"Bearer {rng.choice(ctx['tokens'])}"}})),
+    Scenario("users.create", "POST", lambda rng, ctx: ("/users/", {"json": {
+        "username": f"bench-{ctx['run_id']}-{next(ctx['sequence'])}", "email": f"bench-{ctx['run_id']}-{next(ctx['sequence'])}@example.com", "password": "benchmark",
+    }}), weight=0.1),
+    # token
+    Scenario("token.login", "GET", _login_body, weight=0.1),
+]
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, ctx: dict, requests: int, concurrency: int, rng: random.Random):
+    """
+    Send 'requests' requests for one scenario from 'concurrency' concurrent clients.
+
+    Returns:
+        dict: Request and error counts, throughput and latency percentiles in milliseconds.
+    """
+    latencies = []
+    errors = 0
+    remaining = max(1, int(requests * scenario.weight))
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            path, kwargs = scenario.build(rng, ctx)
+            start = time.perf_counter()
+            response = await client.request(scenario.method, path, **kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code not in scenario.expected:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+async def run_suite(client: httpx.AsyncClient, ctx: dict, args):
+    """
+    Warm up, log in the benchmark users and run every selected scenario in turn.
+
+    Returns:
+        dict: Results keyed by scenario name.
+    """
+    rng = random.Random(args.seed)
+    for user in range(1, min(ctx["users"], 20) + 1):
+        response = await client.request("GET", "/token/", content=urlencode({"username": f"user{user}", "password": ctx["password"]}),
+                                        headers={"Content-Type": "application/x-www-form-urlencoded"})
+        response.raise_for_status()
+        ctx["tokens"].append(response.json()["access_token"])
+    results = {}
+    for scenario in SCENARIOS:
+        if args.only and not any(scenario.name.startswith(prefix) for prefix in args.only):
+            continue
+        await run_scenario(client, scenario, ctx, args.warmup, args.concurrency, rng)
+        results[scenario.name] = await run_scenario(client, scenario, ctx, args.requests, args.concurrency, rng)
+        report(scenario.name, results[scenario.name])
+    return results
+
+def report(name: str, result: dict):
+    print(f"{name:<26} n={result['requests']:<6} err={result['errors']:<4} {result['throughput_rps']:9.1f} req/s "
+          f"p50={result['p50_ms']:8.2f}ms p95={result['p95_ms']:8.2f}ms p99={result['p99_ms']:8.2f}ms", flush=True)
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_ms: float):
+    """
+    Find the endpoints that regressed against a baseline.
+
+    An endpoint regresses when its p95 latency grew by more than 'threshold' (and by
+    at least 'min_delta_ms', so sub-millisecond noise is ignored) or its throughput
+    dropped by more than 'threshold'.
+
+    Returns:
+        List[str]: A description of each regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            continue
+        p95_limit = max(before["p95_ms"] * (1 + threshold), before["p95_ms"] + min_delta_ms)
+        if result["p95_ms"] > p95_limit:
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f}ms -> {result['p95_ms']:.2f}ms")
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {before['throughput_rps']:.1f} -> {result['throughput_rps']:.1f} req/s")
+    return regressions
+
+async def run_in_process(ctx: dict, args):
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    # The ASGI transport does not send lifespan events, so run startup and shutdown here;
+    # shutdown closes the pooled connections, whose driver threads would otherwise keep the
+    # process alive
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            return await run_suite(client, ctx, args)
+
+async def run_against_server(ctx: dict, args):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--no-access-log", "--log-level", "warning"],
+        cwd=ROOT, env=os.environ.copy(), start_new_session=True,
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            deadline = time.perf_counter() + 60
+            while True:
+                try:
+                    if (await client.get("/health/ready")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.perf_counter() > deadline or server.poll() is not None:
+                    raise RuntimeError("uvicorn did not start")
+                await asyncio.sleep(0.2)
+            return await run_suite(client, ctx, args)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            # Stop the workers too if the graceful shutdown hangs
+            os.killpg(server.pid, signal.SIGKILL)
+            server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every router against a seeded database.")
+    parser.add_argument("--mode", choices=["asgi", "server"], default="asgi")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn workers in server mode")
+    parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--scale", type=float, default=1.0, help="seed volume multiplier")
+    parser.add_argument("--reseed", action="store_true", help="drop and reseed the database first")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="scenario name prefixes to run, e.g. products cart")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for request parameters")
+    parser.add_argument("--save", help="write the results to this JSON baseline")
+    parser.add_argument("--compare", help="compare against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="p95 growth always tolerated")
+    args = parser.parse_args()
+
+    # The app reads its database from the environment at import time, and server-mode
+    # workers inherit it
+    os.environ["POSTGRES_URL"] = args.database_url
+    sys.path.insert(0, ROOT)
+    from app.database import engine
+    from seed import SEED_PASSWORD, seed
+
+    counts = seed(engine, scale=args.scale, reset=args.reseed)
+    print(f"database {engine.url.render_as_string(hide_password=True)}: {counts}", flush=True)
+    ctx = dict(counts, password=SEED_PASSWORD, tokens=[], run_id=f"{int(time.time())}-{os.getpid()}", sequence=iter(range(1, 10**9)))
+
+    runner = run_in_process if args.mode == "asgi" else run_against_server
+    results = asyncio.run(runner(ctx, args))
+
+    if args.save:
+        baseline = {
+            "meta": {
+                "mode": args.mode, "workers": args.workers if args.mode == "server" else 1,
+                "database": engine.dialect.name, "seed": counts, "requests": args.requests,
+                "concurrency": args.concurrency, "python": platform.python_version(),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            },
+            "endpoints": results,
+        }
+        with open(args.save, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"baseline saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["mode"] != args.mode or baseline["meta"]["database"] != engine.dialect.name:
+            print(f"warning: baseline was recorded in {baseline['meta']['mode']} mode on {baseline['meta']['database']}")
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:.0%} against {args.compare}")
+
+if __name__ == "__main__":
+    main()
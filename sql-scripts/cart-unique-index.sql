@@ -0,0 +1,29 @@
+-- POSTGRESQL MIGRATION: ONE CART ROW PER (USER, PRODUCT)
+
+-- CARTS USED TO GET A NEW ROW ON EVERY ADD; MERGE DUPLICATES BEFORE ADDING THE UNIQUE INDEX
+
+begin;
+
+-- fold the quantity of duplicate lines into the oldest line
+
+update cart
+set quantity = merged.quantity
+from (
+    select min(cart_id) as cart_id, sum(quantity) as quantity
+    from cart
+    group by user_id, product_id
+    having count(*) > 1
+) as merged
+where cart.cart_id = merged.cart_id;
+
+-- drop the now redundant lines
+
+delete from cart
+using cart as kept
+where cart.user_id = kept.user_id
+and cart.product_id = kept.product_id
+and cart.cart_id > kept.cart_id;
+
+create unique index ix_cart_user_id_product_id on cart (user_id, product_id);
+
+commit;
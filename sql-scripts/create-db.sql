@@ -42,6 +42,16 @@ create table order (
     status_id int not null
 );
 
+-- order_item(*order_item_id, order_id, product_id, quantity, unit_price)
+
+create table order_item (
+    order_item_id serial primary key,
+    order_id int not null,
+    product_id int not null,
+    quantity int not null,
+    unit_price int not null
+);
+
 -- payment(*payment_id, user_id, card_number, card_holder, expiration_date, cvv)
 
 create table payment (
@@ -78,7 +88,17 @@ create table product (
     name varchar(50) not null,
     description varchar(200) not null,
     price float not null,
-    image_url varchar(200) not null
+    image_url varchar(200) not null,
+    version int not null default 1,
+    updated_at timestamp not null default (now() at time zone 'utc')
+);
+
+-- catalog_version(*catalog_id, version, updated_at)
+
+create table catalog_version (
+    catalog_id int primary key,
+    version int not null,
+    updated_at timestamp not null
 );
 
 -- category(*category_id, name)
@@ -88,6 +108,28 @@ create table category (
     name varchar(50) not null
 );
 
+-- product_category(*category_id, *product_id)
+
+create table product_category (
+    category_id int not null,
+    product_id int not null,
+    primary key (category_id, product_id)
+);
+
+-- category_facet(*category_id, product_count)
+
+create table category_facet (
+    category_id int primary key,
+    product_count int not null
+);
+
+-- price_bucket_facet(*min_price, product_count)
+
+create table price_bucket_facet (
+    min_price int primary key,
+    product_count int not null
+);
+
 -- customer_service(*inquiry_id, user_id, date, message)
 
 create table customer_service (
@@ -113,6 +155,14 @@ alter table order
 add constraint fk_order_status_id
 foreign key (status_id) references order_status (status_id);
 
+-- order_item
+
+alter table order_item
+add constraint fk_order_item_order_id
+foreign key (order_id) references order (order_id);
+
+create index ix_order_item_order_id on order_item (order_id);
+
 -- payment
 
 alter table payment
@@ -129,8 +179,52 @@ alter table cart
 add constraint fk_cart_product_id
 foreign key (product_id) references product (product_id);
 
+-- product_category
+
+alter table product_category
+add constraint fk_product_category_category_id
+foreign key (category_id) references category (category_id) on delete cascade;
+
+alter table product_category
+add constraint fk_product_category_product_id
+foreign key (product_id) references product (product_id) on delete cascade;
+
+create index ix_product_category_product_id on product_category (product_id);
+
+-- category_facet
+
+alter table category_facet
+add constraint fk_category_facet_category_id
+foreign key (category_id) references category (category_id) on delete cascade;
+
 -- customer_service
 
 alter table customer_service
 add constraint fk_customer_service_user_id
-foreign key (user_id) references user_data (user_id);
\ No newline at end of file
+foreign key (user_id) references user_data (user_id);
+
+-- keyset pagination indexes (sort column, primary key)
+
+create index ix_order_user_id on order (user_id);
+
+create index ix_order_date_order_id on order (date, order_id);
+
+create index ix_order_total_cost_order_id on order (total_cost, order_id);
+
+create index ix_product_price_product_id on product (price, product_id);
+
+create index ix_product_name_product_id on product (name, product_id);
+
+create index ix_customer_service_date_inquiry_id on customer_service (date, inquiry_id);
+
+-- inquiry lookups by user_id
+
+create index ix_customer_service_user_id on customer_service (user_id);
+
+-- one cart row per (user, product); also serves cart lookups by user_id
+
+create unique index ix_cart_user_id_product_id on cart (user_id, product_id);
+
+-- full-text search index over product name and description
+
+create index ix_product_search on product using gin (to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, '')));
\ No newline at end of file
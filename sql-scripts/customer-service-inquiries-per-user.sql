@@ -0,0 +1,12 @@
+-- POSTGRESQL MIGRATION: ANY NUMBER OF INQUIRIES PER USER
+
+-- TABLES CREATED BY THE APP HAD A UNIQUE CONSTRAINT ON customer_service.user_id, WHICH
+-- REJECTED EVERY INQUIRY AFTER A USER'S FIRST; REPLACE IT WITH A PLAIN INDEX FOR PER-USER LOOKUPS
+
+begin;
+
+alter table customer_service drop constraint if exists customer_service_user_id_key;
+
+create index if not exists ix_customer_service_user_id on customer_service (user_id);
+
+commit;
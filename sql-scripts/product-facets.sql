@@ -0,0 +1,44 @@
+-- POSTGRESQL MIGRATION: PRODUCT CATEGORIES AND PRECOMPUTED FACET COUNTS
+
+-- THE PRICE BUCKETS BELOW MUST MATCH PRICE_FACET_BUCKETS; RE-RUN THE BACKFILL AFTER CHANGING THEM
+
+begin;
+
+create table product_category (
+    category_id int not null references category (category_id) on delete cascade,
+    product_id int not null references product (product_id) on delete cascade,
+    primary key (category_id, product_id)
+);
+
+create index ix_product_category_product_id on product_category (product_id);
+
+create table category_facet (
+    category_id int primary key references category (category_id) on delete cascade,
+    product_count int not null
+);
+
+create table price_bucket_facet (
+    min_price int primary key,
+    product_count int not null
+);
+
+-- backfill, counted once here and maintained incrementally by the application afterwards
+
+lock table product in share mode;
+
+insert into category_facet (category_id, product_count)
+select category_id, count(*) from product_category group by category_id;
+
+delete from price_bucket_facet;
+
+insert into price_bucket_facet (min_price, product_count)
+select bucket.min_price, count(*)
+from product
+join (values (0), (25), (50), (100), (250), (500)) as bucket (min_price)
+    on bucket.min_price = (
+        select max(bound) from (values (0), (25), (50), (100), (250), (500)) as bounds (bound)
+        where bound <= product.price
+    )
+group by bucket.min_price;
+
+commit;
@@ -0,0 +1,5 @@
+-- POSTGRESQL MIGRATION: FULL-TEXT SEARCH INDEX OVER PRODUCTS
+
+-- THE EXPRESSION MUST MATCH models.product_search_document() FOR SEARCHES TO USE THE INDEX
+
+create index concurrently ix_product_search on product using gin (to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, '')));
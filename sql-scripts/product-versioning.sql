@@ -0,0 +1,18 @@
+-- POSTGRESQL MIGRATION: PRODUCT AND CATALOG VERSIONS FOR HTTP CACHE VALIDATORS
+
+begin;
+
+alter table product
+add column version int not null default 1,
+add column updated_at timestamp not null default (now() at time zone 'utc');
+
+create table catalog_version (
+    catalog_id int primary key,
+    version int not null,
+    updated_at timestamp not null
+);
+
+insert into catalog_version (catalog_id, version, updated_at)
+values (1, 1, now() at time zone 'utc');
+
+commit;
@@ -0,0 +1,25 @@
+# Description: Shared test fixtures.
+#
+# The tests run the app against a throwaway SQLite database; they require a config.py like
+# any other run. The database URL must be set before the app is first imported.
+
+import os
+import tempfile
+
+os.environ["POSTGRES_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.main import app
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def db():
+    with SessionLocal() as db:
+        yield db
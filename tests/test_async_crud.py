@@ -0,0 +1,105 @@
+# Description: Tests for the async CRUD utilities that have no async endpoint yet.
+
+import asyncio
+
+import pytest
+
+from app import async_crud, models, schema
+from app.database import AsyncSessionLocal, async_engine
+
+def run(fn):
+    async def main():
+        try:
+            async with AsyncSessionLocal() as db:
+                return await fn(db)
+        finally:
+            # The pool's connections belong to this test's event loop
+            await async_engine.dispose()
+    return asyncio.run(main())
+
+@pytest.fixture
+def product_ids(client):
+    return [client.post("/products/", json={"name": f"Async kite {n}", "price": 10 * n}).json()["product_id"] for n in (1, 2)]
+
+def test_categories(client):
+    async def scenario(db):
+        category = await async_crud.add_category(db, schema.CategoryCreate(name="Async kites"))
+        found = await async_crud.get_category_by_id(db, category.category_id)
+        listed = await async_crud.get_category_list(db)
+        await async_crud.delete_category(db, category.category_id)
+        return category, found, listed, await async_crud.get_category_by_id(db, category.category_id)
+
+    category, found, listed, deleted = run(scenario)
+    assert (found.name, found.product_count) == ("Async kites", 0)
+    assert category.category_id in [row.category_id for row in listed]
+    assert deleted is None
+
+def test_priced_cart_and_checkout(client, db, product_ids):
+    user_id = 1001
+    payment = models.Payment(user_id=user_id, card_number="4242", card_holder="Test", expiration_date="12/30", cvv=123)
+    db.add(payment)
+    db.commit()
+    for product_id in product_ids:
+        client.post("/cart/", json={"user_id": user_id, "product_id": product_id, "quantity": 2})
+
+    async def scenario(db):
+        lines = await async_crud.get_priced_cart(db, user_id)
+        order = await async_crud.checkout_cart(db, user_id, payment.payment_id)
+        return lines, order, await async_crud.get_cart_by_user_id(db, user_id), await async_crud.get_order_rows_by_user_id(db, user_id)
+
+    lines, order, cart, orders = run(scenario)
+    assert [line.line_total for line in lines] == [20, 40]
+    assert lines[0].cart_total == 60
+    assert order["total_cost"] == 60
+    assert sorted(item["product_id"] for item in order["items"]) == sorted(product_ids)
+    assert cart == []
+    assert [row["order_id"] for row in orders] == [order["order_id"]]
+
+def test_row_readers_and_streams(client):
+    async def scenario(db):
+        products = await async_crud.get_product_rows(db, limit=2)
+        orders = await async_crud.get_order_rows(db, limit=2)
+        inquiries = await async_crud.get_inquiry_rows(db, limit=2)
+        streamed = [row.order_id async for row in await async_crud.stream_orders(db, batch_size=1)]
+        streamed_inquiries = [row.inquiry_id async for row in await async_crud.stream_inquiries(db, batch_size=1)]
+        return products, orders, inquiries, streamed, streamed_inquiries
+
+    products, orders, inquiries, streamed, streamed_inquiries = run(scenario)
+    assert len(products) <= 2 and all(set(row) == set(schema.Product.__fields__) for row in products)
+    assert all(set(row) == set(schema.Order.__fields__) for row in orders)
+    assert all(set(row) == set(schema.CustomerService.__fields__) for row in inquiries)
+    assert streamed == sorted(streamed)
+    assert streamed_inquiries == sorted(streamed_inquiries)
+
+def test_cached_readers(client, product_ids):
+    async def scenario(db):
+        entry = await async_crud.get_cached_product_entry(db, product_ids[0])
+        cached = await async_crud.get_cached_product_entry(db, product_ids[0], load=False)
+        found, missing = await async_crud.get_products_by_ids(db, [product_ids[1], 0, product_ids[0]])
+        page = await async_crud.get_cached_product_page(db, limit=1)
+        facets = await async_crud.get_cached_product_facets(db)
+        return entry, cached, found, missing, page, facets
+
+    entry, cached, found, missing, page, facets = run(scenario)
+    assert entry.product.name == "Async kite 1"
+    assert cached is entry
+    assert [product.product_id for product in found] == [product_ids[1], product_ids[0]]
+    assert missing == [0]
+    assert len(page.products) == 1
+    assert isinstance(facets.facets, schema.ProductFacets)
+
+def test_search(client, product_ids):
+    rows, next_page = run(lambda db: async_crud.search_products(db, "async kite", limit=1))
+    assert len(rows) == 1 and next_page is not None
+
+def test_order_statuses(client):
+    async def scenario(db):
+        created = await async_crud.add_order_status(db, schema.OrderStatusCreate(status="Async shipped"))
+        resolved = await async_crud.resolve_order_status(db, status="Async shipped")
+        with pytest.raises(ValueError):
+            await async_crud.resolve_order_status(db, status="Async lost")
+        return created, resolved, await async_crud.get_order_statuses(db)
+
+    created, resolved, statuses = run(scenario)
+    assert resolved == (created.status_id, "Async shipped")
+    assert {"status_id": created.status_id, "status": "Async shipped"} in statuses
@@ -0,0 +1,68 @@
+# Description: Tests for the streamed bulk product import.
+
+import asyncio
+
+from app import async_crud, models
+from app.database import AsyncSessionLocal, async_engine
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+def stored(db, prefix: str):
+    db.expire_all()
+    return {product.name: product for product in db.query(models.Product).filter(models.Product.name.startswith(prefix))}
+
+def test_ndjson_import_reports_rejected_rows(client, db):
+    body = "\n".join([
+        '{"name": "Bulk mug 1", "price": 8}',
+        '{"name": "Bulk mug 2"}',
+        "",
+        "{not json",
+        '{"name": "Bulk mug 3", "price": 9, "description": "Blue"}',
+    ])
+    response = client.post("/products/bulk", content=body, headers=NDJSON)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["inserted"], result["failed"]) == (2, 2)
+    assert [error["row"] for error in result["errors"]] == [2, 4]
+    assert "price" in result["errors"][0]["error"]
+
+    products = stored(db, "Bulk mug")
+    assert sorted(products) == ["Bulk mug 1", "Bulk mug 3"]
+    assert products["Bulk mug 3"].description == "Blue"
+    assert products["Bulk mug 1"].version == 1
+
+def test_csv_import_links_categories(client, db):
+    category_id = client.post("/categories/", json={"name": "Bulk cups"}).json()["category_id"]
+    body = f'name,price,description,category_ids\nBulk cup 1,5,"Tall, white",{category_id}\nBulk cup 2,6,,\nBulk cup 3,x,,\n'
+    result = client.post("/products/bulk", content=body, headers={"Content-Type": "text/csv"}).json()
+    assert (result["inserted"], result["failed"]) == (2, 1)
+    assert result["errors"][0]["row"] == 3
+
+    products = stored(db, "Bulk cup")
+    assert products["Bulk cup 1"].description == "Tall, white"
+    linked = db.query(models.ProductCategory).filter(models.ProductCategory.category_id == category_id).all()
+    assert [link.product_id for link in linked] == [products["Bulk cup 1"].product_id]
+
+def test_atomic_import_inserts_nothing_on_error(client, db):
+    body = '{"name": "Bulk plate 1", "price": 3}\n{"name": "Bulk plate 2", "price": 4, "category_ids": [1000000]}\n'
+    result = client.post("/products/bulk", params={"atomic": True}, content=body, headers=NDJSON).json()
+    assert (result["inserted"], result["failed"]) == (0, 1)
+    assert stored(db, "Bulk plate") == {}
+
+def test_import_rejects_other_content_types(client):
+    assert client.post("/products/bulk", json=[{"name": "Bulk bowl", "price": 1}]).status_code == 415
+
+def test_import_in_small_chunks(client, db):
+    async def records():
+        for row in range(1, 6):
+            yield row, {"name": f"Bulk saucer {row}", "price": row}
+
+    async def scenario():
+        try:
+            async with AsyncSessionLocal() as session:
+                return await async_crud.import_products(session, records(), chunk_size=2)
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(scenario())["inserted"] == 5
+    assert len(stored(db, "Bulk saucer")) == 5
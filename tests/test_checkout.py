@@ -0,0 +1,42 @@
+# Description: Tests for checking out a cart into an order.
+
+from app import models
+
+def add_product(client, name: str, price: int):
+    return client.post("/products/", json={"name": name, "price": price}).json()["product_id"]
+
+def add_payment(db, user_id: int):
+    payment = models.Payment(user_id=user_id, card_number="4242", card_holder="Test", expiration_date="12/30", cvv=123)
+    db.add(payment)
+    db.commit()
+    return payment.payment_id
+
+def test_checkout_creates_order_with_items_and_clears_cart(client, db):
+    user_id = 1201
+    payment_id = add_payment(db, user_id)
+    shoe = add_product(client, "Checkout shoe", 40)
+    hat = add_product(client, "Checkout hat", 15)
+    client.post("/cart/", json={"user_id": user_id, "product_id": shoe, "quantity": 2})
+    client.post("/cart/", json={"user_id": user_id, "product_id": hat, "quantity": 1})
+
+    response = client.post("/orders/checkout", json={"user_id": user_id, "payment_id": payment_id})
+    assert response.status_code == 200
+    order = response.json()
+    assert order["user_id"] == user_id
+    assert order["payment_id"] == payment_id
+    assert order["total_cost"] == 2 * 40 + 15
+    assert sorted((item["product_id"], item["quantity"], item["unit_price"]) for item in order["items"]) == [(shoe, 2, 40), (hat, 1, 15)]
+
+    stored = db.query(models.OrderItem).filter(models.OrderItem.order_id == order["order_id"]).count()
+    assert stored == 2
+    assert client.get("/cart/", params={"user_id": user_id}).json() == []
+
+def test_checkout_of_empty_cart_is_rejected(client, db):
+    payment_id = add_payment(db, 1202)
+    response = client.post("/orders/checkout", json={"user_id": 1202, "payment_id": payment_id})
+    assert response.status_code == 400
+
+def test_checkout_with_another_users_payment_is_rejected(client, db):
+    payment_id = add_payment(db, 1203)
+    response = client.post("/orders/checkout", json={"user_id": 1204, "payment_id": payment_id})
+    assert response.status_code == 404
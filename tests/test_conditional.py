@@ -0,0 +1,51 @@
+# Description: Tests for ETag / Last-Modified conditional requests.
+
+from app import crud
+
+def add_product(client, name: str, price: int = 10):
+    return client.post("/products/", json={"name": name, "price": price}).json()["product_id"]
+
+def test_product_not_modified_until_updated(client):
+    product_id = add_product(client, "Tagged vase")
+    response = client.get(f"/products/{product_id}")
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+
+    response = client.get(f"/products/{product_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert client.get(f"/products/{product_id}", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get(f"/products/{product_id}", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    client.put(f"/products/{product_id}", json={"name": "Tagged vase", "price": 12})
+    response = client.get(f"/products/{product_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["price"] == 12
+
+def test_product_not_modified_without_cache(client):
+    product_id = add_product(client, "Uncached vase")
+    etag = client.get(f"/products/{product_id}").headers["ETag"]
+    # A cold cache answers from the product's validators alone
+    crud.invalidate_product_cache(product_id)
+    assert client.get(f"/products/{product_id}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/products/0", headers={"If-None-Match": etag}).status_code == 404
+
+def test_product_list_not_modified_until_catalog_changes(client):
+    params = {"sort": "price", "limit": 5}
+    etag = client.get("/products/", params=params).headers["ETag"]
+    assert client.get("/products/", params=params, headers={"If-None-Match": etag}).status_code == 304
+    # Each page has its own tag
+    assert client.get("/products/", params=dict(params, limit=6), headers={"If-None-Match": etag}).status_code == 200
+
+    add_product(client, "Catalog vase")
+    response = client.get("/products/", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_facets_not_modified_until_catalog_changes(client):
+    etag = client.get("/products/facets").headers["ETag"]
+    assert client.get("/products/facets", headers={"If-None-Match": etag}).status_code == 304
+    add_product(client, "Faceted vase")
+    assert client.get("/products/facets", headers={"If-None-Match": etag}).status_code == 200
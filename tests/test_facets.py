@@ -0,0 +1,59 @@
+# Description: Tests for the incrementally maintained product facets.
+
+def facets(client):
+    body = client.get("/products/facets").json()
+    categories = {category["category_id"]: category["product_count"] for category in body["categories"]}
+    buckets = {bucket["min_price"]: bucket["product_count"] for bucket in body["price_buckets"]}
+    return categories, buckets
+
+def add_category(client, name: str):
+    return client.post("/categories/", json={"name": name}).json()["category_id"]
+
+def test_facets_follow_product_writes(client):
+    rugs = add_category(client, "Facet rugs")
+    mats = add_category(client, "Facet mats")
+    _, buckets = facets(client)
+    before = {bound: buckets.get(bound, 0) for bound in (0, 50, 500)}
+
+    product = client.post("/products/", json={"name": "Facet rug", "price": 60, "category_ids": [rugs, mats]}).json()
+    categories, buckets = facets(client)
+    assert (categories[rugs], categories[mats]) == (1, 1)
+    assert buckets[50] == before[50] + 1
+
+    client.put(f"/products/{product['product_id']}", json={"name": "Facet rug", "price": 700, "category_ids": [mats]})
+    categories, buckets = facets(client)
+    assert rugs not in categories
+    assert categories[mats] == 1
+    assert buckets.get(50, 0) == before[50]
+    assert buckets[500] == before[500] + 1
+    assert client.get(f"/categories/{rugs}").json()["product_count"] == 0
+
+    # Categories are kept when an update leaves them out
+    client.put(f"/products/{product['product_id']}", json={"name": "Facet rug", "price": 5})
+    categories, buckets = facets(client)
+    assert categories[mats] == 1
+    assert buckets[0] == before[0] + 1
+
+    client.delete(f"/products/{product['product_id']}")
+    categories, buckets = facets(client)
+    assert mats not in categories
+    assert {bound: buckets.get(bound, 0) for bound in before} == before
+
+def test_facets_count_bulk_imports(client):
+    lamps = add_category(client, "Facet lamps")
+    body = "\n".join([
+        f'{{"name": "Facet lamp 1", "price": 30, "category_ids": [{lamps}]}}',
+        f'{{"name": "Facet lamp 2", "price": 40, "category_ids": [{lamps}]}}',
+        '{"name": "Facet lamp 3", "price": 45}',
+    ])
+    _, buckets = facets(client)
+    before = buckets.get(25, 0)
+    response = client.post("/products/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.json()["inserted"] == 3
+    categories, buckets = facets(client)
+    assert categories[lamps] == 2
+    assert buckets[25] == before + 3
+
+def test_unknown_category_is_rejected(client):
+    response = client.post("/products/", json={"name": "Facet ghost", "price": 10, "category_ids": [10**6]})
+    assert response.status_code == 400
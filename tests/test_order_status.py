@@ -0,0 +1,60 @@
+# Description: Tests for order status updates and the in-memory order_status table.
+
+from app import models
+from app.cache import order_status_registry
+
+def add_status(db, name: str):
+    # Written straight to the database, like a SQL seed or another worker would
+    status = models.OrderStatus(status=name)
+    db.add(status)
+    db.commit()
+    return status.status_id
+
+def add_order(db, status_id: int):
+    order = models.Order(user_id=2401, date="2024-01-01", total_cost=10, payment_id=1, status_id=status_id)
+    db.add(order)
+    db.commit()
+    return order.order_id
+
+def test_statuses_added_outside_the_app_are_listed_once_the_table_expires(client, db, monkeypatch):
+    monkeypatch.setattr(order_status_registry, "ttl", 0)
+    client.get("/orders/statuses")
+    status_id = add_status(db, "Seeded later")
+    assert {"status": "Seeded later", "status_id": status_id} in client.get("/orders/statuses").json()
+
+def test_update_status_by_name_and_id(client, db):
+    pending = add_status(db, "Awaiting payment")
+    order_id = add_order(db, pending)
+    client.get(f"/orders/{order_id}")
+    shipped = add_status(db, "Handed to courier")
+
+    response = client.put(f"/orders/{order_id}/status", json={"status": "Handed to courier"})
+    assert response.status_code == 200
+    assert response.json()["status_id"] == shipped
+    assert response.json()["status"] == "Handed to courier"
+
+    response = client.put(f"/orders/{order_id}/status", json={"status_id": pending})
+    assert response.json()["status"] == "Awaiting payment"
+    assert client.get(f"/orders/{order_id}").json()["status"] == "Awaiting payment"
+
+def test_unknown_status_is_rejected(client, db):
+    order_id = add_order(db, add_status(db, "Packed"))
+    assert client.put(f"/orders/{order_id}/status", json={"status": "No such status"}).status_code == 400
+    assert client.put(f"/orders/{order_id}/status", json={"status": "Packed", "status_id": 999999}).status_code == 400
+    assert client.put(f"/orders/{order_id}/status", json={}).status_code == 422
+
+def test_missing_order_is_not_found(client, db):
+    add_status(db, "Returned to sender")
+    assert client.put("/orders/999999/status", json={"status": "Returned to sender"}).status_code == 404
+    assert client.put("/orders/999999/status", json={"status": "No such status"}).status_code == 404
+
+def test_order_with_unknown_status_has_no_status_name(client, db):
+    order_id = add_order(db, 999998)
+    response = client.get(f"/orders/{order_id}")
+    assert response.status_code == 200
+    assert response.json()["status"] is None
+
+def test_status_created_through_the_api_is_usable(client):
+    created = client.post("/orders/statuses", json={"status": "Refunded"}).json()
+    assert created["status"] == "Refunded"
+    assert created in client.get("/orders/statuses").json()
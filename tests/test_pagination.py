@@ -0,0 +1,74 @@
+# Description: Tests for keyset (cursor) pagination of the list endpoints.
+
+import pytest
+
+from app import crud, models
+from app.database import SessionLocal
+from app.pagination import decode_cursor, encode_cursor
+
+@pytest.fixture(scope="module")
+def category(client):
+    category_id = client.post("/categories/", json={"name": "Paged lamps"}).json()["category_id"]
+    # Repeated prices, so pages split ties on the product ID
+    for n, price in enumerate([30, 10, 20, 10, 30, 10, 20]):
+        client.post("/products/", json={"name": f"Paged lamp {n % 3}", "price": price, "category_ids": [category_id]})
+    return category_id
+
+@pytest.fixture(scope="module")
+def unpriced(category):
+    # Not possible through the API; sorted after every priced product
+    with SessionLocal() as db:
+        product = models.Product(name="Paged lamp 0", price=None, version=1)
+        db.add(product)
+        db.flush()
+        db.add(models.ProductCategory(product_id=product.product_id, category_id=category))
+        db.commit()
+        product_id = product.product_id
+    crud.invalidate_product_cache()
+    return product_id
+
+def walk(client, path, limit, **params):
+    pages = []
+    params = dict(params, limit=limit)
+    while True:
+        response = client.get(path, params=params)
+        assert response.status_code == 200
+        pages.append(response.json())
+        if "X-Next-Cursor" not in response.headers:
+            return pages
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+@pytest.mark.parametrize("sort", ["product_id", "price", "name"])
+def test_product_pages_follow_offset_order(client, category, unpriced, sort):
+    expected = client.get("/products/", params={"category": category, "sort": sort, "limit": 100}).json()
+    pages = walk(client, "/products/", 2, category=category, sort=sort)
+    assert all(len(page) <= 2 for page in pages)
+    assert [product["product_id"] for page in pages for product in page] == [product["product_id"] for product in expected]
+    assert len(expected) == 8
+
+def test_price_sort_puts_ties_by_id_and_nulls_last(client, category, unpriced):
+    products = [product for page in walk(client, "/products/", 3, category=category, sort="price") for product in page]
+    keys = [(product["price"], product["product_id"]) for product in products[:-1]]
+    assert keys == sorted(keys)
+    assert products[-1]["product_id"] == unpriced
+
+def test_order_pages_cover_every_order(client, db):
+    # Same dates, so pages split ties on the order ID
+    db.add_all(models.Order(user_id=301, date=date, total_cost=10, payment_id=1, status_id=1) for date in ["2024-02-01", "2024-01-01"] * 3)
+    db.commit()
+    expected = client.get("/orders/all", params={"sort": "date", "limit": 1000}).json()
+    pages = walk(client, "/orders/all", 2, sort="date")
+    assert len(expected) > 2
+    assert [order["order_id"] for page in pages for order in page] == [order["order_id"] for order in expected]
+
+def test_invalid_cursors_are_rejected(client):
+    assert client.get("/products/", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/products/", params={"sort": "price", "cursor": encode_cursor("name", "a", 1)}).status_code == 400
+    assert client.get("/products/", params={"sort": "price", "cursor": encode_cursor("price", "ten", 1)}).status_code == 400
+    assert client.get("/products/", params={"sort": "colour"}).status_code == 400
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("price", 10, 7), "price", int) == (10, 7)
+    assert decode_cursor(encode_cursor("price", None, 7), "price", int) == (None, 7)
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("price", True, 7), "price", int)
@@ -0,0 +1,14 @@
+# Description: Tests for creating and updating products.
+
+def test_update_keeps_fields_left_out(client):
+    product = client.post("/products/", json={"name": "Desk", "price": 120, "description": "Oak", "image_url": "desk.png"}).json()
+    response = client.put(f"/products/{product['product_id']}", json={"name": "Standing desk", "price": 150})
+    assert response.status_code == 200
+    updated = response.json()
+    assert (updated["name"], updated["price"], updated["description"], updated["image_url"]) == ("Standing desk", 150, "Oak", "desk.png")
+
+def test_update_clears_fields_sent_as_null(client):
+    product = client.post("/products/", json={"name": "Chair", "price": 60, "description": "Beech"}).json()
+    updated = client.put(f"/products/{product['product_id']}", json={"name": "Chair", "price": 60, "description": None}).json()
+    assert updated["description"] is None
+    assert client.get(f"/products/{product['product_id']}").json()["description"] is None
@@ -0,0 +1,62 @@
+# Description: Tests for the token-bucket rate limiter.
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.rate_limit import LocalBuckets, RateLimiter, RateLimitMiddleware, RateLimitRule, parse_rate_limit_rules
+
+def test_parse_rules():
+    rules = parse_rate_limit_rules("GET /token/=10/60:ip,user; post /users=5/30")
+    assert rules[("GET", "/token")] == RateLimitRule("GET", "/token", 10, 60.0, ("ip", "user"))
+    assert rules[("POST", "/users")] == RateLimitRule("POST", "/users", 5, 30.0, ("ip",))
+
+@pytest.mark.parametrize("spec", ["GET /token", "GET /token/=0/60", "GET /token/=1/60:session"])
+def test_parse_rejects_bad_rules(spec):
+    with pytest.raises(ValueError):
+        parse_rate_limit_rules(spec)
+
+def test_bucket_empties_and_refills():
+    buckets = LocalBuckets(shards=2, max_keys=100)
+    assert buckets.take("a", 2, 10, now=0) == 0
+    assert buckets.take("a", 2, 10, now=0) == 0
+    assert buckets.take("a", 2, 10, now=0) == pytest.approx(5)
+    assert buckets.take("a", 2, 10, now=5) == 0
+
+def test_refund_gives_back_a_token():
+    buckets = LocalBuckets(shards=2, max_keys=100)
+    buckets.take("a", 1, 10, now=0)
+    assert buckets.take("a", 1, 10, now=0) > 0
+    buckets.refund("a", 1, 10)
+    assert buckets.take("a", 1, 10, now=0) == 0
+
+def test_user_rejection_does_not_drain_ip_budget():
+    rule = RateLimitRule("GET", "/token", 2, 60.0, ("ip", "user"))
+    limiter = RateLimiter({}, LocalBuckets(shards=1, max_keys=100))
+
+    def check(ip, user):
+        return asyncio.run(limiter.check(rule, {"ip": ip, "user": user}))
+
+    assert check("10.0.0.1", "alice") == 0
+    assert check("10.0.0.2", "alice") == 0
+    # alice is out of tokens; the shared office IP must keep both of its own
+    assert check("10.0.0.3", "alice") > 0
+    assert check("10.0.0.3", "bob") == 0
+    assert check("10.0.0.3", "carol") == 0
+    assert check("10.0.0.3", "dave") > 0
+    assert (limiter.allowed, limiter.rejected) == (4, 2)
+
+def test_middleware_rejects_with_retry_after():
+    app = FastAPI()
+    app.post("/users/")(lambda: {})
+    app.get("/users/")(lambda: {})
+    limiter = RateLimiter(parse_rate_limit_rules("POST /users/=1/60:ip"), LocalBuckets(shards=1, max_keys=100))
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    with TestClient(app) as client:
+        assert client.post("/users/").status_code == 200
+        response = client.post("/users/")
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+        assert client.get("/users/").status_code == 200
@@ -0,0 +1,75 @@
+# Description: Tests for routing a client's reads to the primary after its writes.
+
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import models, read_your_writes
+from app.database import engine, primary_session
+from app.read_your_writes import READ_YOUR_WRITES_COOKIE, ReadYourWritesMiddleware
+
+@pytest.fixture
+def window(client, monkeypatch):
+    monkeypatch.setattr(read_your_writes, "READ_YOUR_WRITES_SECONDS", 5)
+    client.cookies.set(READ_YOUR_WRITES_COOKIE, str(int(time.time()) + 5))
+    yield
+    client.cookies.clear()
+
+def add_product(client, name: str, price: int):
+    return client.post("/products/", json={"name": name, "price": price}).json()["product_id"]
+
+def set_price(db, product_id: int, price: int):
+    # Written behind the app's back, like a write served by another worker whose
+    # cache invalidation never reaches this process
+    db.get(models.Product, product_id).price = price
+    db.commit()
+
+def test_only_successful_writes_set_cookie(monkeypatch):
+    monkeypatch.setattr(read_your_writes, "READ_YOUR_WRITES_SECONDS", 5)
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.get("/")(lambda: {})
+    app.post("/")(lambda: {})
+    app.put("/")(lambda: 1 / 0)
+    with TestClient(app, raise_server_exceptions=False) as client:
+        assert READ_YOUR_WRITES_COOKIE in client.post("/").cookies
+        assert READ_YOUR_WRITES_COOKIE not in client.get("/").cookies
+        assert READ_YOUR_WRITES_COOKIE not in client.put("/").cookies
+
+def test_reads_without_cookie_are_served_from_cache(client, db):
+    product_id = add_product(client, "Cached lamp", 10)
+    assert client.get(f"/products/{product_id}").json()["price"] == 10
+    set_price(db, product_id, 12)
+    assert client.get(f"/products/{product_id}").json()["price"] == 10
+
+def test_reads_in_window_bypass_cache(client, db, window):
+    product_id = add_product(client, "Fresh lamp", 10)
+    assert client.get(f"/products/{product_id}").json()["price"] == 10
+    set_price(db, product_id, 12)
+
+    assert client.get(f"/products/{product_id}").json()["price"] == 12
+    assert client.get("/products/", params={"ids": str(product_id)}).json()[0]["price"] == 12
+    lookup = client.post("/products/lookup", json={"ids": [product_id]}).json()
+    assert lookup["items"][0]["price"] == 12
+
+def test_reads_in_window_do_not_fill_cache(client, db, window):
+    product_id = add_product(client, "Unshared lamp", 10)
+    set_price(db, product_id, 12)
+    assert client.get(f"/products/{product_id}").json()["price"] == 12
+
+    # Outside the window the cache is still empty, so the next read loads the current row
+    client.cookies.clear()
+    set_price(db, product_id, 14)
+    assert client.get(f"/products/{product_id}").json()["price"] == 14
+
+def test_primary_session_reuses_primary_and_opens_one_for_replica(db):
+    with primary_session(db) as primary:
+        assert primary is db
+    with Session(create_engine("sqlite://")) as replica:
+        with primary_session(replica) as primary:
+            assert primary is not replica
+            assert primary.get_bind() is engine
@@ -0,0 +1,47 @@
+# Description: Tests for the product full-text search.
+
+from app import crud
+
+def add_product(client, name: str, description: str = ""):
+    return client.post("/products/", json={"name": name, "description": description, "price": 10}).json()["product_id"]
+
+def test_search_matches_every_word_as_prefix(client):
+    shoes = add_product(client, "Zephyr running shoes")
+    add_product(client, "Zephyr walking boots")
+    found = client.get("/products/search", params={"q": "zephyr run sho"}).json()
+    assert [product["product_id"] for product in found] == [shoes]
+
+def test_search_matches_description(client):
+    kettle = add_product(client, "Kettle", "Quillon stainless steel")
+    found = client.get("/products/search", params={"q": "quillon"}).json()
+    assert [product["product_id"] for product in found] == [kettle]
+
+def test_search_pages_with_cursor(client):
+    ids = {add_product(client, f"Vortigen lamp {n}") for n in range(5)}
+    seen = []
+    params = {"q": "vortigen", "limit": 2}
+    while True:
+        response = client.get("/products/search", params=params)
+        assert response.status_code == 200
+        seen += [product["product_id"] for product in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert sorted(seen) == sorted(ids)
+
+def test_search_without_words_returns_nothing(client):
+    response = client.get("/products/search", params={"q": "  ?! "})
+    assert response.status_code == 200
+    assert response.json() == []
+
+def test_search_rejects_out_of_range_limit(client):
+    assert client.get("/products/search", params={"q": "lamp", "limit": 0}).status_code == 422
+    assert client.get("/products/search", params={"q": "lamp", "limit": -1}).status_code == 422
+    assert client.get("/products/search", params={"q": "lamp", "limit": 10**6}).status_code == 422
+
+def test_search_rejects_invalid_cursor(client):
+    assert client.get("/products/search", params={"q": "lamp", "cursor": "garbage"}).status_code == 400
+
+def test_crud_search_with_empty_limit_returns_nothing(db):
+    assert crud.search_products(db, q="lamp", limit=0) == ([], None)
+    assert crud.search_products(db, q="lamp", limit=-1) == ([], None)
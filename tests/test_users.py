@@ -0,0 +1,24 @@
+# Description: Tests for signing up and logging in.
+
+from app import models
+
+def test_sign_up_then_log_in(client, db):
+    response = client.post("/users/", json={"username": "alice", "email": "alice@example.com", "password": "s3cret"})
+    assert response.status_code == 200
+    assert "password" not in response.json()
+
+    stored = db.query(models.User.password).filter(models.User.username == "alice").scalar()
+    assert stored != "s3cret"
+
+    response = client.request("GET", "/token/", data={"username": "alice", "password": "s3cret"})
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+
+    response = client.get("/users/me/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["username"] == "alice"
+
+def test_log_in_with_wrong_password(client):
+    client.post("/users/", json={"username": "bob", "email": "bob@example.com", "password": "right"})
+    response = client.request("GET", "/token/", data={"username": "bob", "password": "wrong"})
+    assert response.status_code == 401